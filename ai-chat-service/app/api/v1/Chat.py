@@ -1,7 +1,13 @@
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from openai import APIError, OpenAI, PermissionDeniedError
+from openai import APIError, AsyncOpenAI, AsyncStream, PermissionDeniedError
 from openai import AuthenticationError as OpenAIAuthError
+from openai.types.chat import ChatCompletionChunk
 
 from app.core.config import settings
 from app.core.database import get_db
@@ -19,19 +25,91 @@ from app.services import (
     get_history_paginated,
 )
 
-client = OpenAI(api_key=settings.API_TOKEN or "dummy")
+client = AsyncOpenAI(api_key=settings.API_TOKEN or "dummy")
 
+MODEL = "gpt-4o-mini"
 SYSTEM_PROMPT = "Ты профессиональный юрист, который помогает малым и средним предприятиям разобраться в юридических вопросах."
+CHAT_NOT_FOUND = "Chat not found or access denied"
 
 router = APIRouter()
 
 
+def _provider_error(e: APIError) -> HTTPException:
+    """Переводит ошибку провайдера ИИ в HTTP-ошибку для backend."""
+    if isinstance(e, OpenAIAuthError):
+        return HTTPException(status_code=503, detail="OpenAI API key invalid or missing")
+    if isinstance(e, PermissionDeniedError):
+        return HTTPException(
+            status_code=503,
+            detail=(
+                "OpenAI отклонил запрос: регион или страна не поддерживаются "
+                "(unsupported_country_region_territory). Попробуйте VPN в поддерживаемую страну "
+                "или другой API/модель."
+            ),
+        )
+    return HTTPException(
+        status_code=502,
+        detail=f"Ошибка провайдера ИИ: {getattr(e, 'message', None) or str(e)}",
+    )
+
+
+def _sse(data: dict[str, Any], event: str | None = None) -> str:
+    """Кадр Server-Sent Events: необязательная строка event и JSON в data."""
+    payload = json.dumps(data, ensure_ascii=False)
+    if event is None:
+        return f"data: {payload}\n\n"
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+async def _stream_answer(
+    stream: AsyncStream[ChatCompletionChunk],
+    db: AsyncIOMotorDatabase,
+    user_id: int,
+    chat_id: str,
+    user_message: str,
+) -> AsyncIterator[str]:
+    """Отдаёт токены по мере поступления; после завершения потока сохраняет собранный ответ в чат.
+    События: start (chat_id), data без event ({"delta": ...}), done или error."""
+    parts: list[str] = []
+    try:
+        yield _sse({"chat_id": chat_id, "user": user_id}, event="start")
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield _sse({"delta": delta})
+        except APIError as e:
+            error = _provider_error(e)
+            yield _sse({"status_code": error.status_code, "detail": error.detail}, event="error")
+            return
+    finally:
+        await stream.close()
+    try:
+        await add_messages(
+            db,
+            user_id,
+            chat_id,
+            [
+                {"role": "user", "content": user_message},
+                {"role": "assistant", "content": "".join(parts)},
+            ],
+        )
+    except ValueError:
+        yield _sse({"status_code": 404, "detail": CHAT_NOT_FOUND}, event="error")
+        return
+    yield _sse({"chat_id": chat_id, "user": user_id}, event="done")
+
+
 @router.post("/chat")
 async def chat(
     request: ChatMessageIn,
     user_id: int = Depends(get_user_id),
     db: AsyncIOMotorDatabase = Depends(get_db),
 ):
+    """Ответ ИИ на сообщение. При stream=true — токены через Server-Sent Events (text/event-stream)."""
     if not settings.API_TOKEN:
         raise HTTPException(
             status_code=503,
@@ -46,27 +124,27 @@ async def chat(
         *history,
         {"role": "user", "content": request.message},
     ]
+    if request.stream:
+        try:
+            stream = await client.chat.completions.create(
+                model=MODEL,
+                messages=messages_for_api,
+                stream=True,
+            )
+        except APIError as e:
+            raise _provider_error(e) from e
+        return StreamingResponse(
+            _stream_answer(stream, db, user_id, chat_id, request.message),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
     try:
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",
+        completion = await client.chat.completions.create(
+            model=MODEL,
             messages=messages_for_api,
         )
-    except OpenAIAuthError as e:
-        raise HTTPException(status_code=503, detail="OpenAI API key invalid or missing") from e
-    except PermissionDeniedError as e:
-        raise HTTPException(
-            status_code=503,
-            detail=(
-                "OpenAI отклонил запрос: регион или страна не поддерживаются "
-                "(unsupported_country_region_territory). Попробуйте VPN в поддерживаемую страну "
-                "или другой API/модель."
-            ),
-        ) from e
     except APIError as e:
-        raise HTTPException(
-            status_code=502,
-            detail=f"Ошибка провайдера ИИ: {getattr(e, 'message', None) or str(e)}",
-        ) from e
+        raise _provider_error(e) from e
     response_text = completion.choices[0].message.content if completion.choices else ""
     try:
         await add_messages(
@@ -79,7 +157,7 @@ async def chat(
             ],
         )
     except ValueError:
-        raise HTTPException(status_code=404, detail="Chat not found or access denied")
+        raise HTTPException(status_code=404, detail=CHAT_NOT_FOUND)
     return {
         "response": response_text,
         "user": user_id,
@@ -105,6 +183,10 @@ async def get_conversations(
     db: AsyncIOMotorDatabase = Depends(get_db),
     page: int = 1,
     page_size: int = 20,
+    cursor: str | None = Query(None, description="next_cursor предыдущей страницы; с ним page не учитывается"),
 ):
-    """Получение списка чатов только текущего пользователя с пагинацией."""
-    return await get_all_conversations_paginated(db, user_id, page=page, page_size=page_size)
+    """Получение списка чатов только текущего пользователя с пагинацией (по page или по cursor)."""
+    try:
+        return await get_all_conversations_paginated(db, user_id, page=page, page_size=page_size, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
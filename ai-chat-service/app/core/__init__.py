@@ -1,4 +1,5 @@
 from .config import settings
 from .database import get_db, init_mongodb, close_mongodb
+from .indexes import INDEXES, ensure_indexes
 
-__all__ = ["settings", "get_db", "init_mongodb", "close_mongodb"]
+__all__ = ["settings", "get_db", "init_mongodb", "close_mongodb", "INDEXES", "ensure_indexes"]
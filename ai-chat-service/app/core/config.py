@@ -16,6 +16,9 @@ class Settings(BaseSettings):
 
     MONGO_URI: str = "mongodb://localhost:27017"
     MONGO_DB: str = "jurbot"
+    # Сообщений в одном документе chat_messages. Записывается в заголовок чата при создании (bucket_size),
+    # поэтому изменение касается только новых чатов.
+    CHAT_BUCKET_SIZE: int = 100
 
     model_config = SettingsConfigDict(from_attributes=True)
 
@@ -0,0 +1,54 @@
+"""Индексы MongoDB: объявлены здесь и создаются при старте сервиса (lifespan).
+
+Сравнение идёт по ключам, а не по именам: индекс с теми же ключами, созданный вручную под другим именем, считается
+существующим. Недостающие индексы создаются, лишние только попадают в отчёт — удалять их при старте небезопасно."""
+import logging
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+logger = logging.getLogger(__name__)
+
+INDEXES: dict[str, list[IndexModel]] = {
+    # Список чатов: фильтр по user_id и сортировка/курсор по (updated_at, _id) — без сортировки в памяти;
+    # префикс user_id покрывает и выборки только по владельцу. Поиск по {_id, user_id} идёт по _id_.
+    "chats": [
+        IndexModel(
+            [("user_id", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)], name="user_id_updated_at_id"
+        ),
+    ],
+    # Корзины сообщений: чтение страниц по диапазону seq; уникальность не даёт гонке upsert создать дубль.
+    "chat_messages": [
+        IndexModel([("chat_id", ASCENDING), ("seq", ASCENDING)], name="chat_id_seq", unique=True),
+    ],
+}
+
+
+def _key(spec: Any) -> tuple[tuple[str, Any], ...]:
+    """Ключи индекса в сравнимом виде: направления 1.0/-1.0 из index_information приводятся к int."""
+    return tuple(
+        (field, int(direction) if isinstance(direction, (int, float)) else direction) for field, direction in spec
+    )
+
+
+async def ensure_indexes(
+    db: AsyncIOMotorDatabase[Any],
+    indexes: dict[str, list[IndexModel]] | None = None,
+) -> dict[str, dict[str, list[str]]]:
+    """Создаёт недостающие индексы из INDEXES. Идемпотентно.
+    Возвращает отчёт {коллекция: {"created": [...], "extra": [...]}} и пишет его в лог."""
+    report: dict[str, dict[str, list[str]]] = {}
+    for collection, models in (indexes or INDEXES).items():
+        existing = await db[collection].index_information()
+        existing_keys = {_key(info["key"]): name for name, info in existing.items()}
+        declared_keys = {_key(model.document["key"].items()) for model in models}
+        missing = [model for model in models if _key(model.document["key"].items()) not in existing_keys]
+        created = await db[collection].create_indexes(missing) if missing else []
+        extra = [name for key, name in existing_keys.items() if name != "_id_" and key not in declared_keys]
+        report[collection] = {"created": created, "extra": extra}
+        if created:
+            logger.info("MongoDB %s: created indexes %s", collection, ", ".join(created))
+        if extra:
+            logger.warning("MongoDB %s: indexes not declared in INDEXES: %s", collection, ", ".join(extra))
+    return report
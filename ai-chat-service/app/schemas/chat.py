@@ -6,6 +6,7 @@ from pydantic import BaseModel
 class ChatMessageIn(BaseModel):
     message: str
     chat_id: str | None = None  # если нет — создаётся новый чат
+    stream: bool = False  # True — ответ токенами через Server-Sent Events
 
 
 class ChatMessageOut(BaseModel):
@@ -37,3 +38,4 @@ class ConversationsPaginatedOut(BaseModel):
     total: int
     page: int
     page_size: int
+    next_cursor: str | None = None  # курсор следующей страницы; None — страница последняя
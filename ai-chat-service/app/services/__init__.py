@@ -1,5 +1,6 @@
 from .chat_service import (
     add_messages,
+    conversations_filter,
     create_chat,
     get_all_conversations_paginated,
     get_history,
@@ -8,6 +9,7 @@ from .chat_service import (
 
 __all__ = [
     "add_messages",
+    "conversations_filter",
     "create_chat",
     "get_all_conversations_paginated",
     "get_history",
@@ -1,12 +1,38 @@
-"""Сохранение и загрузка чатов в MongoDB. Один документ = один чат (user_id + _id как chat_id)."""
+"""Сохранение и загрузка чатов в MongoDB.
+
+Чат — лёгкий заголовок в chats (user_id, message_count, bucket_size, created_at, updated_at; _id как chat_id).
+Сообщения — в chat_messages корзинами по bucket_size: документ на (chat_id, seq), seq = n // bucket_size,
+где n — номер сообщения в чате. bucket_size записывается в заголовок при создании (CHAT_BUCKET_SIZE на тот момент),
+поэтому смена настройки касается только новых чатов. Документ чата не растёт с перепиской и не упирается в лимит 16 МБ,
+а страница истории читает только заголовок и одну-две корзины.
+Чаты старого формата (массив messages в заголовке) переводятся скриптом scripts/migrate_chats_to_buckets.py.
+Число чатов пользователя хранится счётчиком в chat_counters (_id = user_id) и не пересчитывается на каждой странице:
+create_chat увеличивает его и помечает чат counted, чаты без пометки (созданные до счётчика) добавляет один раз
+scripts/seed_chat_counters.py."""
+import base64
+import binascii
+import json
+import logging
 from datetime import datetime, timezone
 from typing import Any
 
 from bson import ObjectId
+from bson.errors import InvalidId
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
 
 
 CHAT_COLLECTION = "chats"
+MESSAGE_COLLECTION = "chat_messages"
+COUNTER_COLLECTION = "chat_counters"
+# Порядок списка чатов; _id — тай-брейк для курсора. Совпадает с индексом user_id_updated_at_id.
+CONVERSATION_SORT = [("updated_at", DESCENDING), ("_id", DESCENDING)]
+CONVERSATION_PROJECTION = {"created_at": 1, "updated_at": 1, "message_count": 1}
 
 
 def _check_chat_owner(doc: dict | None, user_id: int) -> bool:
@@ -20,14 +46,35 @@ async def create_chat(db: AsyncIOMotorDatabase[Any], user_id: int) -> str:
     result = await db[CHAT_COLLECTION].insert_one(
         {
             "user_id": user_id,
-            "messages": [],
+            "message_count": 0,
+            "bucket_size": settings.CHAT_BUCKET_SIZE,
+            "counted": True,
             "created_at": now,
             "updated_at": now,
         }
     )
+    await db[COUNTER_COLLECTION].update_one({"_id": user_id}, {"$inc": {"chats": 1}}, upsert=True)
     return str(result.inserted_id)
 
 
+def _bucket_size(header: dict[str, Any]) -> int:
+    """Размер корзин чата из заголовка; у заголовков без поля — текущая настройка."""
+    return header.get("bucket_size") or settings.CHAT_BUCKET_SIZE
+
+
+async def _read_messages(
+    db: AsyncIOMotorDatabase[Any], oid: ObjectId, size: int, start: int, end: int
+) -> list[dict[str, Any]]:
+    """Сообщения с номерами [start, end) из корзин по size, которые их содержат, в порядке номеров."""
+    if end <= start:
+        return []
+    cursor = db[MESSAGE_COLLECTION].find(
+        {"chat_id": oid, "seq": {"$gte": start // size, "$lte": (end - 1) // size}},
+        {"_id": 0, "messages": 1},
+    ).sort("seq", ASCENDING)
+    return [m async for bucket in cursor for m in bucket["messages"] if start <= m["n"] < end]
+
+
 async def get_history(db: AsyncIOMotorDatabase[Any], user_id: int, chat_id: str) -> list[dict[str, str]]:
     """Возвращает историю сообщений чата в формате [{role, content}, ...] для OpenAI.
     Проверяет, что чат принадлежит user_id. Если чат не найден или не его — пустой список."""
@@ -35,10 +82,11 @@ async def get_history(db: AsyncIOMotorDatabase[Any], user_id: int, chat_id: str)
         oid = ObjectId(chat_id)
     except Exception:
         return []
-    doc = await db[CHAT_COLLECTION].find_one({"_id": oid})
-    if not _check_chat_owner(doc, user_id) or "messages" not in doc:
+    doc = await db[CHAT_COLLECTION].find_one({"_id": oid}, {"user_id": 1, "message_count": 1, "bucket_size": 1})
+    if not _check_chat_owner(doc, user_id):
         return []
-    return [{"role": m["role"], "content": m["content"]} for m in doc["messages"]]
+    messages = await _read_messages(db, oid, _bucket_size(doc), 0, doc.get("message_count", 0))
+    return [{"role": m["role"], "content": m["content"]} for m in messages]
 
 
 async def get_history_paginated(
@@ -48,71 +96,104 @@ async def get_history_paginated(
     page: int = 1,
     page_size: int = 20,
 ) -> dict[str, Any]:
-    """История переписки в конкретном чате с пагинацией. page 1-based. Только свой чат."""
+    """История переписки в конкретном чате с пагинацией. page 1-based. Только свой чат.
+    total берётся из заголовка чата, страница — из одной-двух корзин, которые её покрывают,
+    поэтому стоимость страницы не растёт с длиной чата."""
     try:
         oid = ObjectId(chat_id)
     except Exception:
         return {"items": [], "total": 0, "page": page, "page_size": page_size}
-    skip = max(0, (page - 1) * page_size)
     page_size = max(1, min(page_size, 100))
-    doc = await db[CHAT_COLLECTION].find_one({"_id": oid, "user_id": user_id})
-    if not doc or "messages" not in doc:
+    skip = max(0, (page - 1) * page_size)
+    doc = await db[CHAT_COLLECTION].find_one(
+        {"_id": oid, "user_id": user_id}, {"message_count": 1, "bucket_size": 1}
+    )
+    if not doc:
         return {"items": [], "total": 0, "page": page, "page_size": page_size}
-    messages = doc["messages"]
-    total = len(messages)
-    slice_messages = messages[skip : skip + page_size]
+    total = doc.get("message_count", 0)
+    messages = await _read_messages(db, oid, _bucket_size(doc), skip, min(skip + page_size, total))
     items = [
         {"role": m["role"], "content": m["content"], "created_at": m.get("created_at")}
-        for m in slice_messages
+        for m in messages
     ]
     return {"items": items, "total": total, "page": page, "page_size": page_size}
 
 
+def encode_cursor(doc: dict[str, Any]) -> str:
+    raw = json.dumps({"u": doc["updated_at"].isoformat(), "id": str(doc["_id"])})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, ObjectId]:
+    """(updated_at, _id) последнего чата предыдущей страницы. Некорректный курсор — ValueError."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(data["u"]), ObjectId(data["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError, InvalidId):
+        raise ValueError("invalid cursor")
+
+
+def conversations_filter(user_id: int, after: tuple[datetime, ObjectId] | None = None) -> dict[str, Any]:
+    """Фильтр списка чатов; с after — только чаты после него в порядке CONVERSATION_SORT (keyset).
+    Граница $lte по updated_at даёт один диапазон индекса в его порядке, $or лишь отсекает равные updated_at
+    с _id не меньше курсорного — без OR-плана и сортировки в памяти."""
+    if after is None:
+        return {"user_id": user_id}
+    updated_at, oid = after
+    return {
+        "user_id": user_id,
+        "updated_at": {"$lte": updated_at},
+        "$or": [{"updated_at": {"$lt": updated_at}}, {"_id": {"$lt": oid}}],
+    }
+
+
+async def count_conversations(db: AsyncIOMotorDatabase[Any], user_id: int) -> int:
+    """Число чатов пользователя из счётчика; нет счётчика — чатов нет."""
+    counter = await db[COUNTER_COLLECTION].find_one({"_id": user_id}, {"chats": 1})
+    return counter["chats"] if counter else 0
+
+
+def _conversation_item(doc: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "chat_id": str(doc["_id"]),
+        "created_at": doc.get("created_at"),
+        "updated_at": doc.get("updated_at"),
+        "message_count": doc.get("message_count", 0),
+    }
+
+
+async def _conversations(
+    db: AsyncIOMotorDatabase[Any], user_id: int, limit: int, skip: int = 0, cursor: str | None = None
+) -> tuple[list[dict[str, Any]], str | None]:
+    """Чаты страницы и курсор следующей (None на последней). Читается на один чат больше, чтобы узнать о следующей."""
+    after = decode_cursor(cursor) if cursor else None
+    docs = (
+        await db[CHAT_COLLECTION]
+        .find(conversations_filter(user_id, after), CONVERSATION_PROJECTION)
+        .sort(CONVERSATION_SORT)
+        .skip(skip)
+        .limit(limit + 1)
+        .to_list(length=limit + 1)
+    )
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return [_conversation_item(d) for d in docs[:limit]], next_cursor
+
+
 async def get_all_conversations_paginated(
     db: AsyncIOMotorDatabase[Any],
     user_id: int,
     page: int = 1,
     page_size: int = 20,
+    cursor: str | None = None,
 ) -> dict[str, Any]:
-    """Список чатов только текущего пользователя с пагинацией. page 1-based."""
-    skip = max(0, (page - 1) * page_size)
+    """Список чатов только текущего пользователя. С cursor — keyset по (updated_at, _id) и page не учитывается:
+    стоимость страницы не зависит от её номера. Без cursor — прежняя пагинация по page (1-based) через skip.
+    В обоих случаях next_cursor ведёт на следующую страницу, total берётся из счётчика chat_counters."""
     page_size = max(1, min(page_size, 100))
-    pipeline = [
-        {"$match": {"user_id": user_id}},
-        {"$sort": {"updated_at": -1}},
-        {
-            "$facet": {
-                "total": [{"$count": "count"}],
-                "chats": [
-                    {"$skip": skip},
-                    {"$limit": page_size},
-                    {
-                        "$project": {
-                            "chat_id": {"$toString": "$_id"},
-                            "created_at": 1,
-                            "updated_at": 1,
-                            "message_count": {"$size": {"$ifNull": ["$messages", []]}},
-                        },
-                    },
-                ],
-            },
-        },
-    ]
-    cursor = db[CHAT_COLLECTION].aggregate(pipeline)
-    doc = await cursor.to_list(length=1)
-    if not doc or not doc[0]:
-        return {"items": [], "total": 0, "page": page, "page_size": page_size}
-    total = doc[0]["total"][0]["count"] if doc[0]["total"] else 0
-    items = [
-        {
-            "chat_id": c["chat_id"],
-            "created_at": c.get("created_at"),
-            "updated_at": c.get("updated_at"),
-            "message_count": c.get("message_count", 0),
-        }
-        for c in doc[0]["chats"]
-    ]
-    return {"items": items, "total": total, "page": page, "page_size": page_size}
+    skip = 0 if cursor else max(0, (page - 1) * page_size)
+    items, next_cursor = await _conversations(db, user_id, page_size, skip=skip, cursor=cursor)
+    total = await count_conversations(db, user_id)
+    return {"items": items, "total": total, "page": page, "page_size": page_size, "next_cursor": next_cursor}
 
 
 async def add_messages(
@@ -121,19 +202,74 @@ async def add_messages(
     chat_id: str,
     messages: list[dict[str, str]],
 ) -> None:
-    """Добавляет сообщения в чат. Проверяет, что чат принадлежит user_id. Иначе HTTP 404/403 — вызывающий слой решит."""
+    """Добавляет сообщения в чат. Проверяет, что чат принадлежит user_id. Иначе HTTP 404/403 — вызывающий слой решит.
+    Номера сообщений резервируются атомарным $inc message_count в заголовке, затем сообщения дописываются
+    в свои корзины; $sort по номеру держит порядок внутри корзины при параллельных записях в один чат.
+    Если запись в корзины не удалась, резерв номеров откатывается (см. _release_numbers), ошибка пробрасывается."""
+    if not messages:
+        return
     try:
         oid = ObjectId(chat_id)
     except Exception:
         raise ValueError("invalid chat_id")
     now = datetime.now(timezone.utc)
-    entries = [{"role": m["role"], "content": m["content"], "created_at": now} for m in messages]
-    result = await db[CHAT_COLLECTION].update_one(
-        {"_id": oid, "user_id": user_id},
-        {
-            "$push": {"messages": {"$each": entries}},
-            "$set": {"updated_at": now},
-        },
+    header = await db[CHAT_COLLECTION].find_one_and_update(
+        {"_id": oid, "user_id": user_id, "messages": {"$exists": False}},
+        {"$inc": {"message_count": len(messages)}, "$set": {"updated_at": now}},
+        projection={"message_count": 1, "bucket_size": 1},
+        return_document=ReturnDocument.AFTER,
     )
-    if result.matched_count == 0:
+    if header is None:
         raise ValueError("chat not found or access denied")
+    first = header["message_count"] - len(messages)
+    size = _bucket_size(header)
+    buckets: dict[int, list[dict[str, Any]]] = {}
+    for n, m in enumerate(messages, start=first):
+        entry = {"n": n, "role": m["role"], "content": m["content"], "created_at": now}
+        buckets.setdefault(n // size, []).append(entry)
+    try:
+        for seq, entries in buckets.items():
+            await _push_to_bucket(db, oid, seq, entries)
+    except PyMongoError:
+        await _release_numbers(db, oid, size, first, len(messages))
+        raise
+
+
+async def _release_numbers(db: AsyncIOMotorDatabase[Any], oid: ObjectId, size: int, first: int, count: int) -> None:
+    """Номера [first, first + count) зарезервированы, но сообщения не записаны. message_count откатывается, только
+    если ни одно из них не попало в корзины и после них никто не резервировал; иначе в истории остаётся дыра
+    (страница вернёт меньше сообщений) — она пишется в лог для ручной правки."""
+    end = first + count
+    try:
+        written = await db[MESSAGE_COLLECTION].find_one(
+            {
+                "chat_id": oid,
+                "seq": {"$gte": first // size, "$lte": (end - 1) // size},
+                "messages.n": {"$gte": first, "$lt": end},
+            },
+            {"_id": 1},
+        )
+        if written is None:
+            result = await db[CHAT_COLLECTION].update_one(
+                {"_id": oid, "message_count": end}, {"$inc": {"message_count": -count}}
+            )
+            if result.modified_count:
+                logger.warning("Chat %s: messages %s..%s not stored, reservation rolled back", oid, first, end - 1)
+                return
+    except PyMongoError:
+        logger.exception("Chat %s: could not roll back reservation of messages %s..%s", oid, first, end - 1)
+    logger.error("Chat %s: messages %s..%s reserved but not stored, history has a gap", oid, first, end - 1)
+
+
+async def _push_to_bucket(
+    db: AsyncIOMotorDatabase[Any], oid: ObjectId, seq: int, entries: list[dict[str, Any]]
+) -> None:
+    update = {
+        "$push": {"messages": {"$each": entries, "$sort": {"n": 1}}},
+        "$inc": {"count": len(entries)},
+    }
+    try:
+        await db[MESSAGE_COLLECTION].update_one({"chat_id": oid, "seq": seq}, update, upsert=True)
+    except DuplicateKeyError:
+        # Корзину одновременно создал другой запрос — теперь она есть, дописываем без upsert.
+        await db[MESSAGE_COLLECTION].update_one({"chat_id": oid, "seq": seq}, update)
@@ -0,0 +1,118 @@
+"""Бенчмарк: страница истории чата на чатах разной длины — все сообщения в документе чата (find_one всего документа
++ срез в Python; aggregate с $slice/$size) против корзин chat_messages (get_history_paginated).
+Печатается время чтения первой, средней и последней страницы и объём ответа MongoDB в байтах.
+
+Нужен запущенный MongoDB (MONGO_URI). Данные пишутся во временную базу <MONGO_DB>_bench, которая удаляется в конце.
+Запуск из ai-chat-service/:
+    python benchmarks/bench_history_page.py [повторов]
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import bson
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings  # noqa: E402
+from app.core.indexes import ensure_indexes  # noqa: E402
+from app.services.chat_service import CHAT_COLLECTION, MESSAGE_COLLECTION, get_history_paginated  # noqa: E402
+
+USER_ID = 1
+PAGE_SIZE = 20
+LEGACY_COLLECTION = "chats_legacy"
+CHAT_SIZES = [100, 1_000, 10_000]
+CONTENT = "Вопрос о трудовом договоре и порядке увольнения сотрудника по соглашению сторон. " * 3
+
+
+async def _seed(db: AsyncIOMotorDatabase[Any], size: int) -> tuple[str, str]:
+    """Один и тот же чат в двух форматах: (id документа с массивом messages, id заголовка с корзинами)."""
+    now = datetime.now(timezone.utc)
+    messages = [
+        {"n": n, "role": "user" if n % 2 == 0 else "assistant", "content": CONTENT, "created_at": now}
+        for n in range(size)
+    ]
+    legacy = await db[LEGACY_COLLECTION].insert_one(
+        {"user_id": USER_ID, "messages": messages, "created_at": now, "updated_at": now}
+    )
+    bucket_size = settings.CHAT_BUCKET_SIZE
+    header = await db[CHAT_COLLECTION].insert_one(
+        {"user_id": USER_ID, "message_count": size, "bucket_size": bucket_size, "created_at": now, "updated_at": now}
+    )
+    await db[MESSAGE_COLLECTION].insert_many(
+        [
+            {"chat_id": header.inserted_id, "seq": seq, "count": len(chunk), "messages": chunk}
+            for seq, chunk in enumerate(messages[i : i + bucket_size] for i in range(0, size, bucket_size))
+        ]
+    )
+    return str(legacy.inserted_id), str(header.inserted_id)
+
+
+async def _full_document_page(db: AsyncIOMotorDatabase[Any], chat_id: str, page: int) -> int:
+    """Весь документ с messages по сети, срез в Python. Возвращает размер ответа."""
+    doc = await db[LEGACY_COLLECTION].find_one({"_id": bson.ObjectId(chat_id), "user_id": USER_ID})
+    skip = (page - 1) * PAGE_SIZE
+    _ = doc["messages"][skip : skip + PAGE_SIZE], len(doc["messages"])
+    return len(bson.encode(doc))
+
+
+async def _sliced_document_page(db: AsyncIOMotorDatabase[Any], chat_id: str, page: int) -> int:
+    """Страница и total из документа чата на стороне MongoDB: по сети только страница, но документ читается целиком."""
+    pipeline = [
+        {"$match": {"_id": bson.ObjectId(chat_id), "user_id": USER_ID}},
+        {
+            "$project": {
+                "_id": 0,
+                "total": {"$size": "$messages"},
+                "messages": {"$slice": ["$messages", (page - 1) * PAGE_SIZE, PAGE_SIZE]},
+            },
+        },
+    ]
+    docs = await db[LEGACY_COLLECTION].aggregate(pipeline).to_list(length=1)
+    return len(bson.encode(docs[0]))
+
+
+async def _bucket_page(db: AsyncIOMotorDatabase[Any], chat_id: str, page: int) -> int:
+    result = await get_history_paginated(db, USER_ID, chat_id, page=page, page_size=PAGE_SIZE)
+    return len(bson.encode({"messages": result["items"], "total": result["total"]}))
+
+
+async def _per_call(func, db: AsyncIOMotorDatabase[Any], chat_id: str, page: int, repeats: int) -> tuple[float, int]:
+    size = await func(db, chat_id, page)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        await func(db, chat_id, page)
+    return (time.perf_counter() - started) / repeats, size
+
+
+async def main(repeats: int) -> None:
+    client = AsyncIOMotorClient(settings.MONGO_URI)
+    db_name = f"{settings.MONGO_DB}_bench"
+    db = client[db_name]
+    try:
+        await ensure_indexes(db)
+        print(f"repeats: {repeats}, page_size: {PAGE_SIZE}, bucket_size: {settings.CHAT_BUCKET_SIZE}")
+        print(f"{'messages':>9} {'page':>6} {'variant':12} {'ms':>8} {'bytes':>10}")
+        for size in CHAT_SIZES:
+            legacy_id, chat_id = await _seed(db, size)
+            last = (size + PAGE_SIZE - 1) // PAGE_SIZE
+            for page in sorted({1, max(1, last // 2), last}):
+                variants = (
+                    ("find_one", _full_document_page, legacy_id),
+                    ("$slice", _sliced_document_page, legacy_id),
+                    ("buckets", _bucket_page, chat_id),
+                )
+                for name, func, ident in variants:
+                    per_call, response = await _per_call(func, db, ident, page, repeats)
+                    print(f"{size:9d} {page:6d} {name:12} {per_call * 1e3:8.2f} {response:10d}")
+    finally:
+        await client.drop_database(db_name)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
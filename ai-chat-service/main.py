@@ -5,12 +5,13 @@ import uvicorn
 from fastapi import FastAPI
 
 from app.api import router
-from app.core import init_mongodb, close_mongodb
+from app.core import init_mongodb, close_mongodb, ensure_indexes, settings
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await init_mongodb()
+    client = await init_mongodb()
+    await ensure_indexes(client[settings.MONGO_DB])
     yield
     await close_mongodb()
 
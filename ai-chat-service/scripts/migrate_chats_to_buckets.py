@@ -0,0 +1,86 @@
+"""Перевод чатов старого формата (все сообщения массивом messages в документе chats) в корзины chat_messages.
+
+Для каждого такого чата корзины записываются replace_one с upsert, затем в заголовке ставятся message_count
+и bucket_size (CHAT_BUCKET_SIZE на момент переноса) и удаляется messages — только если массив не изменился
+за время переноса (иначе чат перечитывается).
+Скрипт идемпотентен: повторный запуск дописывает только непереведённые чаты.
+Новая версия сервиса не пишет в чаты старого формата (add_messages отвечает «не найден»), поэтому
+запускать его нужно до или сразу после выкладки.
+
+Запуск из ai-chat-service/ (MONGO_URI, MONGO_DB — как у сервиса):
+    python scripts/migrate_chats_to_buckets.py [--dry-run]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings  # noqa: E402
+from app.core.indexes import ensure_indexes  # noqa: E402
+from app.services.chat_service import CHAT_COLLECTION, MESSAGE_COLLECTION  # noqa: E402
+
+ATTEMPTS = 3
+LEGACY = {"messages": {"$exists": True}}
+
+
+async def migrate_chat(db: AsyncIOMotorDatabase[Any], doc: dict[str, Any]) -> bool:
+    """Переносит сообщения одного чата в корзины. False — массив messages изменился во время переноса."""
+    messages = doc["messages"]
+    size = settings.CHAT_BUCKET_SIZE
+    for seq, start in enumerate(range(0, len(messages), size)):
+        entries = [
+            {"n": n, "role": m["role"], "content": m["content"], "created_at": m.get("created_at")}
+            for n, m in enumerate(messages[start : start + size], start=start)
+        ]
+        await db[MESSAGE_COLLECTION].replace_one(
+            {"chat_id": doc["_id"], "seq": seq},
+            {"chat_id": doc["_id"], "seq": seq, "count": len(entries), "messages": entries},
+            upsert=True,
+        )
+    result = await db[CHAT_COLLECTION].update_one(
+        {"_id": doc["_id"], "messages": {"$size": len(messages)}},
+        {"$set": {"message_count": len(messages), "bucket_size": size}, "$unset": {"messages": ""}},
+    )
+    return result.modified_count == 1
+
+
+async def migrate_one(db: AsyncIOMotorDatabase[Any], chat_id: Any) -> bool:
+    """Переносит чат, перечитывая его, если массив менялся во время переноса. False — не удалось за ATTEMPTS попыток."""
+    for _ in range(ATTEMPTS):
+        doc = await db[CHAT_COLLECTION].find_one({"_id": chat_id, **LEGACY})
+        if doc is None or await migrate_chat(db, doc):
+            return True
+    return False
+
+
+async def main(dry_run: bool) -> None:
+    client = AsyncIOMotorClient(settings.MONGO_URI)
+    db = client[settings.MONGO_DB]
+    try:
+        pending = await db[CHAT_COLLECTION].count_documents(LEGACY)
+        print(f"chats to migrate: {pending}")
+        if dry_run or not pending:
+            return
+        await ensure_indexes(db)
+        migrated = failed = 0
+        async for header in db[CHAT_COLLECTION].find(LEGACY, {"_id": 1}):
+            if await migrate_one(db, header["_id"]):
+                migrated += 1
+            else:
+                failed += 1
+                print(f"chat {header['_id']}: messages kept changing, rerun the script")
+        print(f"migrated: {migrated}, failed: {failed}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать чаты старого формата")
+    args = parser.parse_args()
+    asyncio.run(main(args.dry_run))
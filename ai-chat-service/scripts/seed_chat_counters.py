@@ -0,0 +1,67 @@
+"""Заполнение счётчиков чатов chat_counters для чатов, созданных до их появления.
+
+create_chat увеличивает счётчик (upsert) и помечает чат counted, поэтому скрипт добавляет к счётчику только чаты
+без пометки — и делает это для пользователя один раз (флаг seeded). Параллельно созданные чаты помечены и
+уже учтены через $inc, так что счётчик не расходится с числом чатов ни в какую сторону.
+Скрипт идемпотентен. Запускать один раз после выкладки, когда старые экземпляры сервиса остановлены
+(они создают чаты без пометки и без счётчика); до запуска total у таких пользователей занижен.
+
+Запуск из ai-chat-service/ (MONGO_URI, MONGO_DB — как у сервиса):
+    python scripts/seed_chat_counters.py [--dry-run]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings  # noqa: E402
+from app.services.chat_service import CHAT_COLLECTION, COUNTER_COLLECTION  # noqa: E402
+
+UNCOUNTED = {"counted": {"$exists": False}}
+
+
+async def seed_user(db: AsyncIOMotorDatabase[Any], user_id: int) -> bool:
+    """Добавляет к счётчику пользователя его чаты без пометки counted. False — счётчик уже заполнен раньше."""
+    uncounted = await db[CHAT_COLLECTION].count_documents({"user_id": user_id, **UNCOUNTED})
+    try:
+        # Счётчик с seeded не подходит под фильтр, upsert пытается вставить тот же _id — DuplicateKeyError.
+        await db[COUNTER_COLLECTION].update_one(
+            {"_id": user_id, "seeded": {"$ne": True}},
+            {"$inc": {"chats": uncounted}, "$set": {"seeded": True}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def main(dry_run: bool) -> None:
+    client = AsyncIOMotorClient(settings.MONGO_URI)
+    db = client[settings.MONGO_DB]
+    try:
+        users = await db[CHAT_COLLECTION].distinct("user_id", UNCOUNTED)
+        print(f"users with uncounted chats: {len(users)}")
+        if dry_run:
+            return
+        seeded = skipped = 0
+        for user_id in users:
+            if await seed_user(db, user_id):
+                seeded += 1
+            else:
+                skipped += 1
+        print(f"seeded: {seeded}, already seeded: {skipped}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать пользователей")
+    args = parser.parse_args()
+    asyncio.run(main(args.dry_run))
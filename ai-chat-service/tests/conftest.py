@@ -0,0 +1,27 @@
+import os
+
+import pytest
+import pytest_asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
+
+from app.core.config import settings
+
+
+@pytest_asyncio.fixture
+async def mongo_db():
+    """Пустая база <MONGO_DB>_test на MONGO_URI, удаляется после теста. Без сервера тест пропускается,
+    с MONGO_REQUIRED (CI) — падает. Индексы не создаются: тесты, которым они нужны, вызывают ensure_indexes."""
+    client = AsyncIOMotorClient(settings.MONGO_URI, serverSelectionTimeoutMS=500)
+    try:
+        await client.admin.command("ping")
+    except PyMongoError:
+        client.close()
+        if os.environ.get("MONGO_REQUIRED"):
+            raise
+        pytest.skip("MongoDB is not available")
+    name = f"{settings.MONGO_DB}_test"
+    await client.drop_database(name)
+    yield client[name]
+    await client.drop_database(name)
+    client.close()
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from app.core.indexes import INDEXES, ensure_indexes
+from app.services.chat_service import (
+    CHAT_COLLECTION,
+    CONVERSATION_SORT,
+    MESSAGE_COLLECTION,
+    conversations_filter,
+)
+
+
+def _db(existing: dict[str, dict[str, Any]]):
+    collection = MagicMock()
+    collection.index_information = AsyncMock(return_value=existing)
+    collection.create_indexes = AsyncMock(side_effect=lambda models: [m.document["name"] for m in models])
+    db = MagicMock()
+    db.__getitem__.return_value = collection
+    return db, collection
+
+
+DECLARED = {"chats": [IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING)], name="user_id_updated_at")]}
+
+
+class TestEnsureIndexes:
+    @pytest.mark.asyncio
+    async def test_creates_missing(self):
+        db, collection = _db({"_id_": {"key": [("_id", 1)]}})
+        report = await ensure_indexes(db, DECLARED)
+        assert report == {"chats": {"created": ["user_id_updated_at"], "extra": []}}
+        collection.create_indexes.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_existing_by_keys_not_recreated(self):
+        """Индекс с теми же ключами под другим именем (или с ключами float, как бывает в index_information) — есть."""
+        db, collection = _db(
+            {"_id_": {"key": [("_id", 1)]}, "manual": {"key": [("user_id", 1.0), ("updated_at", -1.0)]}}
+        )
+        report = await ensure_indexes(db, DECLARED)
+        assert report == {"chats": {"created": [], "extra": []}}
+        collection.create_indexes.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_reports_extra_without_dropping(self):
+        db, collection = _db(
+            {
+                "_id_": {"key": [("_id", 1)]},
+                "user_id_updated_at": {"key": [("user_id", 1), ("updated_at", -1)]},
+                "user_id_1": {"key": [("user_id", 1)]},
+            }
+        )
+        report = await ensure_indexes(db, DECLARED)
+        assert report == {"chats": {"created": [], "extra": ["user_id_1"]}}
+        collection.drop_index.assert_not_called()
+
+
+def _plan_stages(plan: Any) -> list[dict[str, Any]]:
+    """Все стадии плана из explain, в том числе вложенные (формат classic и SBE)."""
+    if isinstance(plan, list):
+        return [stage for item in plan for stage in _plan_stages(item)]
+    if not isinstance(plan, dict):
+        return []
+    stages = [plan] if "stage" in plan else []
+    return stages + [stage for value in plan.values() for stage in _plan_stages(value)]
+
+
+class TestIndexUsage:
+    @pytest.mark.asyncio
+    async def test_startup_is_idempotent(self, mongo_db):
+        first = await ensure_indexes(mongo_db)
+        second = await ensure_indexes(mongo_db)
+        assert first[CHAT_COLLECTION]["created"] == [m.document["name"] for m in INDEXES[CHAT_COLLECTION]]
+        assert all(entry == {"created": [], "extra": []} for entry in second.values())
+
+    @pytest.mark.asyncio
+    async def test_conversations_page_uses_index(self, mongo_db):
+        await ensure_indexes(mongo_db)
+        now = datetime.now(timezone.utc)
+        result = await mongo_db[CHAT_COLLECTION].insert_many(
+            [
+                {"user_id": i % 10, "message_count": 0, "created_at": now, "updated_at": now - timedelta(minutes=i)}
+                for i in range(200)
+            ]
+        )
+        after = (now - timedelta(minutes=50), result.inserted_ids[50])
+        for query in (conversations_filter(3), conversations_filter(3, after)):
+            cursor = mongo_db[CHAT_COLLECTION].find(query).sort(CONVERSATION_SORT).limit(21)
+            stages = _plan_stages(await cursor.explain())
+            assert any(s["stage"] == "IXSCAN" and s.get("indexName") == "user_id_updated_at_id" for s in stages)
+            assert not any(s["stage"] in ("COLLSCAN", "SORT") for s in stages)
+
+    @pytest.mark.asyncio
+    async def test_history_page_uses_bucket_index(self, mongo_db):
+        await ensure_indexes(mongo_db)
+        cursor = mongo_db[MESSAGE_COLLECTION].find({"chat_id": "x", "seq": {"$gte": 1, "$lte": 2}}).sort("seq", 1)
+        stages = _plan_stages(await cursor.explain())
+        assert any(s["stage"] == "IXSCAN" and s.get("indexName") == "chat_id_seq" for s in stages)
@@ -0,0 +1,276 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+import pytest_asyncio
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+
+from app.core.config import settings
+from app.core.indexes import ensure_indexes
+from app.services import chat_service
+from app.services.chat_service import (
+    CHAT_COLLECTION,
+    MESSAGE_COLLECTION,
+    add_messages,
+    conversations_filter,
+    create_chat,
+    decode_cursor,
+    encode_cursor,
+    get_all_conversations_paginated,
+    get_history,
+    get_history_paginated,
+)
+from scripts import migrate_chats_to_buckets as migration
+from scripts import seed_chat_counters as seed_counters
+
+
+class TestCursor:
+    def test_round_trip(self):
+        doc = {"_id": ObjectId(), "updated_at": datetime(2025, 3, 1, 12, 30, 15, 123000)}
+        assert decode_cursor(encode_cursor(doc)) == (doc["updated_at"], doc["_id"])
+
+    @pytest.mark.parametrize("cursor", ["not base64!", "e30=", "eyJ1IjogIngiLCAiaWQiOiAieSJ9"])
+    def test_invalid_cursor_raises(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+    def test_filter_after_cursor(self):
+        updated_at, oid = datetime(2025, 3, 1), ObjectId()
+        assert conversations_filter(7) == {"user_id": 7}
+        assert conversations_filter(7, (updated_at, oid)) == {
+            "user_id": 7,
+            "updated_at": {"$lte": updated_at},
+            "$or": [{"updated_at": {"$lt": updated_at}}, {"_id": {"$lt": oid}}],
+        }
+
+
+class TestConversations:
+    @pytest.mark.asyncio
+    async def test_cursor_walks_all_chats_once(self, mongo_db):
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        # Одинаковые updated_at у соседних чатов — порядок между ними задаёт _id.
+        await mongo_db[CHAT_COLLECTION].insert_many(
+            [{"user_id": 1, "message_count": 0, "updated_at": now - timedelta(seconds=i // 3)} for i in range(45)]
+        )
+        await seed_counters.seed_user(mongo_db, 1)
+        offset = await get_all_conversations_paginated(mongo_db, 1, page=1, page_size=45)
+        seen, cursor = [], None
+        while True:
+            page = await get_all_conversations_paginated(mongo_db, 1, page_size=10, cursor=cursor)
+            seen += [item["chat_id"] for item in page["items"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == [item["chat_id"] for item in offset["items"]]
+        assert page["total"] == 45
+
+    @pytest.mark.asyncio
+    async def test_offset_page_gives_cursor_to_next(self, mongo_db):
+        for _ in range(5):
+            await create_chat(mongo_db, 1)
+        first = await get_all_conversations_paginated(mongo_db, 1, page=1, page_size=2)
+        by_cursor = await get_all_conversations_paginated(mongo_db, 1, page_size=2, cursor=first["next_cursor"])
+        by_page = await get_all_conversations_paginated(mongo_db, 1, page=2, page_size=2)
+        assert by_cursor["items"] == by_page["items"]
+
+    @pytest.mark.asyncio
+    async def test_counter_counts_created_chats(self, mongo_db):
+        assert (await get_all_conversations_paginated(mongo_db, 2))["total"] == 0
+        for _ in range(3):
+            await create_chat(mongo_db, 2)
+        assert (await get_all_conversations_paginated(mongo_db, 2))["total"] == 3
+
+
+class TestSeedCounters:
+    @pytest.mark.asyncio
+    async def test_old_chats_added_once(self, mongo_db):
+        now = datetime.now(timezone.utc)
+        await mongo_db[CHAT_COLLECTION].insert_many([{"user_id": 2, "updated_at": now} for _ in range(3)])
+        await create_chat(mongo_db, 2)
+        assert await seed_counters.seed_user(mongo_db, 2)
+        assert not await seed_counters.seed_user(mongo_db, 2)
+        assert (await get_all_conversations_paginated(mongo_db, 2))["total"] == 4
+
+    @pytest.mark.asyncio
+    async def test_concurrent_creates_while_seeding(self, mongo_db):
+        now = datetime.now(timezone.utc)
+        await mongo_db[CHAT_COLLECTION].insert_many([{"user_id": 3, "updated_at": now} for _ in range(5)])
+        await asyncio.gather(
+            *(create_chat(mongo_db, 3) for _ in range(10)),
+            seed_counters.seed_user(mongo_db, 3),
+            *(create_chat(mongo_db, 3) for _ in range(10)),
+            seed_counters.seed_user(mongo_db, 3),
+            *(get_all_conversations_paginated(mongo_db, 3) for _ in range(5)),
+        )
+        total = (await get_all_conversations_paginated(mongo_db, 3))["total"]
+        assert total == await mongo_db[CHAT_COLLECTION].count_documents({"user_id": 3}) == 25
+
+
+def _numbered(start: int, end: int) -> list[dict[str, str]]:
+    return [{"role": "user" if n % 2 == 0 else "assistant", "content": str(n)} for n in range(start, end)]
+
+
+async def _contents(db, chat_id: str) -> list[str]:
+    return [m["content"] for m in await get_history(db, 1, chat_id)]
+
+
+async def _buckets(db, chat_id: str) -> list[tuple[int, int, list[int]]]:
+    docs = await db[MESSAGE_COLLECTION].find({"chat_id": ObjectId(chat_id)}).sort("seq", 1).to_list(length=None)
+    return [(d["seq"], d["count"], [m["n"] for m in d["messages"]]) for d in docs]
+
+
+class TestMessageBuckets:
+    """Корзины по 3 сообщения — границы корзин на коротких чатах."""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def indexes(self, mongo_db):
+        # Уникальный chat_id_seq: без него параллельные upsert создают дубли корзин.
+        await ensure_indexes(mongo_db)
+
+    @pytest.fixture(autouse=True)
+    def small_buckets(self, monkeypatch):
+        monkeypatch.setattr(settings, "CHAT_BUCKET_SIZE", 3)
+
+    @pytest.mark.asyncio
+    async def test_append_crosses_bucket_boundary(self, mongo_db):
+        chat_id = await create_chat(mongo_db, 1)
+        await add_messages(mongo_db, 1, chat_id, _numbered(0, 2))
+        await add_messages(mongo_db, 1, chat_id, _numbered(2, 5))
+        assert await _buckets(mongo_db, chat_id) == [(0, 3, [0, 1, 2]), (1, 2, [3, 4])]
+        assert await _contents(mongo_db, chat_id) == [str(n) for n in range(5)]
+
+    @pytest.mark.asyncio
+    async def test_page_spans_two_buckets(self, mongo_db):
+        chat_id = await create_chat(mongo_db, 1)
+        await add_messages(mongo_db, 1, chat_id, _numbered(0, 10))
+        page = await get_history_paginated(mongo_db, 1, chat_id, page=2, page_size=4)
+        assert [m["content"] for m in page["items"]] == ["4", "5", "6", "7"]
+        assert page["total"] == 10
+
+    @pytest.mark.asyncio
+    async def test_page_past_end(self, mongo_db):
+        chat_id = await create_chat(mongo_db, 1)
+        await add_messages(mongo_db, 1, chat_id, _numbered(0, 10))
+        last = await get_history_paginated(mongo_db, 1, chat_id, page=3, page_size=4)
+        past = await get_history_paginated(mongo_db, 1, chat_id, page=4, page_size=4)
+        assert [m["content"] for m in last["items"]] == ["8", "9"]
+        assert past["items"] == [] and past["total"] == 10
+
+    @pytest.mark.asyncio
+    async def test_concurrent_appends_keep_order(self, mongo_db):
+        chat_id = await create_chat(mongo_db, 1)
+        turns = [[{"role": "user", "content": f"q{i}"}, {"role": "assistant", "content": f"a{i}"}] for i in range(20)]
+        await asyncio.gather(*(add_messages(mongo_db, 1, chat_id, turn) for turn in turns))
+        history = await get_history(mongo_db, 1, chat_id)
+        assert len(history) == 40
+        # Вопрос и ответ одного вызова — соседние сообщения, в каждой корзине номера по порядку.
+        for question, answer in zip(history[::2], history[1::2]):
+            assert question["role"] == "user" and answer["role"] == "assistant"
+            assert question["content"][1:] == answer["content"][1:]
+        assert sorted(m["content"] for m in history[::2]) == sorted(f"q{i}" for i in range(20))
+        assert [n for _, _, numbers in await _buckets(mongo_db, chat_id) for n in numbers] == list(range(40))
+
+    @pytest.mark.asyncio
+    async def test_bucket_size_taken_from_header(self, mongo_db, monkeypatch):
+        chat_id = await create_chat(mongo_db, 1)
+        await add_messages(mongo_db, 1, chat_id, _numbered(0, 5))
+        monkeypatch.setattr(settings, "CHAT_BUCKET_SIZE", 50)
+        await add_messages(mongo_db, 1, chat_id, _numbered(5, 7))
+        assert [seq for seq, _, _ in await _buckets(mongo_db, chat_id)] == [0, 1, 2]
+        page = await get_history_paginated(mongo_db, 1, chat_id, page=2, page_size=4)
+        assert [m["content"] for m in page["items"]] == ["4", "5", "6"]
+
+    @pytest.mark.asyncio
+    async def test_failed_push_releases_numbers(self, mongo_db, monkeypatch):
+        chat_id = await create_chat(mongo_db, 1)
+        await add_messages(mongo_db, 1, chat_id, _numbered(0, 2))
+        with monkeypatch.context() as patched:
+            patched.setattr(chat_service, "_push_to_bucket", AsyncMock(side_effect=PyMongoError("write failed")))
+            with pytest.raises(PyMongoError):
+                await add_messages(mongo_db, 1, chat_id, _numbered(2, 4))
+        assert (await mongo_db[CHAT_COLLECTION].find_one({"_id": ObjectId(chat_id)}))["message_count"] == 2
+        await add_messages(mongo_db, 1, chat_id, _numbered(2, 4))
+        assert await _contents(mongo_db, chat_id) == ["0", "1", "2", "3"]
+
+    @pytest.mark.asyncio
+    async def test_gap_logged_when_numbers_reserved_after(self, mongo_db, monkeypatch, caplog):
+        chat_id = await create_chat(mongo_db, 1)
+
+        async def push_after_other_writer(db, oid, seq, entries):
+            await db[CHAT_COLLECTION].update_one({"_id": oid}, {"$inc": {"message_count": 2}})
+            raise PyMongoError("write failed")
+
+        monkeypatch.setattr(chat_service, "_push_to_bucket", push_after_other_writer)
+        with caplog.at_level(logging.ERROR, logger=chat_service.__name__), pytest.raises(PyMongoError):
+            await add_messages(mongo_db, 1, chat_id, _numbered(0, 2))
+        assert (await mongo_db[CHAT_COLLECTION].find_one({"_id": ObjectId(chat_id)}))["message_count"] == 4
+        assert "history has a gap" in caplog.text
+
+
+async def _legacy_chat(db, count: int) -> ObjectId:
+    now = datetime.now(timezone.utc)
+    result = await db[CHAT_COLLECTION].insert_one(
+        {
+            "user_id": 1,
+            "messages": [{**m, "created_at": now} for m in _numbered(0, count)],
+            "created_at": now,
+            "updated_at": now,
+        }
+    )
+    return result.inserted_id
+
+
+class TestMigration:
+    @pytest.fixture(autouse=True)
+    def small_buckets(self, monkeypatch):
+        monkeypatch.setattr(settings, "CHAT_BUCKET_SIZE", 3)
+
+    @pytest.mark.asyncio
+    async def test_legacy_chat_moved_to_buckets(self, mongo_db):
+        oid = await _legacy_chat(mongo_db, 7)
+        assert await migration.migrate_one(mongo_db, oid)
+        header = await mongo_db[CHAT_COLLECTION].find_one({"_id": oid})
+        assert "messages" not in header
+        assert (header["message_count"], header["bucket_size"]) == (7, 3)
+        assert await _buckets(mongo_db, str(oid)) == [(0, 3, [0, 1, 2]), (1, 3, [3, 4, 5]), (2, 1, [6])]
+        assert await _contents(mongo_db, str(oid)) == [str(n) for n in range(7)]
+        # Повторный запуск ничего не меняет.
+        assert await migration.migrate_one(mongo_db, oid)
+        assert await _contents(mongo_db, str(oid)) == [str(n) for n in range(7)]
+
+    @pytest.mark.asyncio
+    async def test_array_changed_during_migration_is_retried(self, mongo_db, monkeypatch):
+        oid = await _legacy_chat(mongo_db, 4)
+        migrate_chat, seen = migration.migrate_chat, []
+
+        async def racing(db, doc):
+            seen.append(len(doc["messages"]))
+            if len(seen) == 1:
+                # Старая версия сервиса дописала сообщение, пока чат переносился.
+                await db[CHAT_COLLECTION].update_one(
+                    {"_id": oid}, {"$push": {"messages": {"role": "user", "content": "4", "created_at": None}}}
+                )
+            return await migrate_chat(db, doc)
+
+        monkeypatch.setattr(migration, "migrate_chat", racing)
+        assert await migration.migrate_one(mongo_db, oid)
+        assert seen == [4, 5]
+        assert await _contents(mongo_db, str(oid)) == [str(n) for n in range(5)]
+
+    @pytest.mark.asyncio
+    async def test_gives_up_when_array_keeps_changing(self, mongo_db, monkeypatch):
+        oid = await _legacy_chat(mongo_db, 2)
+        migrate_chat = migration.migrate_chat
+
+        async def always_racing(db, doc):
+            await db[CHAT_COLLECTION].update_one(
+                {"_id": oid}, {"$push": {"messages": {"role": "user", "content": "x", "created_at": None}}}
+            )
+            return await migrate_chat(db, doc)
+
+        monkeypatch.setattr(migration, "migrate_chat", always_racing)
+        assert not await migration.migrate_one(mongo_db, oid)
+        assert "messages" in await mongo_db[CHAT_COLLECTION].find_one({"_id": oid})
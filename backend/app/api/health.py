@@ -1,11 +1,16 @@
 """Health check эндпоинты для load balancer и Kubernetes."""
-from fastapi import APIRouter, Depends
+import secrets
+
+from fastapi import APIRouter, Depends, Header
 from fastapi.responses import JSONResponse
 from redis.asyncio import Redis
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.database import get_session
+from app.core.exceptions import NotFoundError, UnauthorizedError
+from app.core.metrics import collect_metrics
 from app.core.redis import get_redis
 
 router = APIRouter(tags=["health"])
@@ -29,3 +34,19 @@ async def ready(
         return {"status": "ready"}
     except Exception:
         return JSONResponse(status_code=503, content={"status": "unhealthy"})
+
+
+def require_metrics_token(authorization: str | None = Header(default=None)) -> None:
+    """Метрики раскрывают внутреннее состояние воркера: без METRICS_TOKEN эндпоинта нет,
+    с ним — только по заголовку Authorization: Bearer <METRICS_TOKEN>."""
+    if not settings.METRICS_TOKEN:
+        raise NotFoundError()
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        raise UnauthorizedError()
+
+
+@router.get("/metrics", summary="Metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+async def metrics():
+    """Снимок метрик текущего воркера (пулы соединений и т.п.) для подбора размеров под нагрузкой."""
+    return collect_metrics()
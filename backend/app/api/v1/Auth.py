@@ -3,12 +3,13 @@ import jwt
 from fastapi import APIRouter, Depends, Request, Response
 
 from app.core.logging import get_logger
-from app.core.rate_limit import limiter
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core import get_redis, get_session
+from app.core.config import settings
 from app.core.dependencies import get_company_repo, get_user_repo
+from app.core.rate_limit import limiter, rate_limit
 from app.core.security import (
     ACCESS_TOKEN_COOKIE_MAX_AGE,
     REFRESH_TOKEN_COOKIE_MAX_AGE,
@@ -16,6 +17,7 @@ from app.core.security import (
     decode_token,
     set_token,
 )
+from app.core.token_cache import access_token_cache
 from app.repository import CompanyRepository, UserRepository
 from app.schemas import Confirm, Login, UserCreate
 from app.services import AuthService
@@ -35,10 +37,9 @@ router = APIRouter(prefix="/auth", tags=["auth"])
         429: {"description": "Превышен лимит запросов (10/мин)"},
     },
 )
-@limiter.limit("10/minute")
 async def register(
-    request: Request,
     user: UserCreate,
+    _: None = Depends(rate_limit("10/minute", "auth_register")),
     session: AsyncSession = Depends(get_session),
     redis: Redis = Depends(get_redis),
     user_repo: UserRepository = Depends(get_user_repo),
@@ -78,17 +79,18 @@ async def confirm_register(
     responses={
         200: {"description": "Код отправлен на email", "content": {"application/json": {"example": {"jti": "550e8400-e29b-41d4-a716-446655440000"}}}},
         401: {"description": "Неверный email или пароль"},
-        429: {"description": "Превышен лимит запросов (10/мин)"},
+        429: {"description": "Превышен лимит запросов (10/мин с IP или 5/мин на аккаунт)"},
     },
 )
-@limiter.limit("10/minute")
 async def login(
-    request: Request,
     data: Login,
+    _: None = Depends(rate_limit("10/minute", "auth_login")),
     session: AsyncSession = Depends(get_session),
     redis: Redis = Depends(get_redis),
     user_repo: UserRepository = Depends(get_user_repo),
 ):
+    # Лимит на аккаунт — подбор пароля к одному email с разных IP.
+    await limiter.hit(redis, "auth_login_account", data.email.lower(), settings.RATE_LIMIT_LOGIN_PER_ACCOUNT)
     jti = await AuthService.login(session, redis, user_repo, data)
     return {"jti": str(jti)}
 
@@ -128,6 +130,9 @@ async def logout(
     response: Response,
     redis: Redis = Depends(get_redis),
 ):
+    access_token = request.cookies.get("access_token")
+    if access_token:
+        access_token_cache.discard(access_token)
     refresh_token = request.cookies.get("refresh_token")
     if refresh_token:
         try:
@@ -1,48 +1,123 @@
 """Прокси запросов чата в AI-микросервис. Требует аутентификации (cookies)."""
+from collections.abc import AsyncIterator
+
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 import httpx
 
 from app.core.config import settings
 from app.core.dependencies import get_user_id
+from app.core.http_client import ai_chat_timeout, get_ai_chat_client
+from app.core.logging import get_logger
 
+logger = get_logger(__name__)
 router = APIRouter(prefix="/chat", tags=["chat"])
 _BASE = f"{settings.AI_CHAT_SERVICE_URL.rstrip('/')}/ai_chat/v1/chat"
+# Заголовки ответа уже отправлены — об обрыве апстрима сообщаем SSE-событием error.
+_STREAM_BROKEN = b'event: error\ndata: {"status_code": 503, "detail": "AI chat service unavailable"}\n\n'
+# Тайм-ауты подключения и ожидания пула — тоже «сервис недоступен», а не «не дождались ответа».
+_UNAVAILABLE = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
 
 
 class ChatMessageIn(BaseModel):
     message: str
     chat_id: str | None = None
+    stream: bool = False
 
 
 def _headers(user_id: int) -> dict[str, str]:
     return {"X-User-Id": str(user_id)}
 
 
+def _transport_error(e: httpx.HTTPError) -> HTTPException:
+    """Ошибка до ответа AI-сервиса: нет соединения/пул занят → 503, не дождались ответа → 504, обрыв или
+    сбой протокола → 502."""
+    if isinstance(e, _UNAVAILABLE):
+        return HTTPException(status_code=503, detail="AI chat service unavailable")
+    if isinstance(e, httpx.TimeoutException):
+        return HTTPException(status_code=504, detail="AI chat service timeout")
+    logger.warning("AI chat request failed: %r", e)
+    return HTTPException(status_code=502, detail="AI chat service error")
+
+
+async def _request_json(client: httpx.AsyncClient, method: str, url: str, timeout: httpx.Timeout, **kwargs):
+    """Запрос к AI-сервису с маппингом ошибок: статус апстрима — как есть, остальное — см. _transport_error."""
+    try:
+        r = await client.request(method, url, timeout=timeout, **kwargs)
+        r.raise_for_status()
+        return r.json()
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except httpx.HTTPError as e:
+        raise _transport_error(e) from e
+
+
+async def _relay(upstream: httpx.Response) -> AsyncIterator[bytes]:
+    """Отдаёт тело апстрима байт в байт, не накапливая его в памяти."""
+    try:
+        async for chunk in upstream.aiter_raw():
+            yield chunk
+    except httpx.HTTPError as e:
+        logger.warning("AI chat stream interrupted: %s", e)
+        yield _STREAM_BROKEN
+    finally:
+        await upstream.aclose()
+
+
+async def _proxy_stream(client: httpx.AsyncClient, url: str, payload: dict, user_id: int) -> StreamingResponse:
+    """Открывает потоковый запрос к AI-сервису. Ошибки до начала тела маппятся как в обычном режиме."""
+    request = client.build_request(
+        "POST",
+        url,
+        json=payload,
+        headers=_headers(user_id),
+        timeout=ai_chat_timeout(settings.AI_CHAT_STREAM_READ_TIMEOUT),
+    )
+    try:
+        upstream = await client.send(request, stream=True)
+    except httpx.HTTPError as e:
+        raise _transport_error(e) from e
+    if upstream.is_error:
+        try:
+            await upstream.aread()
+        except httpx.HTTPError as e:
+            raise _transport_error(e) from e
+        finally:
+            await upstream.aclose()
+        raise HTTPException(status_code=upstream.status_code, detail=upstream.text)
+    return StreamingResponse(
+        _relay(upstream),
+        status_code=upstream.status_code,
+        media_type=upstream.headers.get("content-type"),
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("", summary="Отправить сообщение в чат с ИИ")
 async def chat(
     body: ChatMessageIn,
     user_id: int = Depends(get_user_id),
+    client: httpx.AsyncClient = Depends(get_ai_chat_client),
 ):
+    """При stream=true ответ AI-сервиса (text/event-stream) передаётся клиенту по мере генерации."""
     url = f"{_BASE}"
     payload = {"message": body.message}
     if body.chat_id is not None:
         payload["chat_id"] = body.chat_id
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            r = await client.post(url, json=payload, headers=_headers(user_id))
-            r.raise_for_status()
-            return r.json()
-        except httpx.ConnectError:
-            raise HTTPException(status_code=503, detail="AI chat service unavailable")
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    if body.stream:
+        payload["stream"] = True
+        return await _proxy_stream(client, url, payload, user_id)
+    return await _request_json(
+        client, "POST", url, ai_chat_timeout(settings.AI_CHAT_TIMEOUT), json=payload, headers=_headers(user_id)
+    )
 
 
 @router.get("/history", summary="История переписки с пагинацией")
 async def get_chat_history(
     user_id: int = Depends(get_user_id),
+    client: httpx.AsyncClient = Depends(get_ai_chat_client),
     chat_id: str = Query(..., description="ID чата"),
     page: int = 1,
     page_size: int = 20,
@@ -50,31 +125,25 @@ async def get_chat_history(
     """Возвращает историю сообщений в указанном чате (items, total, page, page_size)."""
     url = f"{_BASE}/history"
     params = {"chat_id": chat_id, "page": page, "page_size": page_size}
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            r = await client.get(url, params=params, headers=_headers(user_id))
-            r.raise_for_status()
-            return r.json()
-        except httpx.ConnectError:
-            raise HTTPException(status_code=503, detail="AI chat service unavailable")
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    return await _request_json(
+        client, "GET", url, ai_chat_timeout(settings.AI_CHAT_LIST_TIMEOUT), params=params, headers=_headers(user_id)
+    )
 
 
 @router.get("/conversations", summary="Список всех переписок с пагинацией")
 async def get_conversations(
     user_id: int = Depends(get_user_id),
+    client: httpx.AsyncClient = Depends(get_ai_chat_client),
     page: int = 1,
     page_size: int = 20,
+    cursor: str | None = Query(None, description="next_cursor предыдущей страницы; с ним page не учитывается"),
 ):
-    """Возвращает список чатов только текущего пользователя (chat_id, updated_at, message_count) с пагинацией."""
+    """Возвращает список чатов только текущего пользователя (chat_id, updated_at, message_count) с пагинацией.
+    Следующая страница — по page или по cursor из next_cursor (cursor дешевле на дальних страницах)."""
     url = f"{_BASE}/conversations"
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            r = await client.get(url, params={"page": page, "page_size": page_size}, headers=_headers(user_id))
-            r.raise_for_status()
-            return r.json()
-        except httpx.ConnectError:
-            raise HTTPException(status_code=503, detail="AI chat service unavailable")
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    params = {"page": page, "page_size": page_size}
+    if cursor is not None:
+        params["cursor"] = cursor
+    return await _request_json(
+        client, "GET", url, ai_chat_timeout(settings.AI_CHAT_LIST_TIMEOUT), params=params, headers=_headers(user_id)
+    )
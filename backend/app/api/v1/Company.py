@@ -4,7 +4,7 @@ from fastapi.responses import Response
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core import get_redis, get_session, get_user_id
+from app.core import get_redis, get_read_session, get_session, get_user_id
 from app.core.dependencies import get_company_repo
 from app.core.security import ACCESS_TOKEN_COOKIE_MAX_AGE, set_token
 from app.repository import CompanyRepository
@@ -50,7 +50,7 @@ async def create_company(
     },
 )
 async def get_company(
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     redis: Redis = Depends(get_redis),
     user_id: int = Depends(get_user_id),
     company_repo: CompanyRepository = Depends(get_company_repo),
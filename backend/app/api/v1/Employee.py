@@ -1,13 +1,24 @@
 """Эндпоинты управления сотрудниками. Требуют аутентификации и наличие компании (cookies)."""
-from fastapi import APIRouter, Body, Depends, HTTPException
+from datetime import date
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core import get_redis, get_session
+from app.core import get_redis, get_read_session, get_session
 from app.core.dependencies import get_company_id, get_employee_repo
 from app.repository import EmployeeRepository
-from app.schemas import EmployeeCreate, EmployeeResponse, EmployeeUpdate
-from app.services import EmployeeService
+from app.schemas import (
+    EmployeeBatch,
+    EmployeeCreate,
+    EmployeeImportReport,
+    EmployeePage,
+    EmployeeResponse,
+    EmployeeUpdate,
+)
+from app.services import EmployeeExportService, EmployeeImportService, EmployeeService
 
 router = APIRouter(prefix="/employee", tags=["employee"])
 
@@ -15,21 +26,48 @@ router = APIRouter(prefix="/employee", tags=["employee"])
 @router.get(
     "/",
     summary="Список сотрудников",
-    description="Возвращает всех сотрудников компании текущего пользователя.",
-    response_model=list[EmployeeResponse],
+    description=(
+        "Возвращает страницу сотрудников компании текущего пользователя. "
+        "Следующая страница — тот же запрос с `cursor` из `next_cursor` (null на последней странице). "
+        "Фильтры: status, position, hire_date_from/hire_date_to. `include_total=true` добавляет общее число."
+    ),
+    response_model=EmployeePage,
     responses={
-        200: {"description": "Список сотрудников"},
+        200: {"description": "Страница сотрудников"},
+        400: {"description": "Некорректный курсор"},
         401: {"description": "Не авторизован или нет компании"},
     },
 )
 async def list_employees(
+    limit: int = Query(50, ge=1, le=200, description="Размер страницы"),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    sort: Literal["id", "last_name", "hire_date"] = Query("id", description="Ключ сортировки"),
+    order: Literal["asc", "desc"] = Query("asc"),
+    status: Optional[str] = Query(None, max_length=150),
+    position: Optional[str] = Query(None, max_length=150),
+    hire_date_from: Optional[date] = Query(None),
+    hire_date_to: Optional[date] = Query(None),
+    include_total: bool = Query(False, description="Посчитать общее число сотрудников по фильтрам"),
     company_id: int | None = Depends(get_company_id),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     employee_repo: EmployeeRepository = Depends(get_employee_repo),
 ):
     if company_id is None:
         raise HTTPException(status_code=401, detail="You do not have a company yet")
-    return await EmployeeService.list_employees(session, employee_repo, company_id)
+    return await EmployeeService.list_employees(
+        session,
+        employee_repo,
+        company_id,
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        descending=order == "desc",
+        include_total=include_total,
+        status=status,
+        position=position,
+        hire_date_from=hire_date_from,
+        hire_date_to=hire_date_to,
+    )
 
 
 @router.post(
@@ -54,6 +92,103 @@ async def create_employee(
     return await EmployeeService.create_employee(session, redis, employee_repo, employee, company_id)
 
 
+@router.post(
+    "/import",
+    summary="Импорт сотрудников из файла",
+    description=(
+        "Принимает CSV (UTF-8, разделитель `,` или `;`) или XLSX. Первая строка — заголовок с именами полей "
+        "как в `POST /v1/employee/`. Невалидные строки пропускаются и возвращаются в отчёте с номерами строк."
+    ),
+    response_model=EmployeeImportReport,
+    responses={
+        200: {"description": "Отчёт об импорте"},
+        400: {"description": "Неподдерживаемый формат, нет нужных колонок или файл не читается"},
+        401: {"description": "Не авторизован или нет компании"},
+    },
+)
+async def import_employees(
+    file: UploadFile = File(..., description="Файл .csv или .xlsx"),
+    company_id: int | None = Depends(get_company_id),
+    session: AsyncSession = Depends(get_session),
+    employee_repo: EmployeeRepository = Depends(get_employee_repo),
+):
+    if company_id is None:
+        raise HTTPException(status_code=401, detail="You do not have a company yet")
+    return await EmployeeImportService.import_employees(
+        session, employee_repo, file.file, file.filename or "", company_id
+    )
+
+
+@router.get(
+    "/export",
+    summary="Выгрузка сотрудников",
+    description=(
+        "Потоково выгружает сотрудников компании в CSV, NDJSON или XLSX. "
+        "`columns` — список колонок через запятую (по умолчанию все). Фильтры — как у списка."
+    ),
+    response_class=StreamingResponse,
+    responses={
+        200: {"description": "Файл выгрузки"},
+        400: {"description": "Неизвестная колонка или формат недоступен"},
+        401: {"description": "Не авторизован или нет компании"},
+    },
+)
+async def export_employees(
+    format: Literal["csv", "ndjson", "xlsx"] = Query("csv", description="Формат файла"),
+    columns: Optional[str] = Query(None, description="Колонки через запятую, например id,last_name,email"),
+    status: Optional[str] = Query(None, max_length=150),
+    position: Optional[str] = Query(None, max_length=150),
+    hire_date_from: Optional[date] = Query(None),
+    hire_date_to: Optional[date] = Query(None),
+    company_id: int | None = Depends(get_company_id),
+    session: AsyncSession = Depends(get_read_session),
+    employee_repo: EmployeeRepository = Depends(get_employee_repo),
+):
+    if company_id is None:
+        raise HTTPException(status_code=401, detail="You do not have a company yet")
+    chunks = EmployeeExportService.export_employees(
+        session,
+        employee_repo,
+        company_id,
+        format,
+        EmployeeExportService.parse_columns(columns),
+        status=status,
+        position=position,
+        hire_date_from=hire_date_from,
+        hire_date_to=hire_date_to,
+    )
+    return StreamingResponse(
+        chunks,
+        media_type=EmployeeExportService.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="employees.{format}"'},
+    )
+
+
+@router.post(
+    "/batch-get",
+    summary="Получить нескольких сотрудников",
+    description=(
+        "Возвращает сотрудников по списку id (до 200) за один запрос. "
+        "Id, которых нет или которые принадлежат другой компании, перечислены в `not_found`."
+    ),
+    response_model=EmployeeBatch,
+    responses={
+        200: {"description": "Найденные сотрудники"},
+        401: {"description": "Не авторизован или нет компании"},
+    },
+)
+async def get_employees_batch(
+    employee_ids: list[int] = Body(..., min_length=1, max_length=200, description="Список id сотрудников"),
+    company_id: int | None = Depends(get_company_id),
+    session: AsyncSession = Depends(get_read_session),
+    redis: Redis = Depends(get_redis),
+    employee_repo: EmployeeRepository = Depends(get_employee_repo),
+):
+    if company_id is None:
+        raise HTTPException(status_code=401, detail="You do not have a company yet")
+    return await EmployeeService.get_employees_batch(session, redis, employee_repo, employee_ids, company_id)
+
+
 @router.get(
     "/{employee_id}",
     summary="Получить сотрудника",
@@ -68,7 +203,7 @@ async def create_employee(
 async def get_employee(
     employee_id: int,
     company_id: int | None = Depends(get_company_id),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     redis: Redis = Depends(get_redis),
     employee_repo: EmployeeRepository = Depends(get_employee_repo),
 ):
@@ -1,7 +1,8 @@
 from .logging import get_logger
 from .validators import validation_of_phone_number
-from .security import get_password_hash, verify_password, create_token, decode_token, set_token, send_code_email_gmail
-from .database import get_session
+from .security import get_password_hash, verify_password, create_token, decode_token, set_token
+from .hashing import hash_password, check_password
+from .database import get_session, get_read_session
 from .redis import get_redis
 from .dependencies import get_user_id
 
@@ -11,11 +12,13 @@ __all__ = [
     "validation_of_phone_number",
     "get_password_hash",
     "verify_password",
+    "hash_password",
+    "check_password",
     "create_token",
     "decode_token",
     "set_token",
     "get_session",
+    "get_read_session",
     "get_redis",
-    "send_code_email_gmail",
     "get_user_id",
 ]
@@ -0,0 +1,414 @@
+"""Двухуровневый кэш сущностей: L1 — LRU с TTL в памяти воркера, L2 — Redis, общий для всех воркеров.
+В L1 лежат готовые pydantic-модели, поэтому горячие ключи не ходят в Redis и не декодируют JSON.
+При изменении сущности воркер публикует её ключ в канал cache_invalidation, и каждый воркер удаляет свою
+копию из L1. Сообщение может потеряться (переподключение к Redis), поэтому TTL в L1 короткий (CACHE_LOCAL_TTL).
+
+Защита от «стада» при истечении ключа (get_or_load): в воркере загрузку одного ключа выполняет один запрос,
+остальные ждут его результат; между воркерами — короткая блокировка SET NX PX в Redis. Кроме того, запись
+обновляется заранее с вероятностью, растущей к концу TTL (XFetch), поэтому ключ обычно не истекает под нагрузкой."""
+import asyncio
+import json
+import math
+import random
+import time
+from collections.abc import Awaitable, Callable
+from collections import OrderedDict
+from typing import Any, Generic, TypeVar
+from uuid import uuid4
+
+from pydantic import BaseModel
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.codec import ModelCodec
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import register_metrics
+
+logger = get_logger(__name__)
+
+INVALIDATION_CHANNEL = "cache_invalidation"
+# Метка воркера в сообщениях: свои инвалидации уже применены локально, повторно их не обрабатываем.
+_WORKER_ID = uuid4().hex
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Снимает блокировку, только если она ещё наша (могла истечь и достаться другому воркеру).
+_RELEASE_LOCK = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+_LOCK_POLL_INTERVAL = 0.05
+
+_caches: dict[str, "TwoTierCache"] = {}
+_listener_stats = {"received": 0, "reconnects": 0}
+
+
+class LocalCache:
+    """Ограниченный LRU с TTL в памяти процесса. Работает в одном event loop, блокировки не нужны."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        if self._maxsize <= 0:
+            return
+        self._entries[key] = (value, time.monotonic() + self._ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self._maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class TwoTierCache(Generic[ModelT]):
+    """Кэш моделей одного пространства имён. Ключ в Redis — f"{namespace}_{ident}" (например, employee_42),
+    значение — "<тег схемы>|<истекает, unix>|<время загрузки, с>|<модель>": метаданные нужны для XFetch,
+    модель закодирована ModelCodec."""
+
+    def __init__(
+        self,
+        namespace: str,
+        model: type[ModelT],
+        ttl: int = settings.CACHE_TTL,
+        local_ttl: float = settings.CACHE_LOCAL_TTL,
+        local_maxsize: int = settings.CACHE_LOCAL_SIZE,
+    ):
+        self.namespace = namespace
+        self._codec = ModelCodec(model)
+        self._ttl = ttl
+        self.local = LocalCache(local_maxsize, local_ttl)
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.invalidations_sent = 0
+        self.invalidations_received = 0
+        self.db_loads = 0
+        self.coalesced = 0
+        self.early_refreshes = 0
+        self.lock_waits = 0
+        self.stale_served = 0
+        # Последнее время загрузки из БД — для записей, которые кладутся в кэш при записи, а не при чтении.
+        self._delta = 0.0
+        self._inflight: dict[str, asyncio.Future] = {}
+        _caches[namespace] = self
+
+    def key(self, ident: Any) -> str:
+        return f"{self.namespace}_{ident}"
+
+    def dumps(self, value: ModelT, delta: float | None = None) -> str:
+        expires = time.time() + self._ttl
+        delta = self._delta if delta is None else delta
+        return f"{self._codec.tag}|{expires:.3f}|{delta:.4f}|{self._codec.dumps(value)}"
+
+    def loads(self, raw: str) -> tuple[ModelT, float, float] | None:
+        """Значение из Redis -> (модель, время загрузки, момент истечения).
+        Запись другого кодека, старой схемы или старого формата — None (промах)."""
+        try:
+            tag, expires, delta, payload = raw.split("|", 3)
+            if tag != self._codec.tag:
+                return None
+            value = self._codec.loads(payload)
+            return (value, float(delta), float(expires)) if value is not None else None
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _refresh_early(delta: float, expires: float) -> bool:
+        # XFetch: чем дольше загрузка и ближе истечение, тем вероятнее обновить запись раньше срока.
+        return time.time() - delta * settings.CACHE_XFETCH_BETA * math.log(1.0 - random.random()) >= expires
+
+    async def get(self, redis: Redis, ident: Any) -> ModelT | None:
+        key = self.key(ident)
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        raw = await redis.get(key)
+        entry = self.loads(raw) if raw is not None else None
+        if entry is None:
+            self.redis_misses += 1
+            return None
+        self.redis_hits += 1
+        self.local.put(key, entry[0])
+        return entry[0]
+
+    async def get_many(self, redis: Redis, idents: list[Any]) -> dict[Any, ModelT]:
+        """Найденные в кэше значения {ident: модель}: сначала L1, остальные — одним MGET."""
+        found: dict[Any, ModelT] = {}
+        missing = []
+        for ident in idents:
+            value = self.local.get(self.key(ident))
+            if value is not None:
+                found[ident] = value
+            else:
+                missing.append(ident)
+        if not missing:
+            return found
+        for ident, raw in zip(missing, await redis.mget([self.key(ident) for ident in missing])):
+            entry = self.loads(raw) if raw is not None else None
+            if entry is None:
+                self.redis_misses += 1
+                continue
+            self.redis_hits += 1
+            self.local.put(self.key(ident), entry[0])
+            found[ident] = entry[0]
+        return found
+
+    async def set_many(self, redis: Redis, values: dict[Any, ModelT]) -> None:
+        """Записывает значения в Redis одним конвейером (один round-trip) и в L1."""
+        if not values:
+            return
+        pipe = redis.pipeline(transaction=False)
+        for ident, value in values.items():
+            pipe.set(self.key(ident), self.dumps(value), ex=self._ttl)
+            self.local.put(self.key(ident), value)
+        await pipe.execute()
+
+    async def get_or_load(
+        self, redis: Redis, ident: Any, loader: Callable[[], Awaitable[ModelT | None]]
+    ) -> ModelT | None:
+        """Значение из кэша; при промахе или досрочном обновлении — из loader (обычно запрос в БД).
+        None от loader (сущности нет) не кэшируется."""
+        key = self.key(ident)
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        raw = await redis.get(key)
+        entry = self.loads(raw) if raw is not None else None
+        if entry is None:
+            self.redis_misses += 1
+            return await self._load_once(redis, key, loader, None)
+        value, delta, expires = entry
+        if not self._refresh_early(delta, expires):
+            self.redis_hits += 1
+            self.local.put(key, value)
+            return value
+        self.early_refreshes += 1
+        return await self._load_once(redis, key, loader, value)
+
+    async def _load_once(
+        self, redis: Redis, key: str, loader: Callable[[], Awaitable[ModelT | None]], stale: ModelT | None
+    ) -> ModelT | None:
+        """Single-flight: пока ключ загружается, остальные запросы воркера ждут тот же результат."""
+        while (future := self._inflight.get(key)) is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Отменили загружавший запрос (клиент ушёл) — загрузку повторяет следующий ожидающий.
+                if not future.cancelled():
+                    raise
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._load(redis, key, loader, stale)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # ожидающих может не быть — не даём asyncio ругаться на непрочитанную ошибку
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    async def _load(
+        self, redis: Redis, key: str, loader: Callable[[], Awaitable[ModelT | None]], stale: ModelT | None
+    ) -> ModelT | None:
+        lock_key = f"lock:{key}"
+        token = uuid4().hex
+        locked = await redis.set(lock_key, token, nx=True, px=int(settings.CACHE_LOCK_TTL * 1000))
+        if not locked:
+            # Ключ загружает другой воркер: отдаём устаревшее значение или ждём, пока он запишет новое.
+            if stale is not None:
+                self.stale_served += 1
+                return stale
+            self.lock_waits += 1
+            value = await self._wait_for_value(redis, key)
+            if value is not None:
+                return value
+        try:
+            started = time.perf_counter()
+            value = await loader()
+            self.db_loads += 1
+            if value is not None:
+                self._delta = time.perf_counter() - started
+                await redis.set(key, self.dumps(value), ex=self._ttl)
+                self.local.put(key, value)
+            return value
+        finally:
+            if locked:
+                await redis.eval(_RELEASE_LOCK, 1, lock_key, token)
+
+    async def _wait_for_value(self, redis: Redis, key: str) -> ModelT | None:
+        deadline = time.monotonic() + settings.CACHE_LOCK_TTL
+        while time.monotonic() < deadline:
+            await asyncio.sleep(_LOCK_POLL_INTERVAL)
+            raw = await redis.get(key)
+            entry = self.loads(raw) if raw is not None else None
+            if entry is not None:
+                self.local.put(key, entry[0])
+                return entry[0]
+        return None
+
+    async def set(self, redis: Redis, ident: Any, value: ModelT, invalidate: bool = False) -> None:
+        """Записывает значение в Redis и L1. invalidate=True — значение изменилось, другие воркеры сбрасывают L1."""
+        key = self.key(ident)
+        await redis.set(key, self.dumps(value), ex=self._ttl)
+        self.local.put(key, value)
+        if invalidate:
+            await self._publish(redis, [key])
+
+    async def invalidate(self, redis: Redis, *idents: Any) -> None:
+        """Удаляет ключи из Redis (одним DEL) и из L1 всех воркеров."""
+        keys = [self.key(ident) for ident in idents]
+        if not keys:
+            return
+        for key in keys:
+            self.local.discard(key)
+        await redis.delete(*keys)
+        await self._publish(redis, keys)
+
+    async def _publish(self, redis: Redis, keys: list[str]) -> None:
+        self.invalidations_sent += 1
+        message = {"ns": self.namespace, "keys": keys, "src": _WORKER_ID}
+        await redis.publish(INVALIDATION_CHANNEL, json.dumps(message))
+
+    def drop_local(self, keys: list[str]) -> None:
+        self.invalidations_received += 1
+        for key in keys:
+            self.local.discard(key)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "local": self.local.stats(),
+            "redis_hits": self.redis_hits,
+            "redis_misses": self.redis_misses,
+            "invalidations_sent": self.invalidations_sent,
+            "invalidations_received": self.invalidations_received,
+            "db_loads": self.db_loads,
+            "coalesced": self.coalesced,
+            "early_refreshes": self.early_refreshes,
+            "lock_waits": self.lock_waits,
+            "stale_served": self.stale_served,
+        }
+
+
+def clear_local_caches() -> None:
+    for cache in _caches.values():
+        cache.local.clear()
+
+
+def apply_invalidation(data: str) -> None:
+    """Обрабатывает сообщение из канала инвалидации: {"ns": "employee", "keys": ["employee_1", ...], "src": ...}."""
+    try:
+        message = json.loads(data)
+        cache = _caches.get(message["ns"])
+        keys = list(message["keys"])
+    except (ValueError, KeyError, TypeError):
+        logger.warning("Malformed cache invalidation message: %r", data)
+        return
+    if message.get("src") == _WORKER_ID:
+        return
+    _listener_stats["received"] += 1
+    if cache is not None:
+        cache.drop_local(keys)
+
+
+class CacheInvalidationListener:
+    """Фоновая задача: подписка на канал инвалидации. После переподключения L1 сбрасывается целиком —
+    сообщения, отправленные, пока подписки не было, не восстановить."""
+
+    def __init__(self, redis: Redis):
+        self._redis = redis
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="cache-invalidation")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    clear_local_caches()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            apply_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, OSError) as e:
+                _listener_stats["reconnects"] += 1
+                logger.warning("Cache invalidation subscription lost: %s", e)
+                clear_local_caches()
+                await asyncio.sleep(1)
+
+
+_listener: CacheInvalidationListener | None = None
+
+
+async def start_cache_invalidation(redis: Redis) -> None:
+    """Запускает подписку в lifespan. Без L1 (CACHE_LOCAL_SIZE=0) сбрасывать нечего."""
+    global _listener
+    if settings.CACHE_LOCAL_SIZE <= 0:
+        return
+    _listener = CacheInvalidationListener(redis)
+    _listener.start()
+
+
+async def stop_cache_invalidation() -> None:
+    global _listener
+    if _listener is not None:
+        await _listener.stop()
+        _listener = None
+
+
+def get_cache_stats() -> dict[str, Any]:
+    return {
+        "namespaces": {name: cache.stats() for name, cache in _caches.items()},
+        "invalidation": dict(_listener_stats),
+    }
+
+
+register_metrics("cache", get_cache_stats)
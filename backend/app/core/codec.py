@@ -0,0 +1,116 @@
+"""Кодеки значений в Redis. Клиент Redis работает со строками (decode_responses=True), поэтому кодек — текстовый:
+orjson (быстрее и компактнее stdlib json), при его отсутствии — json. Выбор — CACHE_CODEC.
+
+ModelCodec хранит модель списком значений в порядке полей, без имён, с тегом "<кодек><отпечаток схемы>".
+Отпечаток меняется вместе с полями модели, поэтому записи старой схемы читаются как промах, а не как мусор.
+Кэш пишет только сам сервис из проверенных моделей, поэтому при чтении модель собирается без повторной валидации
+(model_construct), а даты и Decimal восстанавливаются конвертерами по типам полей."""
+import hashlib
+import json
+import typing
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Generic, TypeVar
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # orjson — опционально, без него работает stdlib json
+    orjson = None
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class JsonCodec:
+    tag = "j"
+
+    @staticmethod
+    def dumps(value: Any) -> str:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_default)
+
+    @staticmethod
+    def loads(data: str) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    tag = "o"
+
+    @staticmethod
+    def dumps(value: Any) -> str:
+        return orjson.dumps(value, default=_default).decode()
+
+    @staticmethod
+    def loads(data: str) -> Any:
+        return orjson.loads(data)
+
+
+def get_codec(name: str) -> JsonCodec | OrjsonCodec:
+    if name == "orjson" and orjson is not None:
+        return OrjsonCodec()
+    return JsonCodec()
+
+
+codec = get_codec(settings.CACHE_CODEC)
+
+
+def _optional(convert: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    return lambda value: None if value is None else convert(value)
+
+
+_CONVERTERS: dict[Any, Callable[[Any], Any]] = {
+    date: date.fromisoformat,
+    datetime: datetime.fromisoformat,
+    Decimal: Decimal,
+}
+
+
+def _converter(annotation: Any) -> Callable[[Any], Any] | None:
+    """Конвертер JSON-значения в тип поля: date/datetime/Decimal и Optional от них; остальное — как есть."""
+    if annotation in _CONVERTERS:
+        return _CONVERTERS[annotation]
+    args = [a for a in typing.get_args(annotation) if a is not type(None)]
+    if len(args) == 1 and args[0] in _CONVERTERS and type(None) in typing.get_args(annotation):
+        return _optional(_CONVERTERS[args[0]])
+    return None
+
+
+class ModelCodec(Generic[ModelT]):
+    def __init__(self, model: type[ModelT], value_codec: JsonCodec | OrjsonCodec | None = None):
+        self._model = model
+        self._codec = value_codec or codec
+        self._fields = list(model.model_fields)
+        self._converters = [
+            (i, convert) for i, field in enumerate(model.model_fields.values()) if (convert := _converter(field.annotation))
+        ]
+        schema = ",".join(f"{name}:{field.annotation}" for name, field in model.model_fields.items())
+        self.tag = self._codec.tag + hashlib.sha1(schema.encode()).hexdigest()[:8]
+
+    def dumps(self, value: ModelT) -> str:
+        return self._codec.dumps([getattr(value, name) for name in self._fields])
+
+    def loads(self, data: str) -> ModelT | None:
+        """Модель из строки dumps. Повреждённая запись или другая длина (схема изменилась) — None."""
+        try:
+            values = self._codec.loads(data)
+        except ValueError:
+            return None
+        if not isinstance(values, list) or len(values) != len(self._fields):
+            return None
+        try:
+            for i, convert in self._converters:
+                values[i] = convert(values[i])
+        except (ValueError, TypeError, ArithmeticError):
+            return None
+        return self._model.model_construct(**dict(zip(self._fields, values)))
@@ -16,6 +16,18 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str
     POSTGRES_PORT: int
 
+    POSTGRES_REPLICA_HOST: Optional[str] = None
+    POSTGRES_REPLICA_PORT: Optional[int] = None
+    READ_YOUR_WRITES_SECONDS: int = 5
+
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_COMMAND_TIMEOUT: Optional[float] = 60.0
+
     POSTGRES_DB_TEST: Optional[str] = None
     POSTGRES_USER_TEST: Optional[str] = None
     POSTGRES_PASSWORD_TEST: Optional[str] = None
@@ -25,27 +37,69 @@ class Settings(BaseSettings):
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
 
+    RATE_LIMIT_LOCAL_FRACTION: float = 0.1
+    RATE_LIMIT_LOGIN_PER_ACCOUNT: str = "5/minute"
+
     API_TOKEN: str
 
     LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"
+    LOG_QUEUE_SIZE: int = 10_000
+    LOG_SAMPLING: str = ""
 
     JWT_PRIVATE_KEY: Path = BASE_DIR / "jwt_tokens" / "jwt-private.pem"
     JWT_PUBLIC_KEY: Path = BASE_DIR / "jwt_tokens" / "jwt-public.pem"
     ALGORITHM: str = "RS256"
+    JWT_KEY_ID: str = "default"
+    JWT_EXTRA_VERIFY_KEYS: str = ""
+    ACCESS_TOKEN_CACHE_SIZE: int = 10_000
+
+    # Кэш сущностей: TTL в Redis и локальный LRU воркера (0 — без локального уровня).
+    CACHE_TTL: int = 60 * 30
+    CACHE_LOCAL_TTL: float = 5.0
+    CACHE_LOCAL_SIZE: int = 10_000
+    CACHE_CODEC: str = "orjson"
+    # Блокировка загрузки ключа между воркерами (сек) и коэффициент досрочного обновления XFetch (0 — выкл.).
+    CACHE_LOCK_TTL: float = 5.0
+    CACHE_XFETCH_BETA: float = 1.0
+
+    PASSWORD_HASH_EXECUTOR: str = "process"
+    PASSWORD_HASH_WORKERS: Optional[int] = None
+    PASSWORD_HASH_MAX_PENDING: int = 64
 
     LOGIN_FOR_GMAIL: str = ""
     PASSWORD_FOR_GMAIL: str = ""
 
     SEND_LOGIN_CODE_EMAIL: bool = True
+    SMTP_HOST: str = "smtp.gmail.com"
+    SMTP_PORT: int = 587
+    SMTP_STARTTLS: bool = True
+    SMTP_TIMEOUT: float = 30.0
+    SMTP_IDLE_TIMEOUT: float = 60.0
+    EMAIL_OUTBOX_BATCH_SIZE: int = 20
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 5
+    EMAIL_OUTBOX_BACKOFF_BASE: float = 2.0
 
     ENVIRONMENT: str = "production"
 
     CORS_ORIGINS: str = ""
 
     AI_CHAT_SERVICE_URL: str = "http://localhost:8001"
+    AI_CHAT_MAX_CONNECTIONS: int = 100
+    AI_CHAT_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    AI_CHAT_KEEPALIVE_EXPIRY: float = 30.0
+    AI_CHAT_HTTP2: bool = False
+    AI_CHAT_CONNECT_TIMEOUT: float = 5.0
+    AI_CHAT_POOL_TIMEOUT: float = 5.0
+    AI_CHAT_TIMEOUT: float = 30.0
+    AI_CHAT_STREAM_READ_TIMEOUT: float = 60.0
+    AI_CHAT_LIST_TIMEOUT: float = 10.0
 
     MONGO_URI: str = "mongodb://localhost:27017"
 
+    # /metrics: пусто — эндпоинт выключен (404), иначе нужен заголовок Authorization: Bearer <METRICS_TOKEN>.
+    METRICS_TOKEN: str = ""
+
     @property
     def SECURE_COOKIES(self) -> bool:
         """False в development для работы cookies по HTTP (localhost)."""
@@ -56,6 +110,15 @@ class Settings(BaseSettings):
         return (f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@"
                 f"{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}")
 
+    @property
+    def REPLICA_DATABASE_URL(self) -> Optional[str]:
+        """Реплика только для чтения (те же БД и пользователь, другой хост). None — реплики нет."""
+        if not self.POSTGRES_REPLICA_HOST:
+            return None
+        port = self.POSTGRES_REPLICA_PORT or self.POSTGRES_PORT
+        return (f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@"
+                f"{self.POSTGRES_REPLICA_HOST}:{port}/{self.POSTGRES_DB}")
+
     @property
     def SYNC_DATABASE_URL(self) -> str:
         return (f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@"
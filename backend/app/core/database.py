@@ -1,24 +1,147 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import Histogram, register_metrics
+
+logger = get_logger(__name__)
+
+# Кука «читать с primary»: ставится после успешного запроса на запись, пока реплика может отставать.
+READ_PRIMARY_COOKIE = "read_primary"
+_WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+
+class PoolMetrics:
+    def __init__(self) -> None:
+        self.checkout_wait = Histogram()
+        self.events = {"checkouts": 0, "timeouts": 0, "connects": 0, "invalidated": 0}
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Пул, который замеряет ожидание свободного соединения (checkout) — рост ожидания значит, что пул мал.
+    Сам по себе не используется: metrics задаёт подкласс из _pool_class, у каждого движка свой."""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.events["timeouts"] += 1
+            raise
+        finally:
+            self.metrics.checkout_wait.observe(time.perf_counter() - started)
+        self.metrics.events["checkouts"] += 1
+        return connection
+
 
+def _pool_class(metrics: PoolMetrics) -> type[InstrumentedAsyncQueuePool]:
+    """Класс пула, который пишет в metrics (SQLAlchemy создаёт пул сам, передать экземпляр метрик нельзя)."""
+    return type("InstrumentedAsyncQueuePool", (InstrumentedAsyncQueuePool,), {"metrics": metrics})
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    future=True,
-    echo=False,
+
+def _create_engine(url: str, metrics: PoolMetrics) -> AsyncEngine:
+    # Всего соединений на воркер: DB_POOL_SIZE + DB_MAX_OVERFLOW; на все воркеры и реплики сумма должна
+    # укладываться в max_connections Postgres. statement_cache_size=0 — при работе через pgbouncer (transaction mode).
+    new_engine = create_async_engine(
+        url,
+        future=True,
+        echo=False,
+        poolclass=_pool_class(metrics),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "command_timeout": settings.DB_COMMAND_TIMEOUT,
+        },
+    )
+
+    @event.listens_for(new_engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record) -> None:
+        metrics.events["connects"] += 1
+
+    @event.listens_for(new_engine.sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception) -> None:
+        metrics.events["invalidated"] += 1
+
+    return new_engine
+
+
+def _session_factory(bind: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        bind=bind,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autoflush=False,
+    )
+
+
+_primary_metrics = PoolMetrics()
+engine = _create_engine(settings.DATABASE_URL, _primary_metrics)
+session_factory = _session_factory(engine)
+
+# Реплика для чтения — опционально (POSTGRES_REPLICA_HOST). Без неё все чтения идут в primary.
+_replica_metrics = PoolMetrics()
+replica_engine = (
+    _create_engine(settings.REPLICA_DATABASE_URL, _replica_metrics) if settings.REPLICA_DATABASE_URL else None
 )
+_read_routing = {"replica": 0, "primary_sticky": 0, "primary_fallback": 0}
+
 
-session_factory = async_sessionmaker(
+class ReadSession(Session):
+    """Сессия только читающих эндпоинтов: запросы идут в реплику, если она настроена и сессия не помечена
+    read_primary. Соединение берётся при первом запросе, как и в обычной сессии, — ответы из кэша пул не трогают.
+    Если реплика не отвечает на подключение, сессия переключается на primary до конца запроса."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if replica_engine is None or self.info.get("read_primary"):
+            return engine.sync_engine
+        return replica_engine.sync_engine
+
+    # Закрытый метод Session: у публичного get_bind нет доступа к ошибке подключения, а переключиться нужно именно
+    # на ней. Сигнатура сверена с SQLAlchemy==2.0.44 (закреплена в requirements.txt); при обновлении версии
+    # сначала прогнать TestReadRouting — там же проверяется сигнатура.
+    def _connection_for_bind(self, bind, execution_options=None, **kw):
+        try:
+            connection = super()._connection_for_bind(bind, execution_options, **kw)
+        except (OSError, DBAPIError) as e:
+            if replica_engine is None or bind is not replica_engine.sync_engine:
+                raise
+            self.info["read_primary"] = True
+            _read_routing["primary_fallback"] += 1
+            logger.warning("Replica unavailable, reading from primary: %s", e)
+            return super()._connection_for_bind(engine.sync_engine, execution_options, **kw)
+        if bind is not engine.sync_engine and not self.info.get("replica_connected"):
+            self.info["replica_connected"] = True
+            _read_routing["replica"] += 1
+        return connection
+
+
+read_session_factory = async_sessionmaker(
     bind=engine,
     class_=AsyncSession,
+    sync_session_class=ReadSession,
     expire_on_commit=False,
     autoflush=False,
 )
 
 
 async def get_session():
-    """Асинхронный генератор сессии БД. При исключении выполняет rollback."""
+    """Асинхронный генератор сессии БД. При исключении выполняет rollback.
+    Сессия ленивая: соединение из пула берётся только при первом запросе к БД."""
     async with session_factory() as session:
         try:
             yield session
@@ -27,3 +150,85 @@ async def get_session():
             raise
         finally:
             await session.close()
+
+
+async def get_read_session(request: Request):
+    """Сессия для только читающих эндпоинтов: реплика, если настроена и клиент недавно не писал, иначе primary."""
+    # Клиент недавно писал — реплика могла ещё не догнать, читаем с primary (read-your-writes).
+    sticky = replica_engine is not None and bool(request.cookies.get(READ_PRIMARY_COOKIE))
+    # Эндпоинт только читает, даже если это POST (batch-get): кука read_primary после него не нужна.
+    request.state.read_only = True
+    if sticky:
+        _read_routing["primary_sticky"] += 1
+    async with read_session_factory(info={"read_primary": sticky}) as session:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+
+@contextmanager
+def read_from_primary(session: AsyncSession) -> Iterator[None]:
+    """Запросы внутри блока идут в primary, даже если сессия читающая. Для загрузки промахов общего кэша:
+    строка с отстающей реплики, положенная в Redis на CACHE_TTL, вернула бы старые данные всем воркерам
+    и после read_primary. Для обычной сессии ничего не меняет."""
+    previous = session.info.get("read_primary", False)
+    session.info["read_primary"] = True
+    try:
+        yield
+    finally:
+        session.info["read_primary"] = previous
+
+
+def mark_read_primary(request: Request, response: Response) -> None:
+    """После успешной записи — кука, по которой чтения этого клиента READ_YOUR_WRITES_SECONDS идут в primary."""
+    if replica_engine is None or request.method not in _WRITE_METHODS or response.status_code >= 400:
+        return
+    if getattr(request.state, "read_only", False):
+        return
+    response.set_cookie(
+        READ_PRIMARY_COOKIE,
+        "1",
+        max_age=settings.READ_YOUR_WRITES_SECONDS,
+        httponly=True,
+        secure=settings.SECURE_COOKIES,
+        samesite="lax",
+    )
+
+
+async def close_database() -> None:
+    await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+
+
+def _pool_stats(db_engine: AsyncEngine, metrics: PoolMetrics) -> dict:
+    pool = db_engine.pool
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "max_connections": settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        **metrics.events,
+        "checkout_wait_seconds": metrics.checkout_wait.snapshot(),
+    }
+
+
+def get_pool_stats() -> dict:
+    return _pool_stats(engine, _primary_metrics)
+
+
+def get_replica_stats() -> dict:
+    stats = {"configured": replica_engine is not None, "reads": dict(_read_routing)}
+    if replica_engine is not None:
+        stats["pool"] = _pool_stats(replica_engine, _replica_metrics)
+    return stats
+
+
+register_metrics("db_pool", get_pool_stats)
+register_metrics("db_replica", get_replica_stats)
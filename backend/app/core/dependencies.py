@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_session
 from app.core.redis import get_redis
 from app.core.security import ACCESS_TOKEN_COOKIE_MAX_AGE, decode_token, set_token
+from app.core.token_cache import access_token_cache
 from app.repository import CompanyRepository, EmployeeRepository, UserRepository
 from app.services import AuthService
 
@@ -41,17 +42,23 @@ async def _get_validated_context(
     company_repo: CompanyRepository,
     redis: Redis,
 ) -> tuple[int, int | None]:
-    """Проверяет access-токен; при отсутствии/истечении пробует refresh и выставляет новую access-куку. Возвращает (user_id, company_id). Кэш в request.state — один refresh на запрос."""
+    """Проверяет access-токен; при отсутствии/истечении пробует refresh и выставляет новую access-куку. Возвращает (user_id, company_id). Кэш в request.state — один refresh на запрос.
+    Уже проверенные access-токены берутся из access_token_cache без повторной проверки подписи."""
     cached = getattr(request.state, _CONTEXT_CACHE_KEY, None)
     if cached is not None:
         return cached
     access_token = request.cookies.get("access_token")
     if access_token:
+        result = access_token_cache.get(access_token)
+        if result is not None:
+            setattr(request.state, _CONTEXT_CACHE_KEY, result)
+            return result
         try:
             payload = _decode_access_token(access_token)
             user_id = int(payload["sub"])
             company_id = payload.get("company_id")
             result = (user_id, int(company_id) if company_id is not None else None)
+            access_token_cache.put(access_token, *result, exp=payload["exp"])
             setattr(request.state, _CONTEXT_CACHE_KEY, result)
             return result
         except HTTPException:
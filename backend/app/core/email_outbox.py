@@ -0,0 +1,321 @@
+"""Исходящая почта через очередь в Redis. Запрос только кладёт письмо в список email_outbox,
+фоновый воркер держит одну авторизованную SMTP-сессию, отправляет пачками, переподключается при обрыве
+и повторяет неудачные отправки с экспоненциальной задержкой (отложенные письма — в ZSET по времени повтора).
+
+Письма не теряются при падении или перезапуске воркера: BLMOVE/LMOVE переносит их в личный список воркера
+email_outbox_processing:<id>, и оттуда письмо удаляется только после отправки, откладывания или dead-letter.
+Воркер держит аренду email_outbox_lease:<id>; списки воркеров с истёкшей арендой возвращаются в очередь
+при старте и периодически. Поэтому доставка — «хотя бы один раз»: после сбоя письмо может уйти повторно."""
+import asyncio
+import json
+import smtplib
+import time
+import uuid
+from email.mime.text import MIMEText
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import register_metrics
+
+logger = get_logger(__name__)
+
+OUTBOX_KEY = "email_outbox"
+RETRY_KEY = "email_outbox_retry"
+DEAD_LETTER_KEY = "email_outbox_dead"
+WORKERS_KEY = "email_outbox_workers"
+# Аренда должна пережить отправку одного письма с переподключением, иначе его повторно отправит другой воркер.
+LEASE_TTL = max(60, int(settings.SMTP_TIMEOUT * 4))
+
+# Возврат отложенного письма в очередь одной операцией: между ZREM и RPUSH письмо не может пропасть.
+_REQUEUE_RETRY = """
+if redis.call('zrem', KEYS[1], ARGV[1]) == 1 then
+    redis.call('rpush', KEYS[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+_stats = {"enqueued": 0, "sent": 0, "retried": 0, "dead": 0, "reconnects": 0, "recovered": 0}
+
+
+def processing_key(worker_id: str) -> str:
+    return f"email_outbox_processing:{worker_id}"
+
+
+def lease_key(worker_id: str) -> str:
+    return f"email_outbox_lease:{worker_id}"
+
+
+def email_configured() -> bool:
+    return bool(settings.SEND_LOGIN_CODE_EMAIL and settings.LOGIN_FOR_GMAIL and settings.PASSWORD_FOR_GMAIL)
+
+
+async def enqueue_code_email(redis: Redis, to_email: str, code: str) -> None:
+    """Ставит письмо с кодом в очередь. Если почта не настроена (dev/test), только логирует и не падает."""
+    if not email_configured():
+        logger.warning(
+            "Email not configured (SEND_LOGIN_CODE_EMAIL=%s, LOGIN_FOR_GMAIL set=%s); "
+            "skipping send for %s",
+            settings.SEND_LOGIN_CODE_EMAIL,
+            bool(settings.LOGIN_FOR_GMAIL),
+            to_email,
+        )
+        if settings.ENVIRONMENT == "development":
+            logger.warning("DEV: confirmation code for %s: %s", to_email, code)
+        return
+    message = {
+        "to": to_email,
+        "subject": "Код подтверждения",
+        "body": f"Ваш код подтверждения: {code}\nДействует 10 минут.",
+        "attempts": 0,
+    }
+    await redis.lpush(OUTBOX_KEY, json.dumps(message, ensure_ascii=False))
+    _stats["enqueued"] += 1
+    logger.info("Code email queued for %s", to_email)
+
+
+class SmtpSession:
+    """Долгоживущее SMTP-соединение (синхронный smtplib, вызывается из потока). Подключается лениво."""
+
+    def __init__(self, host: str, port: int, starttls: bool, username: str, password: str):
+        self._host = host
+        self._port = port
+        self._starttls = starttls
+        self._username = username
+        self._password = password
+        self._smtp: smtplib.SMTP | None = None
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self._host, self._port, timeout=settings.SMTP_TIMEOUT)
+        try:
+            if self._starttls:
+                smtp.starttls()
+            if self._password:
+                smtp.login(self._username, self._password)
+        except Exception:
+            # Неверный пароль или сбой TLS повторяются на каждой попытке — без close каждая оставляла бы сокет.
+            smtp.close()
+            raise
+        _stats["reconnects"] += 1
+        return smtp
+
+    def send(self, message: dict) -> None:
+        """Отправляет одно письмо. При разрыве сессии переподключается один раз и повторяет."""
+        msg = MIMEText(message["body"], "plain", "utf-8")
+        msg["Subject"] = message["subject"]
+        msg["From"] = self._username
+        msg["To"] = message["to"]
+        for attempt in range(2):
+            if self._smtp is None:
+                self._smtp = self._connect()
+            try:
+                self._smtp.sendmail(self._username, [message["to"]], msg.as_string())
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+
+class EmailOutboxWorker:
+    """Фоновая задача: забирает письма из Redis пачками и отправляет через одну SMTP-сессию."""
+
+    def __init__(self, redis: Redis, smtp: SmtpSession, worker_id: str | None = None):
+        self._redis = redis
+        self._smtp = smtp
+        self.worker_id = worker_id or uuid.uuid4().hex
+        self.processing_key = processing_key(self.worker_id)
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self._sending: asyncio.Future | None = None
+
+    def start(self) -> None:
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(), name="email-outbox")
+
+    async def stop(self) -> None:
+        """Дожидается текущего письма (не дольше LEASE_TTL) и только потом закрывает SMTP-сессию.
+        Неотправленные письма пачки возвращаются в очередь; если Redis недоступен — после истечения аренды."""
+        self._stopping = True
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), timeout=LEASE_TTL)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+                try:
+                    await self._task
+                except asyncio.CancelledError:
+                    pass
+            self._task = None
+        if self._sending is not None:
+            # Поток отправки нельзя прервать: закрывать сессию под ним нельзя.
+            await asyncio.gather(self._sending, return_exceptions=True)
+        await asyncio.to_thread(self._smtp.close)
+        try:
+            await self._requeue(self.processing_key)
+            await self._redis.srem(WORKERS_KEY, self.worker_id)
+            await self._redis.delete(lease_key(self.worker_id))
+        except RedisError as e:
+            logger.warning("Email outbox cleanup failed, leftovers will be requeued after lease expiry: %s", e)
+
+    async def _run(self) -> None:
+        idle_since = time.monotonic()
+        recovered_at = 0.0
+        while not self._stopping:
+            try:
+                await self._renew_lease()
+                if time.monotonic() - recovered_at > LEASE_TTL:
+                    await self._redis.sadd(WORKERS_KEY, self.worker_id)
+                    await self.recover_orphans()
+                    recovered_at = time.monotonic()
+                # Пачка уже обработана: всё, что осталось в списке воркера, — письма, которые не удалось
+                # подтвердить (например, Redis был недоступен). Возвращаем их в очередь.
+                await self._requeue(self.processing_key)
+                await self._requeue_due_retries()
+                batch = await self._next_batch()
+                if batch:
+                    await self.process_batch(batch)
+                    idle_since = time.monotonic()
+                elif time.monotonic() - idle_since > settings.SMTP_IDLE_TIMEOUT:
+                    # Сервер всё равно закроет простаивающую сессию — закрываем сами.
+                    await asyncio.to_thread(self._smtp.close)
+                    idle_since = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Email outbox worker error")
+                await asyncio.sleep(1)
+
+    async def recover_orphans(self) -> int:
+        """Возвращает в очередь письма воркеров, чья аренда истекла (упали или остановлены посреди пачки)."""
+        recovered = 0
+        for worker_id in await self._redis.smembers(WORKERS_KEY):
+            if worker_id == self.worker_id or await self._redis.exists(lease_key(worker_id)):
+                continue
+            recovered += await self._requeue(processing_key(worker_id))
+            await self._redis.srem(WORKERS_KEY, worker_id)
+        return recovered
+
+    async def _requeue(self, key: str) -> int:
+        """Переносит письма из списка обработки в голову очереди (их возьмут следующими)."""
+        moved = 0
+        while await self._redis.lmove(key, OUTBOX_KEY, "RIGHT", "RIGHT") is not None:
+            moved += 1
+        if moved:
+            _stats["recovered"] += moved
+            logger.warning("Requeued %s unacknowledged emails from %s", moved, key)
+        return moved
+
+    async def _next_batch(self) -> list[str]:
+        first = await self._redis.blmove(OUTBOX_KEY, self.processing_key, 1, "RIGHT", "LEFT")
+        if first is None:
+            return []
+        pipe = self._redis.pipeline(transaction=False)
+        for _ in range(settings.EMAIL_OUTBOX_BATCH_SIZE - 1):
+            pipe.lmove(OUTBOX_KEY, self.processing_key, "RIGHT", "LEFT")
+        more = await pipe.execute()
+        return [first] + [item for item in more if item is not None]
+
+    async def _requeue_due_retries(self) -> None:
+        due = await self._redis.zrangebyscore(RETRY_KEY, 0, time.time())
+        for item in due:
+            await self._redis.eval(_REQUEUE_RETRY, 2, RETRY_KEY, OUTBOX_KEY, item)
+
+    async def _ack(self, raw: str, key: str | None = None, payload: str | None = None, retry_at: float = 0.0) -> None:
+        """Убирает письмо из списка воркера; вместе с этим (MULTI) кладёт его в dead-letter или в отложенные."""
+        pipe = self._redis.pipeline(transaction=True)
+        if key == DEAD_LETTER_KEY:
+            pipe.lpush(DEAD_LETTER_KEY, payload)
+        elif key == RETRY_KEY:
+            pipe.zadd(RETRY_KEY, {payload: retry_at})
+        pipe.lrem(self.processing_key, 1, raw)
+        await pipe.execute()
+
+    async def _renew_lease(self) -> None:
+        await self._redis.set(lease_key(self.worker_id), "1", ex=LEASE_TTL)
+
+    async def _send(self, message: dict) -> Exception | None:
+        await self._renew_lease()
+        self._sending = asyncio.ensure_future(asyncio.to_thread(self._smtp.send, message))
+        try:
+            await asyncio.shield(self._sending)
+        except Exception as e:
+            return e
+        finally:
+            if self._sending.done():
+                self._sending = None
+        return None
+
+    async def process_batch(self, batch: list[str]) -> None:
+        """Отправляет письма по одному в потоке; неудачные откладывает с backoff или переносит в dead-letter.
+        Письмо, которое не разобрать, сразу уходит в dead-letter и не мешает остальным."""
+        for raw in batch:
+            if self._stopping:
+                break
+            try:
+                message = json.loads(raw)
+                message["to"]
+            except (ValueError, TypeError, KeyError):
+                _stats["dead"] += 1
+                logger.error("Malformed email in outbox, moved to dead-letter: %.200s", raw)
+                await self._ack(raw, DEAD_LETTER_KEY, raw)
+                continue
+            error = await self._send(message)
+            if error is None:
+                _stats["sent"] += 1
+                logger.info("Code email sent to %s", message["to"])
+                await self._ack(raw)
+                continue
+            message["attempts"] = message.get("attempts", 0) + 1
+            payload = json.dumps(message, ensure_ascii=False)
+            if message["attempts"] >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                _stats["dead"] += 1
+                logger.error("Giving up on email to %s after %s attempts: %s", message["to"], message["attempts"], error)
+                await self._ack(raw, DEAD_LETTER_KEY, payload)
+                continue
+            delay = settings.EMAIL_OUTBOX_BACKOFF_BASE * 2 ** (message["attempts"] - 1)
+            _stats["retried"] += 1
+            logger.warning("Email to %s failed (%s), retry in %.0fs", message["to"], error, delay)
+            await self._ack(raw, RETRY_KEY, payload, time.time() + delay)
+
+
+_worker: EmailOutboxWorker | None = None
+
+
+async def start_email_outbox(redis: Redis) -> None:
+    """Запускает воркер в lifespan. Без настроенной почты не нужен — коды только логируются."""
+    global _worker
+    if not email_configured():
+        return
+    _worker = EmailOutboxWorker(
+        redis,
+        SmtpSession(
+            settings.SMTP_HOST,
+            settings.SMTP_PORT,
+            settings.SMTP_STARTTLS,
+            settings.LOGIN_FOR_GMAIL,
+            settings.PASSWORD_FOR_GMAIL,
+        ),
+    )
+    _worker.start()
+
+
+async def stop_email_outbox() -> None:
+    global _worker
+    if _worker is not None:
+        await _worker.stop()
+        _worker = None
+
+
+register_metrics("email_outbox", lambda: dict(_stats))
@@ -20,6 +20,11 @@ class AlreadyExistsError(AppException):
     detail = "Already exists"
 
 
+class BadRequestError(AppException):
+    status_code = 400
+    detail = "Bad request"
+
+
 class UnauthorizedError(AppException):
     status_code = 401
     detail = "Unauthorized"
@@ -34,3 +39,9 @@ class EmailSendError(AppException):
     """Не удалось отправить код на email (SMTP и т.п.)."""
     status_code = 503
     detail = "Could not send verification email"
+
+
+class ServiceBusyError(AppException):
+    """Ограниченный ресурс (пул хэширования паролей и т.п.) переполнен — клиенту стоит повторить позже."""
+    status_code = 503
+    detail = "Service is busy, try again later"
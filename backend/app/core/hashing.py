@@ -0,0 +1,107 @@
+"""Хэширование и проверка паролей (bcrypt) вне event loop, в отдельном ограниченном пуле.
+По умолчанию — пул процессов: bcrypt идёт параллельно на нескольких ядрах и не держит GIL воркера.
+При переполнении очереди запрос сразу получает ServiceBusyError (503), а не ждёт бесконечно."""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.core.config import settings
+from app.core.exceptions import ServiceBusyError
+from app.core.logging import get_logger
+from app.core.metrics import Histogram, register_metrics
+from app.core.security import get_password_hash, verify_password
+
+logger = get_logger(__name__)
+
+_executor: Executor | None = None
+_pending = 0
+_rejected = 0
+_hash_latency = Histogram()
+_queue_wait = Histogram()
+
+
+def _workers() -> int:
+    return settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+
+
+def _timed_call(fn, *args):
+    """Выполняется в воркере пула: возвращает результат и время начала/окончания (time.time — общее для процессов)."""
+    started = time.time()
+    result = fn(*args)
+    return result, started, time.time()
+
+
+def start_password_hasher() -> Executor:
+    """Создаёт пул. Вызывается в lifespan; при первом обращении без lifespan создаётся лениво."""
+    global _executor
+    if _executor is None:
+        if settings.PASSWORD_HASH_EXECUTOR == "thread":
+            _executor = ThreadPoolExecutor(max_workers=_workers(), thread_name_prefix="password-hash")
+        else:
+            # spawn, а не fork: форк процесса с работающим event loop и потоками логирования небезопасен.
+            _executor = ProcessPoolExecutor(
+                max_workers=_workers(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            # Прогрев: процессы стартуют сразу, а не на первом логине (spawn занимает ~1 с).
+            for _ in range(_workers()):
+                _executor.submit(os.getpid)
+        logger.info(
+            "Password hasher started executor=%s workers=%s max_pending=%s",
+            settings.PASSWORD_HASH_EXECUTOR,
+            _workers(),
+            settings.PASSWORD_HASH_MAX_PENDING,
+        )
+    return _executor
+
+
+def shutdown_password_hasher() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def _run(fn, *args):
+    global _pending, _rejected
+    if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        _rejected += 1
+        logger.warning("Password hasher saturated pending=%s, rejecting", _pending)
+        raise ServiceBusyError()
+    executor = start_password_hasher()
+    _pending += 1
+    submitted = time.time()
+    try:
+        result, started, finished = await asyncio.get_running_loop().run_in_executor(executor, _timed_call, fn, *args)
+    finally:
+        _pending -= 1
+    _queue_wait.observe(max(0.0, started - submitted))
+    _hash_latency.observe(finished - started)
+    return result
+
+
+async def hash_password(password: str) -> str:
+    """Асинхронный аналог get_password_hash."""
+    return await _run(get_password_hash, password)
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    """Асинхронный аналог verify_password."""
+    return await _run(verify_password, plain_password, hashed_password)
+
+
+def get_hasher_stats() -> dict:
+    return {
+        "executor": settings.PASSWORD_HASH_EXECUTOR,
+        "workers": _workers(),
+        "max_pending": settings.PASSWORD_HASH_MAX_PENDING,
+        "pending": _pending,
+        "rejected": _rejected,
+        "hash_latency_seconds": _hash_latency.snapshot(),
+        "queue_wait_seconds": _queue_wait.snapshot(),
+    }
+
+
+register_metrics("password_hasher", get_hasher_stats)
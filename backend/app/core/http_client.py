@@ -0,0 +1,95 @@
+"""Общий HTTP-клиент для вызовов ai-chat-service: один пул keep-alive соединений на воркер.
+Создаётся в lifespan (main.py), в эндпоинты передаётся через Depends(get_ai_chat_client)."""
+import httpx
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import register_metrics
+
+logger = get_logger(__name__)
+
+_client: httpx.AsyncClient | None = None
+
+
+def _http2_available() -> bool:
+    if not settings.AI_CHAT_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("AI_CHAT_HTTP2=true, but package h2 is not installed; falling back to HTTP/1.1")
+        return False
+    return True
+
+
+def ai_chat_timeout(read: float) -> httpx.Timeout:
+    """Таймаут для конкретного маршрута: read/write свои, connect и ожидание пула — общие."""
+    return httpx.Timeout(
+        read,
+        connect=settings.AI_CHAT_CONNECT_TIMEOUT,
+        pool=settings.AI_CHAT_POOL_TIMEOUT,
+    )
+
+
+async def init_ai_chat_client() -> httpx.AsyncClient:
+    global _client
+    _client = httpx.AsyncClient(
+        timeout=ai_chat_timeout(settings.AI_CHAT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=settings.AI_CHAT_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.AI_CHAT_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.AI_CHAT_KEEPALIVE_EXPIRY,
+        ),
+        http2=_http2_available(),
+    )
+    return _client
+
+
+async def close_ai_chat_client() -> None:
+    global _client
+    if _client:
+        await _client.aclose()
+        _client = None
+
+
+def get_ai_chat_client() -> httpx.AsyncClient:
+    """FastAPI Depends: общий клиент ai-chat-service."""
+    if _client is None:
+        raise RuntimeError("AI chat HTTP client not initialized")
+    return _client
+
+
+def get_pool_stats() -> dict[str, int | bool]:
+    """Загрузка пула соединений: открытые/простаивающие соединения, активные и ждущие пула запросы."""
+    stats: dict[str, int | bool] = {
+        "max_connections": settings.AI_CHAT_MAX_CONNECTIONS,
+        "max_keepalive_connections": settings.AI_CHAT_MAX_KEEPALIVE_CONNECTIONS,
+        "http2": False,
+        "connections": 0,
+        "idle_connections": 0,
+        "active_requests": 0,
+        "queued_requests": 0,
+    }
+    if _client is None:
+        return stats
+    # httpx не публикует состояние пула — читаем приватные атрибуты транспорта httpcore (сверены с httpcore==1.0.9,
+    # версия закреплена в requirements.txt). При их отсутствии метрика деградирует до нулей, а не роняет /metrics.
+    try:
+        pool = _client._transport._pool
+        connections = list(pool.connections)
+        queued = [request.is_queued() for request in list(pool._requests)]
+        http2 = bool(getattr(pool, "_http2", False))
+        idle = sum(1 for c in connections if c.is_idle())
+    except (AttributeError, TypeError):
+        return stats
+    stats.update(
+        http2=http2,
+        connections=len(connections),
+        idle_connections=idle,
+        active_requests=queued.count(False),
+        queued_requests=queued.count(True),
+    )
+    return stats
+
+
+register_metrics("ai_chat_http_pool", get_pool_stats)
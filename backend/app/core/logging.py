@@ -1,27 +1,119 @@
+"""Логирование без блокировки event loop: обработчики пишут в ограниченную очередь (QueueHandler),
+форматирование, вывод в stdout и запись/ротация файла — в фоновом потоке QueueListener.
+При переполнении очереди запись отбрасывается и учитывается в счётчике, запрос не ждёт диска."""
+import json
 import logging
+import queue
+import random
 import sys
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
 from app.core.config import settings
+from app.core.metrics import register_metrics
 
 LOG_DIR = Path(__file__).resolve().parent.parent.parent / "logs"
 
 logging.getLogger("asyncio").setLevel(logging.WARNING)
 logging.getLogger("faker").setLevel(logging.WARNING)
 
+_listener: QueueListener | None = None
+_queue_handler: "DroppingQueueHandler | None" = None
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler с ограниченной очередью: не блокируется, при переполнении отбрасывает запись."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Здесь только подставляем аргументы (они могут измениться после возврата из logger.info);
+        # форматирование и traceback — в потоке слушателя.
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает только долю DEBUG-записей от указанных логгеров (и их дочерних). Остальные уровни не трогает."""
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self._rates = rates
+        self.sampled_out = 0
+
+    def _rate(self, name: str) -> float | None:
+        while name:
+            if name in self._rates:
+                return self._rates[name]
+            name = name.rpartition(".")[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        rate = self._rate(record.name)
+        if rate is None or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+def parse_sampling(value: str) -> dict[str, float]:
+    """"app.services.EmployeeService:0.1,app.repository:0.5" -> {логгер: доля}."""
+    rates = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, rate = item.rpartition(":")
+        rates[name] = float(rate)
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись — для сборщиков логов."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _formatter() -> logging.Formatter:
+    if settings.LOG_FORMAT == "json":
+        return JsonFormatter()
+    return logging.Formatter(
+        "%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
 
 def setup_logging() -> None:
-    """Настройка логирования. Вызывать при старте приложения."""
+    """Настройка логирования. Вызывать при старте приложения; при завершении — shutdown_logging()."""
+    global _listener, _queue_handler
+    shutdown_logging()
     LOG_DIR.mkdir(exist_ok=True)
 
     level = settings.LOG_LEVEL
     log_level = getattr(logging, level.upper(), logging.INFO)
 
-    formatter = logging.Formatter(
-        "%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
+    formatter = _formatter()
 
     console = logging.StreamHandler(sys.stdout)
     console.setFormatter(formatter)
@@ -35,15 +127,51 @@ def setup_logging() -> None:
     file_handler.setFormatter(formatter)
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
 
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _queue_handler.addFilter(SamplingFilter(parse_sampling(settings.LOG_SAMPLING)))
+    _listener = QueueListener(log_queue, console, file_handler, respect_handler_level=True)
+    _listener.start()
+
     root = logging.getLogger()
+    for handler in root.handlers:
+        handler.close()
     root.handlers.clear()
     root.setLevel(log_level)
-    root.addHandler(console)
-    root.addHandler(file_handler)
+    root.addHandler(_queue_handler)
     logging.getLogger("uvicorn.access").setLevel(logging.INFO)
 
-    logging.info(">>> LOGGING CONFIGURED (level=%s) <<<", level)
+    logging.info(">>> LOGGING CONFIGURED (level=%s, format=%s) <<<", level, settings.LOG_FORMAT)
+
+
+def shutdown_logging() -> None:
+    """Останавливает фоновый поток, дописав всё, что уже в очереди.
+    Записи после остановки (завершение uvicorn) идут в обработчики напрямую."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        root = logging.getLogger()
+        root.removeHandler(_queue_handler)
+        for handler in _listener.handlers:
+            root.addHandler(handler)
+        _listener = None
+        _queue_handler = None
+
+
+def get_logging_stats() -> dict:
+    if _queue_handler is None:
+        return {}
+    sampling = next((f for f in _queue_handler.filters if isinstance(f, SamplingFilter)), None)
+    return {
+        "queue_size": _queue_handler.queue.qsize(),
+        "queue_max": settings.LOG_QUEUE_SIZE,
+        "dropped": _queue_handler.dropped,
+        "sampled_out": sampling.sampled_out if sampling else 0,
+    }
 
 
 def get_logger(name: str) -> logging.Logger:
     return logging.getLogger(name)
+
+
+register_metrics("logging", get_logging_stats)
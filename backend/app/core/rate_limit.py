@@ -1,5 +1,148 @@
-"""Rate limiting для защиты от brute force и спама."""
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+"""Rate limiting для защиты от brute force и спама. Общий для всех воркеров и реплик: счётчики в Redis.
 
-limiter = Limiter(key_func=get_remote_address)
+Алгоритм — скользящее окно из двух фиксированных окон (текущее + взвешенное предыдущее); проверка и
+инкремент — один атомарный Lua-вызов (EVALSHA). Локально в процессе:
+- заблокированный ключ отклоняется без Redis до конца блокировки;
+- при больших лимитах воркер резервирует в Redis сразу пачку разрешений (RATE_LIMIT_LOCAL_FRACTION от лимита)
+  и расходует её локально. Резерв засчитывается в Redis заранее, поэтому суммарно лимит не превышается."""
+import hashlib
+import math
+import time
+
+from fastapi import Depends, HTTPException, Request
+from redis.asyncio import Redis
+from redis.exceptions import NoScriptError, RedisError
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import register_metrics
+from app.core.redis import get_redis
+
+logger = get_logger(__name__)
+
+# KEYS: текущее окно, предыдущее окно. ARGV: лимит, длина окна (мс), сейчас (мс), сколько разрешений резервировать.
+# Возвращает {выдано разрешений, через сколько мс повторять при отказе}.
+_SLIDING_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local want = tonumber(ARGV[4])
+local elapsed = now % window
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local used = previous * (window - elapsed) / window + current
+local room = math.floor(limit - used)
+if room < 1 then
+    return {0, window - elapsed}
+end
+local granted = math.min(want, room)
+redis.call('INCRBY', KEYS[1], granted)
+redis.call('PEXPIRE', KEYS[1], window * 2)
+return {granted, 0}
+"""
+_SLIDING_WINDOW_SHA = hashlib.sha1(_SLIDING_WINDOW_LUA.encode()).hexdigest()
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_LOCAL_STATE_MAX_KEYS = 10_000
+
+
+def parse_limit(limit: str) -> tuple[int, int]:
+    """"10/minute" -> (10, 60000): число запросов и длина окна в миллисекундах."""
+    count, _, period = limit.partition("/")
+    if period not in _PERIODS:
+        raise ValueError(f"Invalid rate limit {limit!r}, expected '<count>/<second|minute|hour|day>'")
+    return int(count), _PERIODS[period] * 1000
+
+
+class RedisRateLimiter:
+    def __init__(self, local_fraction: float):
+        self._local_fraction = local_fraction
+        self._leases: dict[str, tuple[int, int]] = {}
+        self._blocked: dict[str, int] = {}
+        self._stats = {"allowed": 0, "denied": 0, "redis_calls": 0, "local_allowed": 0, "local_denied": 0, "errors": 0}
+
+    def stats(self) -> dict[str, int]:
+        return dict(self._stats)
+
+    def reset_local(self) -> None:
+        self._leases.clear()
+        self._blocked.clear()
+
+    def _trim_local_state(self) -> None:
+        if len(self._leases) > _LOCAL_STATE_MAX_KEYS:
+            self._leases.clear()
+        if len(self._blocked) > _LOCAL_STATE_MAX_KEYS:
+            self._blocked.clear()
+
+    async def _eval(self, redis: Redis, keys: list[str], args: list[int]) -> list[int]:
+        self._stats["redis_calls"] += 1
+        try:
+            return await redis.evalsha(_SLIDING_WINDOW_SHA, len(keys), *keys, *args)
+        except NoScriptError:
+            return await redis.eval(_SLIDING_WINDOW_LUA, len(keys), *keys, *args)
+
+    def _deny(self, key: str, limit: str, retry_after_ms: int) -> HTTPException:
+        self._stats["denied"] += 1
+        return HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded: {limit}",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after_ms / 1000)))},
+        )
+
+    async def hit(self, redis: Redis, scope: str, identity: str, limit: str) -> None:
+        """Засчитывает запрос для ключа scope:identity. При превышении — HTTPException 429 с Retry-After.
+        Если Redis недоступен, запрос пропускается (fail-open), ошибка учитывается в метриках."""
+        count, window_ms = parse_limit(limit)
+        key = f"rl:{scope}:{identity}"
+        now_ms = int(time.time() * 1000)
+        window = now_ms // window_ms
+
+        blocked_until = self._blocked.get(key)
+        if blocked_until is not None:
+            if now_ms < blocked_until:
+                self._stats["local_denied"] += 1
+                raise self._deny(key, limit, blocked_until - now_ms)
+            del self._blocked[key]
+
+        lease_window, tokens = self._leases.get(key, (window, 0))
+        if lease_window == window and tokens > 0:
+            self._leases[key] = (window, tokens - 1)
+            self._stats["local_allowed"] += 1
+            self._stats["allowed"] += 1
+            return
+
+        want = max(1, int(count * self._local_fraction))
+        try:
+            granted, retry_after_ms = await self._eval(
+                redis, [f"{key}:{window}", f"{key}:{window - 1}"], [count, window_ms, now_ms, want]
+            )
+        except RedisError as e:
+            self._stats["errors"] += 1
+            logger.warning("Rate limiter unavailable, allowing request key=%s: %s", key, e)
+            return
+        self._trim_local_state()
+        if granted < 1:
+            self._blocked[key] = now_ms + int(retry_after_ms)
+            logger.warning("Rate limit exceeded key=%s limit=%s", key, limit)
+            raise self._deny(key, limit, int(retry_after_ms))
+        self._leases[key] = (window, int(granted) - 1)
+        self._stats["allowed"] += 1
+
+
+limiter = RedisRateLimiter(settings.RATE_LIMIT_LOCAL_FRACTION)
+
+register_metrics("rate_limit", limiter.stats)
+
+
+def get_remote_address(request: Request) -> str:
+    return request.client.host if request.client else "127.0.0.1"
+
+
+def rate_limit(limit: str, scope: str):
+    """FastAPI Depends: лимит на маршрут по IP клиента, например Depends(rate_limit("10/minute", "auth_login"))."""
+    parse_limit(limit)
+
+    async def dependency(request: Request, redis: Redis = Depends(get_redis)) -> None:
+        await limiter.hit(redis, scope, get_remote_address(request), limit)
+
+    return dependency
@@ -1,14 +1,16 @@
 from datetime import datetime, timedelta, timezone
-import smtplib
-from email.mime.text import MIMEText
-from typing import Optional
+from pathlib import Path
+from typing import Any, Optional
 
 import bcrypt
 import jwt
+from jwt.algorithms import get_default_algorithms
+from jwt.exceptions import InvalidKeyError
 from starlette.responses import Response
 
 from app.core.config import settings
 from app.core.logging import get_logger
+from app.core.token_cache import access_token_cache
 
 logger = get_logger(__name__)
 
@@ -17,34 +19,90 @@ REFRESH_TOKEN_DURATION_MIN = 30 * 24 * 60
 ACCESS_TOKEN_COOKIE_MAX_AGE = 30 * 60
 REFRESH_TOKEN_COOKIE_MAX_AGE = 30 * 24 * 60 * 60
 
-_jwt_private_key: Optional[str] = None
-_jwt_public_key: Optional[str] = None
+SUPPORTED_ALGORITHMS = ("RS256", "ES256", "EdDSA")
 
+# Ключ подписи текущего kid и набор ключей проверки {kid: (algorithm, key)}.
+# Ключи хранятся уже разобранными объектами cryptography — PEM не парсится на каждый токен.
+_signing_key: Optional[tuple[str, str, Any]] = None
+_verify_keys: dict[str, tuple[str, Any]] = {}
 
-def _get_jwt_private_key() -> str:
-    """Ленивая загрузка приватного ключа при первом использовании."""
-    global _jwt_private_key
-    if _jwt_private_key is None:
-        if not settings.JWT_PRIVATE_KEY.exists():
-            raise RuntimeError(
-                f"JWT private key not found: {settings.JWT_PRIVATE_KEY}. "
-                "Create jwt_tokens/ and add jwt-private.pem (see README)."
-            )
-        _jwt_private_key = settings.JWT_PRIVATE_KEY.read_text()
-    return _jwt_private_key
 
+def _read_key(path: Path, kind: str) -> str:
+    if not path.exists():
+        raise RuntimeError(
+            f"JWT {kind} key not found: {path}. "
+            f"Create jwt_tokens/ and add {path.name} (see README)."
+        )
+    return path.read_text()
+
+
+def _prepare_key(algorithm: str, pem: str, private: bool) -> Any:
+    if algorithm not in SUPPORTED_ALGORITHMS:
+        raise RuntimeError(f"Unsupported JWT algorithm: {algorithm}. Use one of {', '.join(SUPPORTED_ALGORITHMS)}")
+    algo = get_default_algorithms()[algorithm]
+    try:
+        key = algo.prepare_key(pem)
+    except (InvalidKeyError, ValueError) as e:
+        raise RuntimeError(f"JWT key does not match algorithm {algorithm}: {e}") from e
+    is_private = not hasattr(key, "verify")
+    if is_private != private:
+        raise RuntimeError(f"JWT {'private' if private else 'public'} key expected for {algorithm}")
+    return key
+
+
+def _parse_extra_verify_keys(value: str) -> list[tuple[str, str, Path]]:
+    """JWT_EXTRA_VERIFY_KEYS: "kid:ALG:path,kid2:ALG:path2" — публичные ключи, которые ещё принимаются при проверке."""
+    entries = []
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        parts = item.split(":", 2)
+        if len(parts) != 3:
+            raise RuntimeError(f"Invalid JWT_EXTRA_VERIFY_KEYS entry {item!r}, expected kid:ALG:path")
+        kid, algorithm, path = parts
+        entries.append((kid, algorithm, Path(path)))
+    return entries
+
+
+def load_jwt_keys() -> None:
+    """Загружает ключ подписи и все ключи проверки. Вызывается при старте; при ошибке — RuntimeError."""
+    global _signing_key, _verify_keys
+    algorithm = settings.ALGORITHM
+    private_key = _prepare_key(algorithm, _read_key(settings.JWT_PRIVATE_KEY, "private"), private=True)
+    verify_keys = {
+        settings.JWT_KEY_ID: (
+            algorithm,
+            _prepare_key(algorithm, _read_key(settings.JWT_PUBLIC_KEY, "public"), private=False),
+        )
+    }
+    for kid, extra_algorithm, path in _parse_extra_verify_keys(settings.JWT_EXTRA_VERIFY_KEYS):
+        verify_keys[kid] = (extra_algorithm, _prepare_key(extra_algorithm, _read_key(path, "public"), private=False))
+    _signing_key = (settings.JWT_KEY_ID, algorithm, private_key)
+    _verify_keys = verify_keys
+
+
+def _get_signing_key() -> tuple[str, str, Any]:
+    if _signing_key is None:
+        load_jwt_keys()
+    return _signing_key
 
-def _get_jwt_public_key() -> str:
-    """Ленивая загрузка публичного ключа при первом использовании."""
-    global _jwt_public_key
-    if _jwt_public_key is None:
-        if not settings.JWT_PUBLIC_KEY.exists():
-            raise RuntimeError(
-                f"JWT public key not found: {settings.JWT_PUBLIC_KEY}. "
-                "Create jwt_tokens/ and add jwt-public.pem (see README)."
-            )
-        _jwt_public_key = settings.JWT_PUBLIC_KEY.read_text()
-    return _jwt_public_key
+
+def _get_verify_keys(token: str) -> list[tuple[str, Any]]:
+    """Ключи-кандидаты для токена: по kid из заголовка; токены без kid (выданные до ротации) — по alg."""
+    if _signing_key is None:
+        load_jwt_keys()
+    header = jwt.get_unverified_header(token)
+    kid = header.get("kid")
+    if kid is not None:
+        if kid not in _verify_keys:
+            raise jwt.InvalidTokenError(f"Unknown key id: {kid}")
+        return [_verify_keys[kid]]
+    return [entry for entry in _verify_keys.values() if entry[0] == header.get("alg")]
+
+
+def reload_jwt_keys() -> None:
+    """Перечитывает ключи с диска (ротация). Проверенные старым ключом токены в кэше больше не доверенные."""
+    load_jwt_keys()
+    access_token_cache.clear()
+    logger.info("JWT keys reloaded, verified token cache cleared")
 
 
 def get_password_hash(password: str) -> str:
@@ -62,11 +120,22 @@ def create_token(data_dict: dict, duration: int = 30) -> str:
     data = data_dict.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=duration)
     data.update({"exp": expire})
-    return jwt.encode(data, _get_jwt_private_key(), algorithm=settings.ALGORITHM)
+    kid, algorithm, key = _get_signing_key()
+    return jwt.encode(data, key, algorithm=algorithm, headers={"kid": kid})
 
 
 def decode_token(token: str) -> dict:
-    return jwt.decode(token, _get_jwt_public_key(), algorithms=[settings.ALGORITHM])
+    """Проверяет подпись ключом, выбранным по kid, и срок действия. Ошибки — исключения jwt.InvalidTokenError."""
+    candidates = _get_verify_keys(token)
+    if not candidates:
+        raise jwt.InvalidAlgorithmError("The specified alg value is not allowed")
+    for algorithm, key in candidates[:-1]:
+        try:
+            return jwt.decode(token, key, algorithms=[algorithm])
+        except jwt.InvalidSignatureError:
+            continue
+    algorithm, key = candidates[-1]
+    return jwt.decode(token, key, algorithms=[algorithm])
 
 
 def set_token(response: Response, token: str, key: str, max_age: int, path: str = "/") -> None:
@@ -85,34 +154,3 @@ def set_token(response: Response, token: str, key: str, max_age: int, path: str
 def clear_token(response: Response, key: str, path: str = "/") -> None:
     """Удаляет cookie с токеном."""
     response.delete_cookie(key=key, path=path, httponly=True, samesite="lax", secure=settings.SECURE_COOKIES)
-
-
-def send_code_email_gmail(to_email: str, code: str) -> None:
-    """Отправляет код на email. Если Gmail не настроен (dev/test), только логирует и не падает."""
-    if not settings.SEND_LOGIN_CODE_EMAIL or not settings.LOGIN_FOR_GMAIL or not settings.PASSWORD_FOR_GMAIL:
-        logger.warning(
-            "Email not configured (SEND_LOGIN_CODE_EMAIL=%s, LOGIN_FOR_GMAIL set=%s); "
-            "skipping send for %s",
-            settings.SEND_LOGIN_CODE_EMAIL,
-            bool(settings.LOGIN_FOR_GMAIL),
-            to_email,
-        )
-        if settings.ENVIRONMENT == "development":
-            logger.warning("DEV: confirmation code for %s: %s", to_email, code)
-        return
-    msg = MIMEText(f"Ваш код подтверждения: {code}\nДействует 10 минут.", "plain", "utf-8")
-    msg["Subject"] = "Код подтверждения"
-    msg["From"] = settings.LOGIN_FOR_GMAIL
-    msg["To"] = to_email
-    try:
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(settings.LOGIN_FOR_GMAIL, settings.PASSWORD_FOR_GMAIL)
-            server.sendmail(settings.LOGIN_FOR_GMAIL, [to_email], msg.as_string())
-    except smtplib.SMTPException as e:
-        logger.error("SMTP error sending to %s: %s", to_email, e)
-        raise
-    except OSError as e:
-        logger.error("Network error sending email to %s: %s", to_email, e)
-        raise
-    logger.info("Code email sent to %s", to_email) 
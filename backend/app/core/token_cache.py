@@ -0,0 +1,68 @@
+"""Кэш уже проверенных access-токенов: повторный запрос с тем же токеном не проверяет подпись заново.
+Ключ — SHA-256 токена, значение — (user_id, company_id, exp). Запись живёт не дольше exp самого токена."""
+import hashlib
+import time
+from collections import OrderedDict
+
+from app.core.config import settings
+from app.core.metrics import register_metrics
+
+
+class VerifiedTokenCache:
+    """Ограниченный LRU в памяти процесса. Работает в одном event loop, блокировки не нужны."""
+
+    def __init__(self, maxsize: int):
+        self._maxsize = maxsize
+        self._entries: OrderedDict[bytes, tuple[int, int | None, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> tuple[int, int | None] | None:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        user_id, company_id, exp = entry
+        if exp <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return user_id, company_id
+
+    def put(self, token: str, user_id: int, company_id: int | None, exp: float) -> None:
+        if self._maxsize <= 0:
+            return
+        key = self._key(token)
+        self._entries[key] = (user_id, company_id, exp)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, token: str) -> None:
+        self._entries.pop(self._key(token), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self._maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+access_token_cache = VerifiedTokenCache(settings.ACCESS_TOKEN_CACHE_SIZE)
+
+register_metrics("access_token_cache", access_token_cache.stats)
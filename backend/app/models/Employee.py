@@ -1,7 +1,7 @@
 from datetime import date
 from decimal import Decimal
 
-from sqlalchemy import ForeignKey, Integer, Numeric, String, Date
+from sqlalchemy import ForeignKey, Index, Integer, Numeric, String, Date
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.Base import Base
@@ -10,8 +10,16 @@ from app.models.Base import Base
 
 class Employee(Base):
     __tablename__ = 'employees'
+    # Составные индексы под keyset-пагинацию списка (company_id, ключ сортировки, id) и фильтр по статусу.
+    # Префикс company_id покрывает и выборки по внешнему ключу.
+    __table_args__ = (
+        Index('ix_employees_company_id_id', 'company_id', 'id'),
+        Index('ix_employees_company_id_last_name_id', 'company_id', 'last_name', 'id'),
+        Index('ix_employees_company_id_hire_date_id', 'company_id', 'hire_date', 'id'),
+        Index('ix_employees_company_id_status_id', 'company_id', 'status', 'id'),
+    )
 
-    company_id: Mapped[int] = mapped_column(Integer, ForeignKey('companies.id'), nullable=False, index=True)
+    company_id: Mapped[int] = mapped_column(Integer, ForeignKey('companies.id'), nullable=False)
     first_name: Mapped[str] = mapped_column(String(150), nullable=False)
     last_name: Mapped[str] = mapped_column(String(150), nullable=False)
     middle_name: Mapped[str] = mapped_column(String(150), nullable=False)
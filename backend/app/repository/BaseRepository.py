@@ -1,6 +1,6 @@
-from typing import Type, TypeVar, Optional
+from typing import Any, Type, TypeVar, Optional
 
-from sqlalchemy import select
+from sqlalchemy import inspect, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.Base import Base
@@ -20,17 +20,36 @@ class BaseRepository:
         return result.scalars().all()
 
     async def create(self, session: AsyncSession, data: ModelT) -> ModelT:
-        session.add(data)
-        await session.flush()
-        await session.refresh(data)
-        return data
-    
+        """INSERT ... RETURNING * одним запросом (без отдельного SELECT на refresh)."""
+        values = {
+            attr.key: getattr(data, attr.key)
+            for attr in inspect(self._model).column_attrs
+            if getattr(data, attr.key) is not None
+        }
+        result = await session.scalars(insert(self._model).returning(self._model), [values])
+        return result.one()
+
     async def update(self, session: AsyncSession, data: ModelT) -> ModelT:
         session.add(data)
         await session.flush()
-        await session.refresh(data)
         return data
-    
+
+    async def update_where(self, session: AsyncSession, values: dict[str, Any], *criteria) -> Optional[ModelT]:
+        """UPDATE ... SET <только переданные колонки> WHERE <criteria> RETURNING * одним запросом, без загрузки строки.
+        Возвращает обновлённую строку или None, если под условие ничего не попало."""
+        if not values:
+            result = await session.execute(select(self._model).where(*criteria))
+            return result.scalars().first()
+        stmt = (
+            update(self._model)
+            .where(*criteria)
+            .values(**values)
+            .returning(self._model)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        result = await session.execute(stmt)
+        return result.scalars().first()
+
     async def delete(self, session: AsyncSession, data: ModelT) -> None:
         await session.delete(data)
         await session.flush()
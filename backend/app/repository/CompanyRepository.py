@@ -1,3 +1,5 @@
+from typing import Any
+
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.Company import Company
@@ -11,4 +13,6 @@ class CompanyRepository(BaseRepository):
     async def get_by_user_id(self, session: AsyncSession, user_id: int) -> Company | None:
         result = await session.execute(select(Company).where(Company.owner_id == user_id))
         return result.scalar_one_or_none()
-        
\ No newline at end of file
+        
+    async def update_by_user_id(self, session: AsyncSession, user_id: int, values: dict[str, Any]) -> Company | None:
+        return await self.update_where(session, values, Company.owner_id == user_id)
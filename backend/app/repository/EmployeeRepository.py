@@ -1,15 +1,124 @@
-from sqlalchemy import select
+from collections.abc import AsyncIterator, Sequence
+from datetime import date
+from typing import Any, Optional
+
+from sqlalchemy import Integer, Row, any_, bindparam, delete, func, insert, select, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.Employee import Employee
 from app.repository.BaseRepository import BaseRepository
 
+# Ключи сортировки списка; у каждого есть составной индекс (company_id, <ключ>, id).
+SORT_COLUMNS = {
+    "id": Employee.id,
+    "last_name": Employee.last_name,
+    "hire_date": Employee.hire_date,
+}
+
 
 class EmployeeRepository(BaseRepository):
     def __init__(self) -> None:
         super().__init__(Employee)
 
-    async def get_all_by_company_id(self, session: AsyncSession, company_id: int) -> list[Employee]:
-        result = await session.execute(select(Employee).where(Employee.company_id == company_id))
+    async def update_for_company(
+        self, session: AsyncSession, employee_id: int, company_id: int, values: dict[str, Any]
+    ) -> Optional[Employee]:
+        """Частичное обновление сотрудника; None — если сотрудника нет или он из другой компании."""
+        return await self.update_where(session, values, Employee.id == employee_id, Employee.company_id == company_id)
+
+    @staticmethod
+    def _filters(
+        company_id: int,
+        status: Optional[str] = None,
+        position: Optional[str] = None,
+        hire_date_from: Optional[date] = None,
+        hire_date_to: Optional[date] = None,
+    ) -> list:
+        criteria = [Employee.company_id == company_id]
+        if status is not None:
+            criteria.append(Employee.status == status)
+        if position is not None:
+            criteria.append(Employee.position == position)
+        if hire_date_from is not None:
+            criteria.append(Employee.hire_date >= hire_date_from)
+        if hire_date_to is not None:
+            criteria.append(Employee.hire_date <= hire_date_to)
+        return criteria
+
+    async def get_page_by_company_id(
+        self,
+        session: AsyncSession,
+        company_id: int,
+        limit: int,
+        sort: str = "id",
+        descending: bool = False,
+        after: Optional[tuple[Any, int]] = None,
+        **filters,
+    ) -> list[Employee]:
+        """Страница сотрудников по ключу (sort, id). after — (значение ключа, id) последней строки предыдущей страницы."""
+        column = SORT_COLUMNS[sort]
+        criteria = self._filters(company_id, **filters)
+        if after is not None:
+            value, last_id = after
+            if sort == "id":
+                criteria.append(Employee.id < last_id if descending else Employee.id > last_id)
+            else:
+                key, bound = tuple_(column, Employee.id), tuple_(value, last_id)
+                criteria.append(key < bound if descending else key > bound)
+        order = [Employee.id] if sort == "id" else [column, Employee.id]
+        if descending:
+            order = [c.desc() for c in order]
+        result = await session.execute(select(Employee).where(*criteria).order_by(*order).limit(limit))
+        return list(result.scalars().all())
+
+    async def count_by_company_id(self, session: AsyncSession, company_id: int, **filters) -> int:
+        result = await session.execute(
+            select(func.count()).select_from(Employee).where(*self._filters(company_id, **filters))
+        )
+        return result.scalar_one()
+
+    async def get_by_ids_for_company(self, session: AsyncSession, company_id: int, ids: list[int]) -> list[Employee]:
+        """Один SELECT ... WHERE id = ANY(:ids) AND company_id = :cid. Чужие и несуществующие id не возвращаются."""
+        result = await session.scalars(
+            select(Employee).where(
+                Employee.id == any_(bindparam("ids", ids, type_=ARRAY(Integer))),
+                Employee.company_id == company_id,
+            )
+        )
+        return list(result.all())
+
+    async def delete_by_ids(self, session: AsyncSession, company_id: int, ids: list[int]) -> list[int]:
+        """Один DELETE ... WHERE id = ANY(:ids) AND company_id = :cid RETURNING id.
+        Чужие и несуществующие id не удаляются и не возвращаются — проверку количества делает вызывающий."""
+        result = await session.execute(
+            delete(Employee)
+            .where(
+                Employee.id == any_(bindparam("ids", ids, type_=ARRAY(Integer))),
+                Employee.company_id == company_id,
+            )
+            .returning(Employee.id)
+            .execution_options(synchronize_session=False)
+        )
         return list(result.scalars().all())
-        
\ No newline at end of file
+
+    async def insert_many(self, session: AsyncSession, rows: list[dict]) -> list[int]:
+        """Многострочный INSERT ... VALUES (...), (...) RETURNING id (пачками insertmanyvalues), без загрузки объектов в сессию."""
+        if not rows:
+            return []
+        result = await session.scalars(insert(Employee).returning(Employee.id, sort_by_parameter_order=True), rows)
+        return list(result.all())
+
+    async def stream_by_company_id(
+        self, session: AsyncSession, company_id: int, columns: Sequence[str], batch_size: int = 1000, **filters
+    ) -> AsyncIterator[Sequence[Row]]:
+        """Серверный курсор по сотрудникам компании: отдаёт пачки строк (только нужные колонки, без ORM-объектов)."""
+        stmt = (
+            select(*(getattr(Employee, c) for c in columns))
+            .where(*self._filters(company_id, **filters))
+            .order_by(Employee.id)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await session.stream(stmt)
+        async for partition in result.partitions():
+            yield partition
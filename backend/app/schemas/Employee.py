@@ -2,7 +2,7 @@ from datetime import date
 from decimal import Decimal
 from typing import Annotated, Optional
 
-from pydantic import Field
+from pydantic import BaseModel, Field
 
 from app.schemas.fields import (
     BaseContacts,
@@ -158,3 +158,39 @@ class EmployeeResponse(EmployeeBase):
     company_id: Id
 
     model_config = {"from_attributes": True}
+
+
+class EmployeePage(BaseModel):
+    items: list[EmployeeResponse]
+    next_cursor: Annotated[
+        Optional[str],
+        Field(None, description="Cursor for the next page; null on the last page."),
+    ]
+    total: Annotated[
+        Optional[int],
+        Field(None, description="Number of employees matching the filters; only with include_total=true."),
+    ]
+
+
+class EmployeeBatch(BaseModel):
+    items: Annotated[list[EmployeeResponse], Field(..., description="Found employees in the requested order.")]
+    not_found: Annotated[
+        list[int],
+        Field(..., description="Requested ids that do not exist or belong to another company."),
+    ]
+
+
+class EmployeeImportRowError(BaseModel):
+    row: Annotated[int, Field(..., description="Row number in the file (the header is row 1).")]
+    errors: Annotated[list[str], Field(..., description="Validation errors for the row.")]
+
+
+class EmployeeImportReport(BaseModel):
+    total_rows: Annotated[int, Field(..., description="Data rows read from the file.")]
+    imported: Annotated[int, Field(..., description="Employees created.")]
+    failed: Annotated[int, Field(..., description="Rows rejected by validation.")]
+    errors: Annotated[
+        list[EmployeeImportRowError],
+        Field(..., description="Per-row errors; capped, see errors_truncated."),
+    ]
+    errors_truncated: Annotated[bool, Field(False, description="More rows failed than are listed in errors.")]
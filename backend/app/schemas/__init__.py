@@ -1,6 +1,14 @@
 from .User import UserCreate, UserUpdate, UserResponse, Confirm, Login, LoginCachePayload
 from .Company import CompanyCreate, CompanyUpdate, CompanyResponse
-from .Employee import EmployeeCreate, EmployeeUpdate, EmployeeResponse
+from .Employee import (
+    EmployeeCreate,
+    EmployeeUpdate,
+    EmployeeResponse,
+    EmployeePage,
+    EmployeeBatch,
+    EmployeeImportRowError,
+    EmployeeImportReport,
+)
 from .Document import DocumentCreate, DocumentUpdate, DocumentResponse
 
 __all__ = [
@@ -16,6 +24,10 @@ __all__ = [
     "EmployeeCreate",
     "EmployeeUpdate",
     "EmployeeResponse",
+    "EmployeePage",
+    "EmployeeBatch",
+    "EmployeeImportRowError",
+    "EmployeeImportReport",
     "DocumentCreate",
     "DocumentUpdate",
     "DocumentResponse",
@@ -1,5 +1,3 @@
-import asyncio
-import json
 from random import randint
 from uuid import uuid4
 
@@ -10,23 +8,25 @@ from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core import (
+    check_password,
     create_token,
     get_logger,
-    get_password_hash,
-    send_code_email_gmail,
-    verify_password,
+    hash_password,
 )
+from app.core.codec import codec
+from app.core.email_outbox import enqueue_code_email
 from app.core.exceptions import AlreadyExistsError, EmailSendError, InvalidCodeError, UnauthorizedError
 from app.core.security import decode_token, REFRESH_TOKEN_DURATION_MIN
 from app.models.User import User
 from app.repository import CompanyRepository, UserRepository
 from app.schemas import CompanyResponse, Confirm, Login, LoginCachePayload, UserCreate, UserResponse
+from app.services.CompanyService import company_cache
 
 logger = get_logger(__name__)
 
 
 async def register(session: AsyncSession, redis: Redis, user_repo: UserRepository, user: UserCreate):
-    """Регистрация: проверяет уникальность email/телефона, отправляет код на email, сохраняет данные в Redis.
+    """Регистрация: проверяет уникальность email/телефона, ставит письмо с кодом в очередь, сохраняет данные в Redis.
     Returns:
         UUID (jti) для подтверждения в confirm_registration.
     Raises:
@@ -42,12 +42,12 @@ async def register(session: AsyncSession, redis: Redis, user_repo: UserRepositor
         logger.warning("User already in db email=%s", user.email)
         raise AlreadyExistsError("User already exists")
     user_data = user.model_dump()
-    user_data["password_hash"] = get_password_hash(user_data["password"])
+    user_data["password_hash"] = await hash_password(user_data["password"])
     user_data.pop("password")
     code = "".join(str(randint(0, 9)) for _ in range(6))
     reg_id = uuid4()
     try:
-        await asyncio.to_thread(send_code_email_gmail, user_data["email"], code)
+        await enqueue_code_email(redis, user_data["email"], code)
     except Exception as e:
         logger.exception("Failed to send registration email to %s", user_data["email"])
         raise EmailSendError(
@@ -55,7 +55,7 @@ async def register(session: AsyncSession, redis: Redis, user_repo: UserRepositor
         ) from e
     await redis.set(user_data["email"], "registering", ex=60 * 15)
     await redis.set(user_data["phone_number"], "registering", ex=60 * 15)
-    await redis.set(f"{reg_id}_{code}", json.dumps(user_data), ex=60 * 15)
+    await redis.set(f"{reg_id}_{code}", codec.dumps(user_data), ex=60 * 15)
     logger.info("Register code sent jti=%s", reg_id)
     return reg_id
 
@@ -72,7 +72,7 @@ async def confirm_registration(session: AsyncSession, redis: Redis, user_repo: U
     if payload is None:
         logger.warning("Invalid confirm code jti=%s", data.jti)
         raise InvalidCodeError("Invalid code")
-    user_data = json.loads(payload)
+    user_data = codec.loads(payload)
     await redis.delete(f"{data.jti}_{data.code}")
     await redis.delete(user_data["email"])
     await redis.delete(user_data["phone_number"])
@@ -88,7 +88,7 @@ async def confirm_registration(session: AsyncSession, redis: Redis, user_repo: U
 
 
 async def login(session: AsyncSession, redis: Redis, user_repo: UserRepository, data: Login):
-    """Вход: проверяет email и пароль, отправляет код на email, сохраняет данные пользователя в Redis.
+    """Вход: проверяет email и пароль, ставит письмо с кодом в очередь, сохраняет данные пользователя в Redis.
     Returns:
         UUID (jti) для подтверждения в confirm_login.
     Raises:
@@ -99,20 +99,20 @@ async def login(session: AsyncSession, redis: Redis, user_repo: UserRepository,
     if user_in_db is None:
         logger.warning("Login failed user not found email=%s", data.email)
         raise UnauthorizedError("Invalid email or password")
-    if not verify_password(data.password, user_in_db.password_hash):
+    if not await check_password(data.password, user_in_db.password_hash):
         logger.warning("Login failed wrong password email=%s", data.email)
         raise UnauthorizedError("Invalid email or password")
     user_data = UserResponse.model_validate(user_in_db).model_dump()
     code = "".join(str(randint(0, 9)) for _ in range(6))
     reg_id = uuid4()
     try:
-        await asyncio.to_thread(send_code_email_gmail, user_data["email"], code)
+        await enqueue_code_email(redis, user_data["email"], code)
     except Exception as e:
         logger.exception("Failed to send login email to %s", user_data["email"])
         raise EmailSendError(
             "Could not send verification email. Check Gmail/SMTP or set SEND_LOGIN_CODE_EMAIL=false in backend/.env for local dev."
         ) from e
-    await redis.set(f"{reg_id}_{code}", json.dumps(user_data), ex=60 * 15)
+    await redis.set(f"{reg_id}_{code}", codec.dumps(user_data), ex=60 * 15)
     logger.info("Login code sent jti=%s", reg_id)
     return reg_id
 
@@ -130,8 +130,8 @@ async def confirm_login(session: AsyncSession, redis: Redis, company_repo: Compa
         logger.warning("Invalid login code jti=%s", data.jti)
         raise InvalidCodeError("Invalid code")
     try:
-        user_data = LoginCachePayload.model_validate(json.loads(payload))
-    except (json.JSONDecodeError, ValidationError) as e:
+        user_data = LoginCachePayload.model_validate(codec.loads(payload))
+    except (ValueError, ValidationError) as e:
         logger.warning("Invalid login cache payload jti=%s: %s", data.jti, e)
         raise InvalidCodeError("Invalid code")
     await redis.delete(f"{data.jti}_{data.code}")
@@ -144,11 +144,7 @@ async def confirm_login(session: AsyncSession, redis: Redis, company_repo: Compa
     await redis.set(f"{user_data.id}_refresh_token", refresh_token, ex=60 * 60 * 24 * 30)
     message = "you do not have a company yet"
     if company_in_db:
-        await redis.set(
-            f"company_{company_in_db.owner_id}",
-            json.dumps(CompanyResponse.model_validate(company_in_db).model_dump()),
-            ex=60 * 30,
-        )
+        await company_cache.set(redis, company_in_db.owner_id, CompanyResponse.model_validate(company_in_db))
         message = "success"
     logger.info("User logged in id=%s company_id=%s", user_data.id, company_in_db.id if company_in_db else None)
     return access_token, refresh_token, message
@@ -1,9 +1,9 @@
-import json
-
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core import create_token, get_logger
+from app.core.cache import TwoTierCache
+from app.core.database import read_from_primary
 from app.core.exceptions import AlreadyExistsError, NotFoundError
 from app.models.Company import Company
 from app.repository import CompanyRepository
@@ -11,6 +11,9 @@ from app.schemas import CompanyCreate, CompanyResponse, CompanyUpdate
 
 logger = get_logger(__name__)
 
+# Ключ — id владельца: company_{user_id}.
+company_cache = TwoTierCache("company", CompanyResponse)
+
 
 async def create_company(
     session: AsyncSession, redis: Redis, company_repo: CompanyRepository, company_data: CompanyCreate, user_id: int
@@ -24,7 +27,7 @@ async def create_company(
     company["owner_id"] = user_id
     company_in_db = await company_repo.create(session, Company(**company))
     result = CompanyResponse.model_validate(company_in_db)
-    await redis.set(f"company_{user_id}", json.dumps(result.model_dump()), ex=60 * 30)
+    await company_cache.set(redis, user_id, result)
     await session.commit()
     data_for_token = {"sub": str(user_id), "company_id": company_in_db.id}
     access_token = create_token(data_for_token)
@@ -35,18 +38,21 @@ async def create_company(
 async def get_company(
     session: AsyncSession, redis: Redis, company_repo: CompanyRepository, user_id: int
 ):
-    """Возвращает компанию пользователя. Сначала проверяет кэш Redis, при промахе — БД."""
+    """Возвращает компанию пользователя. Сначала проверяет кэш (память воркера, затем Redis), при промахе — БД.
+    Одновременные промахи по одному пользователю выполняют один запрос в БД; промах читается с primary,
+    чтобы в общий кэш не попала строка с отстающей реплики."""
     logger.debug("Getting company for user_id=%s", user_id)
-    cached = await redis.get(f"company_{user_id}")
-    if cached:
-        logger.debug("Company from cache user_id=%s", user_id)
-        return CompanyResponse.model_validate(json.loads(cached))
-    company_in_db = await company_repo.get_by_user_id(session, user_id)
-    if not company_in_db:
+
+    async def load() -> CompanyResponse | None:
+        logger.debug("Company cache miss user_id=%s", user_id)
+        with read_from_primary(session):
+            company_in_db = await company_repo.get_by_user_id(session, user_id)
+        return CompanyResponse.model_validate(company_in_db) if company_in_db else None
+
+    result = await company_cache.get_or_load(redis, user_id, load)
+    if not result:
         logger.warning("Company not found user_id=%s", user_id)
         raise NotFoundError("Company not found")
-    result = CompanyResponse.model_validate(company_in_db)
-    await redis.set(f"company_{user_id}", json.dumps(result.model_dump()), ex=60 * 30)
     return result
 
 
@@ -55,17 +61,12 @@ async def update_company(
 ):
     """Частично обновляет компанию, инвалидирует и обновляет кэш."""
     logger.info("Updating company for user_id=%s", user_id)
-    company_in_db = await company_repo.get_by_user_id(session, user_id)
+    company_in_db = await company_repo.update_by_user_id(session, user_id, company_data.model_dump(exclude_none=True))
     if not company_in_db:
         logger.warning("Company not found user_id=%s", user_id)
         raise NotFoundError("Company not found")
-    for key, value in company_data.model_dump(exclude_none=True).items():
-        setattr(company_in_db, key, value)
-    company_in_db = await company_repo.update(session, company_in_db)
     result = CompanyResponse.model_validate(company_in_db)
-    if await redis.get(f"company_{user_id}"):
-        await redis.delete(f"company_{user_id}")
-    await redis.set(f"company_{user_id}", json.dumps(result.model_dump()), ex=60 * 30)
     await session.commit()
+    await company_cache.set(redis, user_id, result, invalidate=True)
     logger.info("Company updated id=%s user_id=%s", company_in_db.id, user_id)
     return result
@@ -0,0 +1,104 @@
+"""Потоковая выгрузка сотрудников компании в CSV, NDJSON или XLSX. Строки читаются серверным курсором
+пачками и кодируются по мере чтения — в памяти одна пачка, а не вся компания."""
+import csv
+import io
+import json
+import tempfile
+from collections.abc import AsyncIterator, Sequence
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core import get_logger
+from app.core.exceptions import BadRequestError
+from app.repository import EmployeeRepository
+from app.schemas import EmployeeResponse
+
+try:
+    import openpyxl
+except ImportError:  # XLSX — опционально
+    openpyxl = None
+
+logger = get_logger(__name__)
+
+EXPORT_BATCH_SIZE = 1000
+# XLSX — zip с оглавлением в конце, поэтому книга собирается во временном файле (в памяти до 8 МБ) и отдаётся целиком.
+XLSX_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+XLSX_READ_CHUNK = 64 * 1024
+
+# Порядок как в EmployeeResponse: id, company_id, затем поля сотрудника. Имена совпадают с колонками импорта.
+EXPORT_COLUMNS = ["id", "company_id"] + [c for c in EmployeeResponse.model_fields if c not in ("id", "company_id")]
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def parse_columns(columns: Optional[str]) -> list[str]:
+    """"id,last_name,email" -> список колонок. Пусто — все колонки."""
+    if not columns:
+        return list(EXPORT_COLUMNS)
+    selected = [c.strip() for c in columns.split(",") if c.strip()]
+    unknown = [c for c in selected if c not in EXPORT_COLUMNS]
+    if unknown or not selected:
+        raise BadRequestError(f"Unknown columns: {', '.join(unknown)}; available: {', '.join(EXPORT_COLUMNS)}")
+    return list(dict.fromkeys(selected))
+
+
+async def _csv_chunks(batches: AsyncIterator[Sequence], columns: list[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    # BOM — чтобы Excel открыл кириллицу в UTF-8.
+    yield buffer.getvalue().encode("utf-8-sig")
+    async for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+
+
+async def _ndjson_chunks(batches: AsyncIterator[Sequence], columns: list[str]) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        lines = [json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) for row in batch]
+        yield ("\n".join(lines) + "\n").encode()
+
+
+def _append_rows(sheet, rows: Sequence) -> None:
+    for row in rows:
+        sheet.append(list(row))
+
+
+async def _xlsx_chunks(batches: AsyncIterator[Sequence], columns: list[str]) -> AsyncIterator[bytes]:
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Employees")
+    sheet.append(columns)
+    async for batch in batches:
+        await run_in_threadpool(_append_rows, sheet, batch)
+    with tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_MAX_SIZE) as file:
+        await run_in_threadpool(workbook.save, file)
+        file.seek(0)
+        while chunk := await run_in_threadpool(file.read, XLSX_READ_CHUNK):
+            yield chunk
+
+
+_ENCODERS = {"csv": _csv_chunks, "ndjson": _ndjson_chunks, "xlsx": _xlsx_chunks}
+
+
+def export_employees(
+    session: AsyncSession,
+    employee_repo: EmployeeRepository,
+    company_id: int,
+    export_format: str,
+    columns: list[str],
+    **filters,
+) -> AsyncIterator[bytes]:
+    """Возвращает асинхронный итератор байтов файла выгрузки (для StreamingResponse)."""
+    if export_format == "xlsx" and openpyxl is None:
+        raise BadRequestError("XLSX export is not available, install openpyxl or use csv/ndjson")
+    logger.info("Exporting employees company_id=%s format=%s", company_id, export_format)
+    batches = employee_repo.stream_by_company_id(session, company_id, columns, EXPORT_BATCH_SIZE, **filters)
+    return _ENCODERS[export_format](batches, columns)
@@ -0,0 +1,154 @@
+"""Массовый импорт сотрудников из CSV/XLSX. Файл читается потоково (UploadFile лежит во временном файле),
+строки валидируются по EmployeeCreate пачками в пуле потоков и вставляются многострочным INSERT ... RETURNING.
+В памяти одновременно только одна пачка, поэтому размер файла на потребление памяти не влияет."""
+import csv
+import io
+import zipfile
+from collections.abc import Iterator
+from datetime import datetime
+from itertools import islice
+from typing import Any, BinaryIO
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core import get_logger
+from app.core.exceptions import BadRequestError
+from app.repository import EmployeeRepository
+from app.schemas import EmployeeCreate, EmployeeImportReport, EmployeeImportRowError
+
+try:
+    import openpyxl
+    from openpyxl.utils.exceptions import InvalidFileException
+except ImportError:  # XLSX — опционально, CSV работает без openpyxl
+    openpyxl = None
+    InvalidFileException = ValueError
+
+logger = get_logger(__name__)
+
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_MAX_REPORTED_ERRORS = 1000
+
+UNSUPPORTED_FORMAT = "Unsupported file format, expected .csv or .xlsx"
+
+Row = tuple[int, dict[str, Any]]
+
+
+def _check_columns(columns: list[str]) -> None:
+    missing = [name for name in EmployeeCreate.model_fields if name not in columns]
+    if missing:
+        raise BadRequestError(f"Missing columns: {', '.join(missing)}")
+
+
+def _csv_rows(file: BinaryIO) -> Iterator[Row]:
+    """Строки CSV в UTF-8 (с BOM или без). Разделитель — ',' или ';' (экспорт Excel), определяется по заголовку."""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    header = text.readline()
+    delimiter = ";" if header.count(";") > header.count(",") else ","
+    columns = [c.strip() for c in next(csv.reader([header], delimiter=delimiter), [])]
+    _check_columns(columns)
+    for line_number, values in enumerate(csv.reader(text, delimiter=delimiter), start=2):
+        if not any(v.strip() for v in values):
+            continue
+        yield line_number, dict(zip(columns, values))
+
+
+def _xlsx_cell(value: Any) -> Any:
+    # Excel хранит ИНН, СНИЛС, телефоны как числа, а даты — как datetime.
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _xlsx_rows(file: BinaryIO) -> Iterator[Row]:
+    """Строки первого листа XLSX. read_only — openpyxl читает лист потоково, не загружая книгу целиком.
+    Не zip (повреждённый или переименованный файл) и zip без частей книги — BadRequestError, а не 500."""
+    try:
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as e:
+        raise BadRequestError(f"Could not read file: not a valid XLSX workbook ({e})")
+    try:
+        if not workbook.worksheets:
+            raise BadRequestError("Could not read file: XLSX workbook has no sheets")
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        columns = [str(c).strip() if c is not None else "" for c in next(rows, ())]
+        _check_columns(columns)
+        for line_number, values in enumerate(rows, start=2):
+            if all(v is None or v == "" for v in values):
+                continue
+            yield line_number, {c: _xlsx_cell(v) for c, v in zip(columns, values)}
+    except (zipfile.BadZipFile, KeyError) as e:
+        # Части листа читаются лениво: битый архив или ссылка на отсутствующую часть всплывают при обходе.
+        raise BadRequestError(f"Could not read file: malformed XLSX sheet ({e})")
+    finally:
+        workbook.close()
+
+
+def _open_rows(file: BinaryIO, filename: str) -> Iterator[Row]:
+    name = filename.lower()
+    if name.endswith(".csv"):
+        return _csv_rows(file)
+    if name.endswith(".xlsx"):
+        if openpyxl is None:
+            raise BadRequestError("XLSX import is not available, install openpyxl or upload CSV")
+        return _xlsx_rows(file)
+    raise BadRequestError(UNSUPPORTED_FORMAT)
+
+
+def _format_errors(error: ValidationError) -> list[str]:
+    return [f"{'.'.join(str(p) for p in e['loc']) or 'row'}: {e['msg']}" for e in error.errors()]
+
+
+def _next_chunk(rows: Iterator[Row], company_id: int) -> tuple[int, list[dict], list[EmployeeImportRowError]]:
+    """Читает и валидирует следующую пачку строк (выполняется в пуле потоков: чтение файла и pydantic — синхронные)."""
+    read = 0
+    valid, errors = [], []
+    try:
+        for line_number, raw in islice(rows, IMPORT_CHUNK_SIZE):
+            read += 1
+            try:
+                employee = EmployeeCreate.model_validate(raw)
+            except ValidationError as e:
+                errors.append(EmployeeImportRowError(row=line_number, errors=_format_errors(e)))
+                continue
+            data = employee.model_dump()
+            data["company_id"] = company_id
+            valid.append(data)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise BadRequestError(f"Could not read file: {e}")
+    return read, valid, errors
+
+
+async def import_employees(
+    session: AsyncSession, employee_repo: EmployeeRepository, file: BinaryIO, filename: str, company_id: int
+) -> EmployeeImportReport:
+    """Импортирует сотрудников из файла. Невалидные строки пропускаются и попадают в отчёт,
+    валидные вставляются в одной транзакции (commit в конце)."""
+    logger.info("Importing employees company_id=%s file=%s", company_id, filename)
+    rows = _open_rows(file, filename)
+    total = imported = failed = 0
+    reported: list[EmployeeImportRowError] = []
+    while True:
+        read, valid, errors = await run_in_threadpool(_next_chunk, rows, company_id)
+        if not read:
+            break
+        total += read
+        failed += len(errors)
+        reported.extend(errors[: IMPORT_MAX_REPORTED_ERRORS - len(reported)])
+        imported += len(await employee_repo.insert_many(session, valid))
+    await session.commit()
+    logger.info("Employees imported company_id=%s imported=%s failed=%s", company_id, imported, failed)
+    return EmployeeImportReport(
+        total_rows=total,
+        imported=imported,
+        failed=failed,
+        errors=reported,
+        errors_truncated=failed > len(reported),
+    )
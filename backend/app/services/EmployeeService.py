@@ -1,25 +1,70 @@
+import base64
+import binascii
 import json
+from datetime import date
+from typing import Optional
 
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core import get_logger
-from app.core.exceptions import NotFoundError
+from app.core.cache import TwoTierCache
+from app.core.database import read_from_primary
+from app.core.exceptions import BadRequestError, NotFoundError
 from app.models.Employee import Employee
 from app.repository import EmployeeRepository
-from app.schemas import EmployeeCreate, EmployeeResponse, EmployeeUpdate
+from app.schemas import EmployeeBatch, EmployeeCreate, EmployeePage, EmployeeResponse, EmployeeUpdate
 
 logger = get_logger(__name__)
 
 EMPLOYEE_NOT_FOUND = "Employee not found or you are not the owner of the company"
 
+employee_cache = TwoTierCache("employee", EmployeeResponse)
+
+
+INVALID_CURSOR = "Invalid cursor"
+
+
+def _encode_cursor(sort: str, descending: bool, employee: EmployeeResponse) -> str:
+    value = getattr(employee, sort)
+    if isinstance(value, date):
+        value = value.isoformat()
+    raw = json.dumps({"s": sort, "d": descending, "v": value, "id": employee.id}, ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str, sort: str, descending: bool) -> tuple:
+    """Возвращает (значение ключа, id) из курсора. Курсор действителен только для той же сортировки."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if data["s"] != sort or data["d"] != descending:
+            raise BadRequestError("Cursor does not match sort order")
+        value = date.fromisoformat(data["v"]) if sort == "hire_date" else data["v"]
+        return value, int(data["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise BadRequestError(INVALID_CURSOR)
+
 
 async def list_employees(
-    session: AsyncSession, employee_repo: EmployeeRepository, company_id: int
-) -> list[EmployeeResponse]:
-    """Возвращает список всех сотрудников компании."""
-    employees = await employee_repo.get_all_by_company_id(session, company_id)
-    return [EmployeeResponse.model_validate(e) for e in employees]
+    session: AsyncSession,
+    employee_repo: EmployeeRepository,
+    company_id: int,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    descending: bool = False,
+    include_total: bool = False,
+    **filters,
+) -> EmployeePage:
+    """Страница сотрудников компании (keyset по (sort, id)) с фильтрами status, position, hire_date_from/to."""
+    after = _decode_cursor(cursor, sort, descending) if cursor else None
+    employees = await employee_repo.get_page_by_company_id(
+        session, company_id, limit + 1, sort=sort, descending=descending, after=after, **filters
+    )
+    items = [EmployeeResponse.model_validate(e) for e in employees[:limit]]
+    next_cursor = _encode_cursor(sort, descending, items[-1]) if len(employees) > limit else None
+    total = await employee_repo.count_by_company_id(session, company_id, **filters) if include_total else None
+    return EmployeePage(items=items, next_cursor=next_cursor, total=total)
 
 
 async def create_employee(
@@ -32,7 +77,7 @@ async def create_employee(
     employee_instance = Employee(**employee_data)
     employee_in_db = await employee_repo.create(session, employee_instance)
     result = EmployeeResponse.model_validate(employee_in_db)
-    await redis.set(f"employee_{result.id}", result.model_dump_json(), ex=60 * 30)
+    await employee_cache.set(redis, result.id, result)
     await session.commit()
     logger.info("Employee created id=%s company_id=%s", result.id, company_id)
     return result
@@ -41,24 +86,44 @@ async def create_employee(
 async def get_employee(
     session: AsyncSession, redis: Redis, employee_repo: EmployeeRepository, employee_id: int, company_id: int
 ):
-    """Возвращает сотрудника по id. Проверяет принадлежность к компании. Использует кэш при наличии."""
+    """Возвращает сотрудника по id. Проверяет принадлежность к компании. Использует кэш при наличии;
+    одновременные промахи по одному сотруднику выполняют один запрос в БД (с primary — результат идёт в общий кэш)."""
     logger.debug("Getting employee id=%s company_id=%s", employee_id, company_id)
-    cached = await redis.get(f"employee_{employee_id}")
-    if cached:
-        data = json.loads(cached)
-        if data.get("company_id") == company_id:
-            logger.debug("Employee id=%s from cache", employee_id)
-            return EmployeeResponse.model_validate(data)
-    employee_in_db = await employee_repo.get_by_id(session, employee_id)
-    if not employee_in_db or employee_in_db.company_id != company_id:
+
+    async def load() -> EmployeeResponse | None:
+        logger.debug("Employee id=%s cache miss", employee_id)
+        with read_from_primary(session):
+            employee_in_db = await employee_repo.get_by_id(session, employee_id)
+        return EmployeeResponse.model_validate(employee_in_db) if employee_in_db else None
+
+    result = await employee_cache.get_or_load(redis, employee_id, load)
+    if not result or result.company_id != company_id:
         logger.warning("Employee not found or access denied id=%s company_id=%s", employee_id, company_id)
         raise NotFoundError(EMPLOYEE_NOT_FOUND)
-    result = EmployeeResponse.model_validate(employee_in_db)
-    await redis.set(f"employee_{result.id}", result.model_dump_json(), ex=60 * 30)
-    logger.debug("Employee id=%s from db, cached", employee_id)
     return result
 
 
+async def get_employees_batch(
+    session: AsyncSession, redis: Redis, employee_repo: EmployeeRepository, employee_ids: list[int], company_id: int
+) -> EmployeeBatch:
+    """Несколько сотрудников за один проход: кэш (L1, затем один MGET), промахи — одним SELECT ... = ANY(:ids)
+    с условием на компанию (с primary — результат идёт в общий кэш), найденное в БД кладётся в кэш одним конвейером.
+    Чужие и несуществующие id — в not_found."""
+    ids = list(dict.fromkeys(employee_ids))
+    logger.debug("Getting employees batch company_id=%s count=%s", company_id, len(ids))
+    found = await employee_cache.get_many(redis, ids)
+    misses = [employee_id for employee_id in ids if employee_id not in found]
+    if misses:
+        with read_from_primary(session):
+            rows = await employee_repo.get_by_ids_for_company(session, company_id, misses)
+        loaded = {e.id: EmployeeResponse.model_validate(e) for e in rows}
+        await employee_cache.set_many(redis, loaded)
+        found.update(loaded)
+    items = [found[i] for i in ids if i in found and found[i].company_id == company_id]
+    owned = {e.id for e in items}
+    return EmployeeBatch(items=items, not_found=[i for i in ids if i not in owned])
+
+
 async def update_employee(
     session: AsyncSession,
     redis: Redis,
@@ -69,16 +134,15 @@ async def update_employee(
 ):
     """Частично обновляет данные сотрудника, проверяет принадлежность к компании, обновляет кэш."""
     logger.info("Updating employee id=%s company_id=%s", employee_id, company_id)
-    employee_in_db = await employee_repo.get_by_id(session, employee_id)
-    if not employee_in_db or employee_in_db.company_id != company_id:
+    employee_in_db = await employee_repo.update_for_company(
+        session, employee_id, company_id, employee_data.model_dump(exclude_none=True)
+    )
+    if not employee_in_db:
         logger.warning("Employee not found or access denied id=%s company_id=%s", employee_id, company_id)
         raise NotFoundError(EMPLOYEE_NOT_FOUND)
-    for key, value in employee_data.model_dump(exclude_none=True).items():
-        setattr(employee_in_db, key, value)
-    employee_in_db = await employee_repo.update(session, employee_in_db)
     result = EmployeeResponse.model_validate(employee_in_db)
-    await redis.set(f"employee_{result.id}", result.model_dump_json(), ex=60 * 30)
     await session.commit()
+    await employee_cache.set(redis, result.id, result, invalidate=True)
     logger.info("Employee updated id=%s", employee_id)
     return result
 
@@ -86,15 +150,18 @@ async def update_employee(
 async def dismiss_employees(
     session: AsyncSession, redis: Redis, employee_repo: EmployeeRepository, employee_ids: list[int], company_id: int
 ):
-    """Удаляет сотрудников по списку id. Все должны принадлежать компании пользователя."""
-    logger.info("Dismissing employees company_id=%s", company_id)
-    for employee_id in employee_ids:
-        employee_in_db = await employee_repo.get_by_id(session, employee_id)
-        if not employee_in_db or employee_in_db.company_id != company_id:
-            logger.warning("Employee not found or access denied id=%s company_id=%s", employee_id, company_id)
-            raise NotFoundError(EMPLOYEE_NOT_FOUND)
-        await employee_repo.delete(session, employee_in_db)
-        await redis.delete(f"employee_{employee_id}")
-        logger.info("Employee dismissed id=%s", employee_id)
+    """Удаляет сотрудников по списку id одним запросом. Все должны принадлежать компании пользователя:
+    если хоть один не найден, не удаляется никто."""
+    logger.info("Dismissing employees company_id=%s count=%s", company_id, len(employee_ids))
+    ids = list(dict.fromkeys(employee_ids))
+    deleted = await employee_repo.delete_by_ids(session, company_id, ids)
+    if len(deleted) != len(ids):
+        await session.rollback()
+        missing = sorted(set(ids) - set(deleted))
+        logger.warning("Employees not found or access denied ids=%s company_id=%s", missing[:20], company_id)
+        raise NotFoundError(EMPLOYEE_NOT_FOUND)
     await session.commit()
-    return {"message": "Employees dismissed successfully"}
\ No newline at end of file
+    # Один многоключевой DEL и одно сообщение об инвалидации на всю пачку.
+    await employee_cache.invalidate(redis, *deleted)
+    logger.info("Employees dismissed count=%s company_id=%s", len(deleted), company_id)
+    return {"message": "Employees dismissed successfully"}
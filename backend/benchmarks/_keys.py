@@ -0,0 +1,33 @@
+"""Временные ключи JWT для бенчмарков: не трогают backend/jwt_tokens."""
+import tempfile
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from app.core import security
+
+
+def use_ephemeral_keys(algorithm: str = "RS256", kid: str = "bench") -> None:
+    """Генерирует пару ключей для algorithm, указывает на неё settings и загружает keyring."""
+    if algorithm == "RS256":
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm == "ES256":
+        key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        key = ed25519.Ed25519PrivateKey.generate()
+    directory = Path(tempfile.mkdtemp(prefix="jwt-bench-"))
+    private_path = directory / "private.pem"
+    public_path = directory / "public.pem"
+    private_path.write_bytes(
+        key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    )
+    public_path.write_bytes(
+        key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+    )
+    security.settings.ALGORITHM = algorithm
+    security.settings.JWT_KEY_ID = kid
+    security.settings.JWT_PRIVATE_KEY = private_path
+    security.settings.JWT_PUBLIC_KEY = public_path
+    security.settings.JWT_EXTRA_VERIFY_KEYS = ""
+    security.load_jwt_keys()
@@ -0,0 +1,46 @@
+"""Микробенчмарк: накладные расходы аутентификации на запрос (_get_validated_context) без кэша и с кэшем проверенных токенов.
+
+Запуск из backend/ (нужны переменные окружения, как для тестов):
+    python benchmarks/bench_access_token_cache.py [итераций]
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from _keys import use_ephemeral_keys  # noqa: E402
+from app.core import dependencies, security  # noqa: E402
+from app.core.token_cache import VerifiedTokenCache  # noqa: E402
+
+
+async def _run(token: str, iterations: int) -> float:
+    session, response, repo, redis = AsyncMock(), MagicMock(), MagicMock(), AsyncMock()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        request = SimpleNamespace(cookies={"access_token": token}, state=SimpleNamespace())
+        await dependencies._get_validated_context(request, response, session, repo, redis)
+    return (time.perf_counter() - started) / iterations
+
+
+async def main(iterations: int) -> None:
+    use_ephemeral_keys("RS256")
+    token = security.create_token({"sub": "1", "company_id": 1})
+
+    dependencies.access_token_cache = VerifiedTokenCache(maxsize=0)
+    uncached = await _run(token, iterations)
+
+    dependencies.access_token_cache = VerifiedTokenCache(maxsize=10_000)
+    cached = await _run(token, iterations)
+
+    print(f"iterations:        {iterations}")
+    print(f"without cache:     {uncached * 1e6:9.1f} us/request")
+    print(f"with cache:        {cached * 1e6:9.1f} us/request")
+    print(f"speedup:           {uncached / cached:9.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
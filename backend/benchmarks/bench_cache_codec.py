@@ -0,0 +1,77 @@
+"""Микробенчмарк: кодирование сотрудника для Redis — прежние варианты (json.dumps(model_dump()) + model_validate,
+model_dump_json + model_validate_json) против ModelCodec (список значений + model_construct) на json и orjson.
+Печатается время encode/decode на одну запись и размер значения в байтах.
+
+Запуск из backend/ (нужны переменные окружения, как для тестов):
+    python benchmarks/bench_cache_codec.py [итераций]
+"""
+import json
+import sys
+import time
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.codec import JsonCodec, ModelCodec, OrjsonCodec, orjson  # noqa: E402
+from app.schemas import EmployeeResponse  # noqa: E402
+
+EMPLOYEE = EmployeeResponse(
+    id=123456,
+    company_id=42,
+    email="ivan.ivanov@company.ru",
+    phone_number="+79991234567",
+    first_name="Иван",
+    last_name="Иванов",
+    middle_name="Иванович",
+    position="Ведущий специалист",
+    salary=Decimal("125000.50"),
+    status="active",
+    hire_date=date(2020, 1, 15),
+    passport_series="1234",
+    passport_number="567890",
+    passport_issued_date=date(2015, 5, 20),
+    passport_issued_place="ОВД района Хамовники г. Москвы",
+    passport_issued_code="770-001",
+    inn="123456789012",
+    snils="12345678901",
+    address="г. Москва, ул. Ленина, д. 1, кв. 2",
+)
+
+
+def _per_call(func, arg, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func(arg)
+    return (time.perf_counter() - started) / iterations
+
+
+def main(iterations: int) -> None:
+    variants = {
+        "json + model_validate": (
+            lambda e: json.dumps(e.model_dump(mode="json")),
+            lambda s: EmployeeResponse.model_validate(json.loads(s)),
+        ),
+        "model_dump_json / validate_json": (
+            EmployeeResponse.model_dump_json,
+            EmployeeResponse.model_validate_json,
+        ),
+    }
+    for value_codec in [JsonCodec()] + ([OrjsonCodec()] if orjson is not None else []):
+        model_codec = ModelCodec(EmployeeResponse, value_codec)
+        variants[f"ModelCodec[{type(value_codec).__name__}]"] = (model_codec.dumps, model_codec.loads)
+
+    print(f"iterations: {iterations}")
+    print(f"{'variant':34} {'encode us':>10} {'decode us':>10} {'bytes':>7}")
+    for name, (encode, decode) in variants.items():
+        data = encode(EMPLOYEE)
+        assert decode(data) == EMPLOYEE, name
+        encode_time = _per_call(encode, EMPLOYEE, iterations)
+        decode_time = _per_call(decode, data, iterations)
+        size = len(data.encode())
+        print(f"{name:34} {encode_time * 1e6:10.2f} {decode_time * 1e6:10.2f} {size:7d}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
@@ -0,0 +1,100 @@
+"""Бенчмарк: увольнение 1000 сотрудников — прежний цикл (get_by_id + delete/flush + DEL на каждого)
+против одного DELETE ... = ANY(:ids) RETURNING id и одного многоключевого DEL.
+
+БД и Redis заменены заглушками, которые считают round-trip'ы. Печатается время работы кода сервиса (без сети)
+и оценка сетевого времени: round-trip'ы * --rtt (по умолчанию 0.3 мс — Postgres/Redis в соседнем контейнере).
+
+Запуск из backend/ (нужны переменные окружения, как для тестов):
+    python benchmarks/bench_dismiss_employees.py [число id] [--rtt мс]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services import EmployeeService  # noqa: E402
+
+
+class _RoundTrips:
+    def __init__(self):
+        self.count = 0
+
+    async def __call__(self) -> None:
+        self.count += 1
+        await asyncio.sleep(0)
+
+
+class _Session:
+    def __init__(self, trips: _RoundTrips):
+        self._trips = trips
+
+    async def commit(self) -> None:
+        await self._trips()
+
+    async def rollback(self) -> None:
+        await self._trips()
+
+
+class _Redis:
+    def __init__(self, trips: _RoundTrips):
+        self._trips = trips
+
+    async def delete(self, *keys) -> None:
+        await self._trips()
+
+
+class _Repo:
+    """get_by_id/delete — как BaseRepository (SELECT; DELETE через flush), delete_by_ids — один запрос."""
+
+    def __init__(self, trips: _RoundTrips, company_id: int):
+        self._trips = trips
+        self._company_id = company_id
+
+    async def get_by_id(self, session, employee_id):
+        await self._trips()
+        return SimpleNamespace(id=employee_id, company_id=self._company_id)
+
+    async def delete(self, session, employee):
+        await self._trips()
+
+    async def delete_by_ids(self, session, company_id, ids):
+        await self._trips()
+        return list(ids)
+
+
+async def _dismiss_one_by_one(session, redis, employee_repo, employee_ids, company_id):
+    """Прежняя реализация EmployeeService.dismiss_employees."""
+    for employee_id in employee_ids:
+        employee_in_db = await employee_repo.get_by_id(session, employee_id)
+        if not employee_in_db or employee_in_db.company_id != company_id:
+            raise LookupError(employee_id)
+        await employee_repo.delete(session, employee_in_db)
+        await redis.delete(f"employee_{employee_id}")
+    await session.commit()
+
+
+async def _measure(fn, ids: list[int]) -> tuple[float, int]:
+    trips = _RoundTrips()
+    started = time.perf_counter()
+    await fn(_Session(trips), _Redis(trips), _Repo(trips, company_id=1), ids, 1)
+    return time.perf_counter() - started, trips.count
+
+
+async def main(count: int, rtt_ms: float) -> None:
+    ids = list(range(1, count + 1))
+    print(f"ids: {count}, rtt: {rtt_ms} ms")
+    for name, fn in (("one by one", _dismiss_one_by_one), ("bulk", EmployeeService.dismiss_employees)):
+        cpu, trips = await _measure(fn, ids)
+        print(f"{name:10s}: {trips:6d} round-trips, code {cpu * 1000:7.2f} ms, network ~{trips * rtt_ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("count", nargs="?", type=int, default=1000)
+    parser.add_argument("--rtt", type=float, default=0.3, help="задержка одного round-trip, мс")
+    args = parser.parse_args()
+    asyncio.run(main(args.count, args.rtt))
@@ -0,0 +1,37 @@
+"""Пропускная способность подписи и проверки JWT (create_token / decode_token) для RS256, ES256 и EdDSA.
+
+Запуск из backend/ (нужны переменные окружения, как для тестов):
+    python benchmarks/bench_jwt_algorithms.py [итераций]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from _keys import use_ephemeral_keys  # noqa: E402
+from app.core import security  # noqa: E402
+
+ALGORITHMS = ("RS256", "ES256", "EdDSA")
+
+
+def _ops_per_second(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return iterations / (time.perf_counter() - started)
+
+
+def main(iterations: int) -> None:
+    print(f"{'algorithm':<10}{'sign/s':>12}{'verify/s':>12}{'token bytes':>14}")
+    for algorithm in ALGORITHMS:
+        use_ephemeral_keys(algorithm)
+        data = {"sub": "1", "company_id": 1}
+        token = security.create_token(data)
+        sign = _ops_per_second(lambda: security.create_token(data), iterations)
+        verify = _ops_per_second(lambda: security.decode_token(token), iterations)
+        print(f"{algorithm:<10}{sign:>12,.0f}{verify:>12,.0f}{len(token):>14}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -3,21 +3,23 @@ import uvicorn
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
-from slowapi import _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
 
 from app import router
 from app.core.config import settings
-from app.core.rate_limit import limiter
 from app.api.health import router as health_router
+from app.core.cache import start_cache_invalidation, stop_cache_invalidation
+from app.core.database import close_database, mark_read_primary, replica_engine
+from app.core.email_outbox import start_email_outbox, stop_email_outbox
 from app.core.exceptions import AppException
-from app.core.logging import get_logger, setup_logging
-from app.core.redis import close_redis
-from app.core.security import _get_jwt_private_key, _get_jwt_public_key
+from app.core.hashing import shutdown_password_hasher, start_password_hasher
+from app.core.http_client import close_ai_chat_client, init_ai_chat_client
+from app.core.logging import get_logger, setup_logging, shutdown_logging
+from app.core.redis import close_redis, redis_client
+from app.core.security import load_jwt_keys
 
 setup_logging()
 logger = get_logger(__name__)
@@ -46,13 +48,22 @@ Cookies устанавливаются автоматически при `regist
 async def lifespan(app: FastAPI):
     # Проверка JWT-ключей при старте — падаем сразу с понятной ошибкой, а не при первом запросе.
     try:
-        _get_jwt_private_key()
-        _get_jwt_public_key()
+        load_jwt_keys()
     except RuntimeError as e:
         logger.error("JWT keys validation failed: %s", e)
         raise
+    await init_ai_chat_client()
+    start_password_hasher()
+    await start_email_outbox(redis_client)
+    await start_cache_invalidation(redis_client)
     yield
+    await stop_cache_invalidation()
+    await stop_email_outbox()
+    shutdown_password_hasher()
+    await close_ai_chat_client()
+    await close_database()
     await close_redis()
+    shutdown_logging()
 
 
 app = FastAPI(
@@ -63,8 +74,6 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
 )
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 # CORS: CORS_ORIGINS в .env (через запятую). В development список объединяется с дефолтами (file:// = Origin "null").
 _default_origins = [
@@ -94,6 +103,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+async def read_your_writes(request: Request, call_next):
+    # После записи чтения этого клиента временно идут в primary, а не в отстающую реплику.
+    response = await call_next(request)
+    mark_read_primary(request, response)
+    return response
+
+
+if replica_engine is not None:
+    app.middleware("http")(read_your_writes)
+
+
 app.include_router(health_router)
 app.include_router(router)
 
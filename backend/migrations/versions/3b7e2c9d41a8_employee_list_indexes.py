@@ -0,0 +1,37 @@
+"""Employee list indexes
+
+Revision ID: 3b7e2c9d41a8
+Revises: f44135d617c0
+Create Date: 2026-10-17 10:12:04.512337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e2c9d41a8'
+down_revision: Union[str, Sequence[str], None] = 'f44135d617c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_employees_company_id_id', 'employees', ['company_id', 'id'], unique=False)
+    op.create_index('ix_employees_company_id_last_name_id', 'employees', ['company_id', 'last_name', 'id'], unique=False)
+    op.create_index('ix_employees_company_id_hire_date_id', 'employees', ['company_id', 'hire_date', 'id'], unique=False)
+    op.create_index('ix_employees_company_id_status_id', 'employees', ['company_id', 'status', 'id'], unique=False)
+    # (company_id, id) покрывает все выборки по company_id — одиночный индекс больше не нужен.
+    op.drop_index(op.f('ix_employees_company_id'), table_name='employees')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_employees_company_id'), 'employees', ['company_id'], unique=False)
+    op.drop_index('ix_employees_company_id_status_id', table_name='employees')
+    op.drop_index('ix_employees_company_id_hire_date_id', table_name='employees')
+    op.drop_index('ix_employees_company_id_last_name_id', table_name='employees')
+    op.drop_index('ix_employees_company_id_id', table_name='employees')
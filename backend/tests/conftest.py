@@ -0,0 +1,33 @@
+import pytest
+import pytest_asyncio
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.cache import clear_local_caches
+from app.core.config import settings
+
+# Отдельная база для тестов с настоящим Redis: очищается до и после каждого теста.
+REAL_REDIS_DB = 15
+
+
+@pytest.fixture(autouse=True)
+def _clear_local_caches():
+    # Локальный уровень кэша — глобальный на процесс; тесты не должны видеть значения друг друга.
+    clear_local_caches()
+    yield
+    clear_local_caches()
+
+
+@pytest_asyncio.fixture
+async def real_redis():
+    """Настоящий Redis (REDIS_HOST/REDIS_PORT, база REAL_REDIS_DB); без него тест пропускается."""
+    redis = Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=REAL_REDIS_DB, decode_responses=True)
+    try:
+        await redis.ping()
+    except RedisConnectionError:
+        await redis.aclose()
+        pytest.skip("Redis is not available")
+    await redis.flushdb()
+    yield redis
+    await redis.flushdb()
+    await redis.aclose()
@@ -0,0 +1,54 @@
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.Chat import _proxy_stream, _request_json
+
+URL = "http://ai-chat/ai_chat/v1/chat"
+
+
+def _client(error: Exception | None = None, status: int = 200) -> httpx.AsyncClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        if error is not None:
+            raise error
+        return httpx.Response(status, json={"detail": "upstream"})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+TRANSPORT_ERRORS = [
+    (httpx.ConnectError("refused"), 503),
+    (httpx.ConnectTimeout("connect"), 503),
+    (httpx.PoolTimeout("pool"), 503),
+    (httpx.ReadTimeout("read"), 504),
+    (httpx.RemoteProtocolError("disconnected before headers"), 502),
+    (httpx.ReadError("reset"), 502),
+]
+
+
+class TestErrorMapping:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("error, status", TRANSPORT_ERRORS)
+    async def test_request_json_transport_errors(self, error, status):
+        async with _client(error) as client:
+            with pytest.raises(HTTPException) as exc:
+                await _request_json(client, "GET", URL, httpx.Timeout(1.0))
+        assert exc.value.status_code == status
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("error, status", TRANSPORT_ERRORS)
+    async def test_stream_transport_errors(self, error, status):
+        async with _client(error) as client:
+            with pytest.raises(HTTPException) as exc:
+                await _proxy_stream(client, URL, {"message": "hi", "stream": True}, 1)
+        assert exc.value.status_code == status
+
+    @pytest.mark.asyncio
+    async def test_upstream_status_passed_through(self):
+        async with _client(status=404) as client:
+            with pytest.raises(HTTPException) as json_exc:
+                await _request_json(client, "GET", URL, httpx.Timeout(1.0))
+            with pytest.raises(HTTPException) as stream_exc:
+                await _proxy_stream(client, URL, {"message": "hi", "stream": True}, 1)
+        assert json_exc.value.status_code == stream_exc.value.status_code == 404
+        assert "upstream" in stream_exc.value.detail
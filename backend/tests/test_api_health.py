@@ -0,0 +1,23 @@
+import pytest
+
+from app.api import health
+from app.core.exceptions import NotFoundError, UnauthorizedError
+
+
+class TestMetricsAccess:
+    def test_disabled_without_token(self, monkeypatch):
+        monkeypatch.setattr(health.settings, "METRICS_TOKEN", "")
+        with pytest.raises(NotFoundError):
+            health.require_metrics_token("Bearer anything")
+
+    @pytest.mark.parametrize("authorization", [None, "", "Bearer wrong", "Basic s3cret", "s3cret", "Bearer токен"])
+    def test_wrong_token_rejected(self, monkeypatch, authorization):
+        monkeypatch.setattr(health.settings, "METRICS_TOKEN", "s3cret")
+        with pytest.raises(UnauthorizedError):
+            health.require_metrics_token(authorization)
+
+    @pytest.mark.asyncio
+    async def test_bearer_token_allowed(self, monkeypatch):
+        monkeypatch.setattr(health.settings, "METRICS_TOKEN", "s3cret")
+        health.require_metrics_token("Bearer s3cret")
+        assert "db_pool" in await health.metrics()
@@ -0,0 +1,346 @@
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from pydantic import BaseModel
+
+from app.core import cache as cache_module
+from app.core.cache import INVALIDATION_CHANNEL, CacheInvalidationListener, LocalCache, TwoTierCache, apply_invalidation
+from app.core.metrics import collect_metrics
+
+
+class MemoryRedis:
+    """Общий для «воркеров» Redis в памяти: только команды, которые использует кэш."""
+
+    def __init__(self):
+        self.data: dict[str, str] = {}
+        self.gets = 0
+
+    async def get(self, key):
+        self.gets += 1
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def eval(self, script, numkeys, key, token):
+        if self.data.get(key) == token:
+            del self.data[key]
+            return 1
+        return 0
+
+    async def publish(self, channel, message):
+        return 0
+
+    async def mget(self, keys):
+        self.gets += 1
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return MemoryPipeline(self)
+
+
+class MemoryPipeline:
+    def __init__(self, redis: MemoryRedis):
+        self._redis = redis
+        self._commands = []
+
+    def set(self, key, value, ex=None):
+        self._commands.append((key, value))
+
+    async def execute(self):
+        self._redis.gets += 1
+        for key, value in self._commands:
+            self._redis.data[key] = value
+        self._commands = []
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+
+
+@pytest.fixture
+def cache():
+    c = TwoTierCache("test_item", Item, ttl=60, local_ttl=60, local_maxsize=2)
+    yield c
+    cache_module._caches.pop("test_item", None)
+
+
+def _redis(value=None):
+    redis = AsyncMock()
+    redis.get = AsyncMock(return_value=value)
+    return redis
+
+
+class TestLocalCache:
+    def test_lru_eviction(self):
+        local = LocalCache(maxsize=2, ttl=60)
+        local.put("a", 1)
+        local.put("b", 2)
+        assert local.get("a") == 1
+        local.put("c", 3)
+        assert local.get("b") is None
+        assert local.get("a") == 1
+        assert local.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        local = LocalCache(maxsize=2, ttl=0)
+        local.put("a", 1)
+        assert local.get("a") is None
+        assert local.stats()["misses"] == 1
+
+    def test_disabled(self):
+        local = LocalCache(maxsize=0, ttl=60)
+        local.put("a", 1)
+        assert local.get("a") is None
+
+
+class TestTwoTierCache:
+    @pytest.mark.asyncio
+    async def test_redis_hit_fills_local(self, cache):
+        redis = _redis(cache.dumps(Item(id=1, name="a")))
+        first = await cache.get(redis, 1)
+        second = await cache.get(redis, 1)
+        assert first == Item(id=1, name="a")
+        assert second is first
+        redis.get.assert_awaited_once_with("test_item_1")
+        stats = cache.stats()
+        assert stats["redis_hits"] == 1
+        assert stats["local"]["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_miss(self, cache):
+        assert await cache.get(_redis(None), 1) is None
+        assert cache.stats()["redis_misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_set_writes_redis_and_local(self, cache):
+        redis = _redis()
+        await cache.set(redis, 1, Item(id=1, name="a"))
+        key, value = redis.set.await_args[0]
+        assert key == "test_item_1"
+        assert redis.set.await_args.kwargs == {"ex": 60}
+        assert cache.loads(value)[0] == Item(id=1, name="a")
+        redis.publish.assert_not_awaited()
+        assert await cache.get(redis, 1) == Item(id=1, name="a")
+        redis.get.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_set_with_invalidate_publishes(self, cache):
+        redis = _redis()
+        await cache.set(redis, 1, Item(id=1, name="b"), invalidate=True)
+        channel, message = redis.publish.await_args[0]
+        assert channel == INVALIDATION_CHANNEL
+        assert json.loads(message)["keys"] == ["test_item_1"]
+        assert cache.local.get("test_item_1") == Item(id=1, name="b")
+
+    @pytest.mark.asyncio
+    async def test_invalidate_many(self, cache):
+        redis = _redis()
+        await cache.set(redis, 1, Item(id=1, name="a"))
+        await cache.invalidate(redis, 1, 2)
+        redis.delete.assert_awaited_once_with("test_item_1", "test_item_2")
+        redis.publish.assert_awaited_once()
+        assert cache.local.get("test_item_1") is None
+
+    @pytest.mark.asyncio
+    async def test_invalidate_nothing(self, cache):
+        redis = _redis()
+        await cache.invalidate(redis)
+        redis.delete.assert_not_awaited()
+        redis.publish.assert_not_awaited()
+
+
+class TestBatch:
+    @pytest.mark.asyncio
+    async def test_get_many_one_round_trip_for_local_misses(self, cache):
+        redis = MemoryRedis()
+        await cache.set_many(redis, {1: Item(id=1, name="a"), 2: Item(id=2, name="b")})
+        assert redis.gets == 1
+        cache.local.clear()
+        await cache.get(redis, 1)
+        redis.gets = 0
+        found = await cache.get_many(redis, [1, 2, 3])
+        assert found == {1: Item(id=1, name="a"), 2: Item(id=2, name="b")}
+        assert redis.gets == 1
+        assert cache.stats()["redis_misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_get_many_all_local(self, cache):
+        redis = MemoryRedis()
+        await cache.set_many(redis, {1: Item(id=1, name="a")})
+        redis.gets = 0
+        assert await cache.get_many(redis, [1]) == {1: Item(id=1, name="a")}
+        assert redis.gets == 0
+
+    @pytest.mark.asyncio
+    async def test_set_many_empty(self, cache):
+        redis = MemoryRedis()
+        await cache.set_many(redis, {})
+        assert redis.gets == 0
+
+
+def _loader(value=None, delay=0.05):
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return value
+
+    return load, calls
+
+
+def _entry(cache, value, expires, delta):
+    tag, _, _, payload = cache.dumps(value).split("|", 3)
+    return f"{tag}|{expires:.3f}|{delta}|{payload}"
+
+
+class TestStampedeProtection:
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_load_once(self, cache):
+        redis = MemoryRedis()
+        load, calls = _loader(Item(id=1, name="a"))
+        results = await asyncio.gather(*(cache.get_or_load(redis, 1, load) for _ in range(100)))
+        assert len(calls) == 1
+        assert all(r == Item(id=1, name="a") for r in results)
+        assert cache.stats()["coalesced"] == 99
+        assert not any(key.startswith("lock:") for key in redis.data)
+
+    @pytest.mark.asyncio
+    async def test_two_workers_load_once(self, cache):
+        """Второй воркер (свой L1 и свой single-flight) ждёт блокировку и берёт значение из Redis."""
+        other = TwoTierCache("test_item", Item, ttl=60, local_ttl=60, local_maxsize=2)
+        redis = MemoryRedis()
+        load, calls = _loader(Item(id=1, name="a"), delay=0.2)
+        results = await asyncio.gather(
+            *(worker.get_or_load(redis, 1, load) for _ in range(20) for worker in (cache, other))
+        )
+        assert len(calls) == 1
+        assert all(r == Item(id=1, name="a") for r in results)
+        assert cache.stats()["lock_waits"] + other.stats()["lock_waits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_not_found_is_not_cached(self, cache):
+        redis = MemoryRedis()
+        load, calls = _loader(None, delay=0)
+        assert await cache.get_or_load(redis, 1, load) is None
+        assert await cache.get_or_load(redis, 1, load) is None
+        assert len(calls) == 2
+        assert redis.data == {}
+
+    @pytest.mark.asyncio
+    async def test_loader_error_reaches_all_waiters(self, cache):
+        redis = MemoryRedis()
+
+        async def load():
+            await asyncio.sleep(0.05)
+            raise RuntimeError("db down")
+
+        results = await asyncio.gather(*(cache.get_or_load(redis, 1, load) for _ in range(5)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert cache._inflight == {}
+        assert redis.data == {}
+
+    @pytest.mark.asyncio
+    async def test_cancelled_leader_hands_over(self, cache):
+        redis = MemoryRedis()
+        load, calls = _loader(Item(id=1, name="a"))
+        leader = asyncio.create_task(cache.get_or_load(redis, 1, load))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_load(redis, 1, load))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await waiter == Item(id=1, name="a")
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_fresh_entry_not_refreshed(self, cache):
+        redis = MemoryRedis()
+        redis.data["test_item_1"] = cache.dumps(Item(id=1, name="a"), delta=0.01)
+        load, calls = _loader(Item(id=1, name="b"))
+        assert await cache.get_or_load(redis, 1, load) == Item(id=1, name="a")
+        assert calls == []
+
+    @pytest.mark.asyncio
+    async def test_entry_near_expiry_refreshed_early(self, cache):
+        redis = MemoryRedis()
+        redis.data["test_item_1"] = _entry(cache, Item(id=1, name="a"), expires=time.time() + 0.001, delta=10.0)
+        load, calls = _loader(Item(id=1, name="b"), delay=0)
+        assert await cache.get_or_load(redis, 1, load) == Item(id=1, name="b")
+        assert len(calls) == 1
+        assert cache.stats()["early_refreshes"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_value_served_while_other_worker_refreshes(self, cache):
+        redis = MemoryRedis()
+        redis.data["test_item_1"] = _entry(cache, Item(id=1, name="a"), expires=time.time(), delta=10.0)
+        redis.data["lock:test_item_1"] = "other-worker"
+        load, calls = _loader(Item(id=1, name="b"))
+        assert await cache.get_or_load(redis, 1, load) == Item(id=1, name="a")
+        assert calls == []
+        assert cache.stats()["stale_served"] == 1
+
+    @pytest.mark.asyncio
+    async def test_old_format_is_a_miss(self, cache):
+        redis = MemoryRedis()
+        redis.data["test_item_1"] = Item(id=1, name="a").model_dump_json()
+        load, calls = _loader(Item(id=1, name="b"), delay=0)
+        assert await cache.get_or_load(redis, 1, load) == Item(id=1, name="b")
+        assert len(calls) == 1
+
+
+class TestInvalidationMessages:
+    @pytest.mark.asyncio
+    async def test_message_drops_local_copy(self, cache):
+        await cache.set(_redis(), 1, Item(id=1, name="a"))
+        apply_invalidation(json.dumps({"ns": "test_item", "keys": ["test_item_1"]}))
+        assert cache.local.get("test_item_1") is None
+        assert cache.stats()["invalidations_received"] == 1
+
+    @pytest.mark.asyncio
+    async def test_own_message_ignored(self, cache):
+        redis = _redis()
+        await cache.set(redis, 1, Item(id=1, name="a"), invalidate=True)
+        apply_invalidation(redis.publish.await_args[0][1])
+        assert cache.local.get("test_item_1") == Item(id=1, name="a")
+
+    def test_malformed_message_ignored(self, cache):
+        apply_invalidation("not json")
+        apply_invalidation(json.dumps({"keys": []}))
+        assert cache.stats()["invalidations_received"] == 0
+
+    def test_stats_per_namespace(self, cache):
+        assert "test_item" in collect_metrics()["cache"]["namespaces"]
+
+
+class TestInvalidationListener:
+    @pytest.mark.asyncio
+    async def test_publish_reaches_other_worker(self, cache, real_redis):
+        """Запись в одном воркере сбрасывает L1 в другом (слушатель — тот же процесс, канал — настоящий Redis)."""
+        listener = CacheInvalidationListener(real_redis)
+        listener.start()
+        try:
+            for _ in range(50):
+                if await real_redis.pubsub_numsub(INVALIDATION_CHANNEL) != [(INVALIDATION_CHANNEL, 0)]:
+                    break
+                await asyncio.sleep(0.02)
+            cache.local.put("test_item_1", Item(id=1, name="stale"))
+            with patch.object(cache.local, "discard", wraps=cache.local.discard) as discard:
+                await real_redis.publish(INVALIDATION_CHANNEL, json.dumps({"ns": "test_item", "keys": ["test_item_1"]}))
+                for _ in range(50):
+                    if discard.called:
+                        break
+                    await asyncio.sleep(0.02)
+            assert cache.local.get("test_item_1") is None
+        finally:
+            await listener.stop()
@@ -0,0 +1,81 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+
+from app.core.codec import JsonCodec, ModelCodec, OrjsonCodec, get_codec, orjson
+from app.schemas import EmployeeResponse
+
+EMPLOYEE = {
+    "id": 1,
+    "company_id": 2,
+    "email": "e@e.ru",
+    "phone_number": "+79991234567",
+    "first_name": "Иван",
+    "last_name": "Иванов",
+    "middle_name": "И.",
+    "position": "Директор",
+    "salary": "100000.50",
+    "status": "active",
+    "hire_date": "2020-01-15",
+    "passport_series": "1234",
+    "passport_number": "567890",
+    "passport_issued_date": "2015-05-20",
+    "passport_issued_place": "ОВД",
+    "passport_issued_code": "770",
+    "inn": "1234567890",
+    "snils": "12345678901",
+    "address": "Москва",
+}
+
+CODECS = [JsonCodec()] + ([OrjsonCodec()] if orjson is not None else [])
+
+
+class Event(BaseModel):
+    id: int
+    at: Optional[datetime] = None
+
+
+class TestModelCodec:
+    @pytest.mark.parametrize("value_codec", CODECS, ids=lambda c: c.tag)
+    def test_round_trip_restores_types(self, value_codec):
+        employee = EmployeeResponse.model_validate(EMPLOYEE)
+        model_codec = ModelCodec(EmployeeResponse, value_codec)
+        restored = model_codec.loads(model_codec.dumps(employee))
+        assert restored == employee
+        assert restored.salary == Decimal("100000.50")
+        assert isinstance(restored.hire_date, date)
+
+    def test_payload_has_no_field_names(self):
+        data = ModelCodec(EmployeeResponse, JsonCodec()).dumps(EmployeeResponse.model_validate(EMPLOYEE))
+        assert "passport_issued_place" not in data
+        assert data.startswith('["e@e.ru",')
+
+    def test_optional_fields(self):
+        model_codec = ModelCodec(Event, JsonCodec())
+        assert model_codec.loads(model_codec.dumps(Event(id=1))) == Event(id=1)
+        at = datetime(2024, 1, 2, 3, 4, 5)
+        assert model_codec.loads(model_codec.dumps(Event(id=1, at=at))).at == at
+
+    def test_tag_depends_on_schema_and_codec(self):
+        assert ModelCodec(Event, JsonCodec()).tag != ModelCodec(EmployeeResponse, JsonCodec()).tag
+        assert ModelCodec(Event, JsonCodec()).tag == ModelCodec(Event, JsonCodec()).tag
+        assert ModelCodec(Event, JsonCodec()).tag.startswith("j")
+
+    @pytest.mark.parametrize("data", ["not json", "{}", "[1]", '[1, "not a date"]'])
+    def test_broken_payload_is_none(self, data):
+        assert ModelCodec(Event, JsonCodec()).loads(data) is None
+
+
+class TestCodecs:
+    @pytest.mark.parametrize("value_codec", CODECS, ids=lambda c: c.tag)
+    def test_text_round_trip(self, value_codec):
+        data = value_codec.dumps({"name": "Иван", "salary": Decimal("1.50"), "hired": date(2020, 1, 15)})
+        assert isinstance(data, str)
+        assert value_codec.loads(data) == {"name": "Иван", "salary": "1.50", "hired": "2020-01-15"}
+
+    def test_unknown_name_falls_back_to_json(self):
+        assert isinstance(get_codec("json"), JsonCodec)
+        assert isinstance(get_codec("msgpack"), JsonCodec)
@@ -0,0 +1,292 @@
+import inspect
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import Response
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.util import greenlet_spawn
+
+from app.core import database
+from app.core.metrics import collect_metrics
+from app.repository import CompanyRepository, EmployeeRepository
+from app.schemas import CompanyResponse, EmployeeResponse
+from app.services import CompanyService, EmployeeService
+
+COMPANY = {
+    "id": 1,
+    "owner_id": 1,
+    "name": "ООО Рога и копыта",
+    "inn": "7707083893",
+    "snils": "12345678901",
+    "address": "г. Москва, ул. Примерная, д. 1",
+}
+EMPLOYEE = {
+    "id": 1,
+    "company_id": 1,
+    "email": "e@e.ru",
+    "phone_number": "+79991234567",
+    "first_name": "Иван",
+    "last_name": "Иванов",
+    "middle_name": "И.",
+    "position": "Директор",
+    "salary": 100000.0,
+    "status": "active",
+    "hire_date": "2020-01-15",
+    "passport_series": "1234",
+    "passport_number": "567890",
+    "passport_issued_date": "2015-05-20",
+    "passport_issued_place": "ОВД",
+    "passport_issued_code": "770",
+    "inn": "1234567890",
+    "snils": "12345678901",
+    "address": "Москва",
+}
+
+
+class TestEngineConfig:
+    def test_pool_built_from_settings(self):
+        pool = database.engine.pool
+        assert isinstance(pool, database.InstrumentedAsyncQueuePool)
+        assert pool.size() == database.settings.DB_POOL_SIZE
+        assert pool._max_overflow == database.settings.DB_MAX_OVERFLOW
+        assert pool._timeout == database.settings.DB_POOL_TIMEOUT
+        assert pool._recycle == database.settings.DB_POOL_RECYCLE
+        assert pool._pre_ping is database.settings.DB_POOL_PRE_PING
+
+
+class TestPoolMetrics:
+    def test_idle_pool_stats(self):
+        stats = database.get_pool_stats()
+        assert stats["checked_out"] == 0
+        assert stats["max_connections"] == database.settings.DB_POOL_SIZE + database.settings.DB_MAX_OVERFLOW
+        assert set(stats["checkout_wait_seconds"]) == {"count", "sum", "buckets"}
+
+    @pytest.mark.asyncio
+    async def test_checkout_wait_observed(self):
+        pool = database._pool_class(database.PoolMetrics())(MagicMock, pool_size=1, max_overflow=0)
+        before = pool.metrics.checkout_wait.count
+        connection = await greenlet_spawn(pool.connect)
+        await greenlet_spawn(connection.close)
+        assert pool.metrics.checkout_wait.count == before + 1
+        assert pool.metrics.events["checkouts"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_checkout_timeout_counted(self):
+        pool = database._pool_class(database.PoolMetrics())(MagicMock, pool_size=1, max_overflow=0, timeout=0.01)
+        held = await greenlet_spawn(pool.connect)
+        before = pool.metrics.events["timeouts"]
+        with pytest.raises(database.PoolTimeoutError):
+            await greenlet_spawn(pool.connect)
+        await greenlet_spawn(held.close)
+        assert pool.metrics.events["timeouts"] == before + 1
+
+    @pytest.mark.asyncio
+    async def test_pool_without_metrics_fails_loudly(self):
+        """Пул не через _create_engine не должен молча писать в общие, нигде не выводимые метрики."""
+        pool = database.InstrumentedAsyncQueuePool(MagicMock, pool_size=1, max_overflow=0)
+        with pytest.raises(AttributeError):
+            await greenlet_spawn(pool.connect)
+
+    def test_engines_have_separate_metrics(self):
+        replica = database._create_engine(database.settings.DATABASE_URL, database.PoolMetrics())
+        assert replica.pool.metrics is not database.engine.pool.metrics
+
+    def test_registered_in_metrics(self):
+        metrics = collect_metrics()
+        assert "db_pool" in metrics
+        assert metrics["db_replica"]["configured"] is (database.replica_engine is not None)
+
+
+def _request(method="GET", cookies=None):
+    request = MagicMock()
+    request.method = method
+    request.cookies = cookies or {}
+    request.state = SimpleNamespace()
+    return request
+
+
+@pytest.fixture
+def replica():
+    replica_engine = database._create_engine(database.settings.DATABASE_URL, database.PoolMetrics())
+    with patch.object(database, "replica_engine", replica_engine):
+        yield replica_engine
+
+
+async def _read_session(request):
+    generator = database.get_read_session(request)
+    session = await anext(generator)
+    await generator.aclose()
+    return session
+
+
+def _checkouts() -> int:
+    # Попытки взять соединение из пула (в т.ч. неудачные — в тестах Postgres может быть недоступен).
+    return database.engine.pool.metrics.checkout_wait.count
+
+
+class TestReadRouting:
+    @pytest.mark.asyncio
+    async def test_without_replica_reads_go_to_primary(self):
+        with patch.object(database, "replica_engine", None):
+            session = await _read_session(_request())
+        assert session.sync_session.get_bind() is database.engine.sync_engine
+
+    @pytest.mark.asyncio
+    async def test_reads_go_to_replica(self, replica):
+        session = await _read_session(_request())
+        assert session.sync_session.get_bind() is replica.sync_engine
+
+    @pytest.mark.asyncio
+    async def test_recent_writer_reads_from_primary(self, replica):
+        session = await _read_session(_request(cookies={database.READ_PRIMARY_COOKIE: "1"}))
+        assert session.sync_session.get_bind() is database.engine.sync_engine
+
+    @pytest.mark.asyncio
+    async def test_read_from_primary_is_scoped(self, replica):
+        session = await _read_session(_request())
+        with database.read_from_primary(session):
+            assert session.sync_session.get_bind() is database.engine.sync_engine
+        assert session.sync_session.get_bind() is replica.sync_engine
+
+    @pytest.mark.asyncio
+    async def test_cache_miss_loaded_from_primary(self, replica):
+        """Промах общего кэша читается с primary: строка с отстающей реплики не должна попасть в Redis."""
+        redis = AsyncMock()
+        redis.get.return_value = None
+        redis.set.return_value = True
+        session = await _read_session(_request())
+        binds = []
+
+        async def get_by_user_id(s, user_id):
+            binds.append(s.sync_session.get_bind())
+            return SimpleNamespace(**COMPANY)
+
+        with patch.object(CompanyRepository, "get_by_user_id", side_effect=get_by_user_id):
+            result = await CompanyService.get_company(session, redis, CompanyRepository(), 1)
+        assert result.id == COMPANY["id"]
+        assert binds == [database.engine.sync_engine]
+        assert session.sync_session.get_bind() is replica.sync_engine
+
+    @pytest.mark.asyncio
+    async def test_batch_misses_loaded_from_primary(self, replica):
+        redis = AsyncMock()
+        redis.mget.return_value = [None]
+        redis.pipeline = MagicMock(return_value=MagicMock(execute=AsyncMock()))
+        session = await _read_session(_request())
+        binds = []
+
+        async def get_by_ids_for_company(s, company_id, ids):
+            binds.append(s.sync_session.get_bind())
+            return [SimpleNamespace(**EMPLOYEE)]
+
+        with patch.object(EmployeeRepository, "get_by_ids_for_company", side_effect=get_by_ids_for_company):
+            result = await EmployeeService.get_employees_batch(session, redis, EmployeeRepository(), [1], 1)
+        assert [e.id for e in result.items] == [EMPLOYEE["id"]]
+        assert binds == [database.engine.sync_engine]
+
+    def test_replica_down_falls_back_to_primary(self, replica):
+        session = database.ReadSession()
+        error = DBAPIError("SELECT 1", None, OSError("connection refused"))
+        with patch.object(Session, "_connection_for_bind", side_effect=[error, "primary connection"]) as connect:
+            assert session._connection_for_bind(session.get_bind()) == "primary connection"
+        assert connect.call_args_list[1].args[0] is database.engine.sync_engine
+        assert session.get_bind() is database.engine.sync_engine
+        assert database._read_routing["primary_fallback"] >= 1
+
+    def test_overridden_session_hook_unchanged(self):
+        """ReadSession переопределяет закрытый Session._connection_for_bind — при смене его сигнатуры падаем здесь."""
+        params = list(inspect.signature(Session._connection_for_bind).parameters)
+        assert params == ["self", "engine", "execution_options", "kw"]
+
+    def test_primary_errors_not_swallowed(self, replica):
+        session = database.ReadSession(info={"read_primary": True})
+        error = DBAPIError("SELECT 1", None, OSError("connection refused"))
+        with patch.object(Session, "_connection_for_bind", side_effect=error):
+            with pytest.raises(DBAPIError):
+                session._connection_for_bind(session.get_bind())
+
+
+class TestLazyCheckout:
+    """Сессия не берёт соединение из пула, пока не выполнен запрос: ответы из кэша не нагружают Postgres."""
+
+    @pytest.mark.asyncio
+    async def test_unused_sessions_do_not_check_out(self):
+        before = _checkouts()
+        generator = database.get_session()
+        session = await anext(generator)
+        assert not session.in_transaction()
+        await generator.aclose()
+        await _read_session(_request())
+        assert _checkouts() == before
+
+    @pytest.mark.asyncio
+    async def test_cache_miss_checks_out(self):
+        """Подключение к Postgres заменено отказом — результат не зависит от того, поднята ли база."""
+        redis = AsyncMock()
+        redis.get.return_value = None
+        db_engine = database._create_engine(database.settings.DATABASE_URL, database.PoolMetrics())
+
+        @event.listens_for(db_engine.sync_engine, "do_connect")
+        def _refuse(dialect, connection_record, cargs, cparams):
+            raise ConnectionRefusedError("no database in this test")
+
+        try:
+            async with database._session_factory(db_engine)() as session:
+                with pytest.raises(ConnectionRefusedError, match="no database in this test"):
+                    await CompanyService.get_company(session, redis, CompanyRepository(), 1)
+            assert db_engine.pool.metrics.checkout_wait.count == 1
+        finally:
+            await db_engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_company_cache_hit(self):
+        redis = AsyncMock()
+        redis.get.return_value = CompanyService.company_cache.dumps(CompanyResponse.model_validate(COMPANY))
+        before = _checkouts()
+        async with database.session_factory() as session:
+            result = await CompanyService.get_company(session, redis, CompanyRepository(), 1)
+        assert result.id == COMPANY["id"]
+        assert _checkouts() == before
+
+    @pytest.mark.asyncio
+    async def test_employee_cache_hit(self):
+        redis = AsyncMock()
+        redis.get.return_value = EmployeeService.employee_cache.dumps(EmployeeResponse.model_validate(EMPLOYEE))
+        before = _checkouts()
+        async with database.read_session_factory() as session:
+            result = await EmployeeService.get_employee(session, redis, EmployeeRepository(), 1, EMPLOYEE["company_id"])
+        assert result.id == EMPLOYEE["id"]
+        assert _checkouts() == before
+
+
+class TestMarkReadPrimary:
+    @pytest.mark.parametrize("method,status,sticky", [
+        ("POST", 201, True),
+        ("PATCH", 200, True),
+        ("DELETE", 204, True),
+        ("GET", 200, False),
+        ("POST", 422, False),
+    ])
+    def test_cookie_set_after_successful_write(self, replica, method, status, sticky):
+        response = Response(status_code=status)
+        database.mark_read_primary(_request(method), response)
+        cookie = response.headers.get("set-cookie", "")
+        assert (database.READ_PRIMARY_COOKIE in cookie) is sticky
+        if sticky:
+            assert f"Max-Age={database.settings.READ_YOUR_WRITES_SECONDS}" in cookie
+
+    @pytest.mark.asyncio
+    async def test_no_cookie_after_read_only_post(self, replica):
+        request = _request("POST")
+        await _read_session(request)
+        response = Response(status_code=200)
+        database.mark_read_primary(request, response)
+        assert "set-cookie" not in response.headers
+
+    def test_no_cookie_without_replica(self):
+        response = Response(status_code=201)
+        database.mark_read_primary(_request("POST"), response)
+        assert "set-cookie" not in response.headers
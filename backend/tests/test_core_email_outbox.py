@@ -0,0 +1,238 @@
+import asyncio
+import json
+import smtplib
+import socket
+import threading
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from app.core import email_outbox
+from app.core.email_outbox import (
+    DEAD_LETTER_KEY,
+    OUTBOX_KEY,
+    RETRY_KEY,
+    WORKERS_KEY,
+    EmailOutboxWorker,
+    SmtpSession,
+    lease_key,
+)
+
+
+class _Collector:
+    """Локальный SMTP-стенд: запоминает письма и сессии (одна сессия = одно TCP-соединение)."""
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        self.sessions.add(session.peer)
+        return "250 OK"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = _Collector()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield controller, handler
+    controller.stop()
+
+
+def _session(controller) -> SmtpSession:
+    return SmtpSession(controller.hostname, controller.port, starttls=False, username="bot@example.com", password="")
+
+
+def _message(to: str = "user@example.com", attempts: int = 0) -> dict:
+    return {"to": to, "subject": "Код подтверждения", "body": "Ваш код подтверждения: 123456", "attempts": attempts}
+
+
+def _raw(to: str = "user@example.com", attempts: int = 0) -> str:
+    """Письмо так, как оно лежит в очереди Redis."""
+    return json.dumps(_message(to, attempts), ensure_ascii=False)
+
+
+@pytest.fixture
+def redis():
+    r = AsyncMock()
+    r.lmove.return_value = None
+    r.pipeline = MagicMock(return_value=MagicMock(execute=AsyncMock()))
+    return r
+
+
+def _unreachable_smtp() -> SmtpSession:
+    return SmtpSession("127.0.0.1", 1, starttls=False, username="bot@example.com", password="")
+
+
+class TestEnqueue:
+    @pytest.mark.asyncio
+    async def test_enqueue_pushes_message(self, redis, monkeypatch):
+        monkeypatch.setattr(email_outbox.settings, "SEND_LOGIN_CODE_EMAIL", True)
+        monkeypatch.setattr(email_outbox.settings, "LOGIN_FOR_GMAIL", "bot@example.com")
+        monkeypatch.setattr(email_outbox.settings, "PASSWORD_FOR_GMAIL", "app-password")
+        await email_outbox.enqueue_code_email(redis, "user@example.com", "123456")
+        key, payload = redis.lpush.await_args[0]
+        assert key == OUTBOX_KEY
+        message = json.loads(payload)
+        assert message["to"] == "user@example.com"
+        assert "123456" in message["body"]
+        assert message["attempts"] == 0
+
+    @pytest.mark.asyncio
+    async def test_enqueue_skipped_when_email_not_configured(self, redis, monkeypatch):
+        monkeypatch.setattr(email_outbox.settings, "SEND_LOGIN_CODE_EMAIL", False)
+        await email_outbox.enqueue_code_email(redis, "user@example.com", "123456")
+        redis.lpush.assert_not_awaited()
+
+
+class TestSmtpSession:
+    def test_batch_reuses_one_connection(self, smtp_server):
+        controller, handler = smtp_server
+        session = _session(controller)
+        for i in range(3):
+            session.send(_message(f"user{i}@example.com"))
+        session.close()
+        assert [m.rcpt_tos for m in handler.messages] == [[f"user{i}@example.com"] for i in range(3)]
+        assert len(handler.sessions) == 1
+
+    def test_reconnects_after_disconnect(self, smtp_server):
+        controller, handler = smtp_server
+        session = _session(controller)
+        session.send(_message("a@example.com"))
+        session._smtp.sock.shutdown(socket.SHUT_RDWR)
+        session.send(_message("b@example.com"))
+        session.close()
+        assert len(handler.messages) == 2
+        assert len(handler.sessions) == 2
+
+    def test_failed_login_closes_socket(self, smtp_server, monkeypatch):
+        """Тестовый сервер не поддерживает AUTH — login падает, открытое соединение должно закрыться."""
+        controller, _ = smtp_server
+        closed, close = [], smtplib.SMTP.close
+
+        def spy(smtp):
+            closed.append(smtp.sock is not None)
+            close(smtp)
+
+        monkeypatch.setattr(smtplib.SMTP, "close", spy)
+        session = SmtpSession(controller.hostname, controller.port, False, "bot@example.com", "app-password")
+        with pytest.raises(smtplib.SMTPException):
+            session.send(_message())
+        assert closed == [True]
+        assert session._smtp is None
+
+
+class TestWorker:
+    @pytest.mark.asyncio
+    async def test_process_batch_sends_all_and_acks_each(self, smtp_server, redis):
+        controller, handler = smtp_server
+        worker = EmailOutboxWorker(redis, _session(controller))
+        batch = [_raw("a@example.com"), _raw("b@example.com")]
+        await worker.process_batch(batch)
+        await worker.stop()
+        assert len(handler.messages) == 2
+        pipe = redis.pipeline.return_value
+        assert [c.args for c in pipe.lrem.call_args_list] == [(worker.processing_key, 1, raw) for raw in batch]
+        pipe.zadd.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_failed_message_scheduled_with_backoff(self, redis, monkeypatch):
+        monkeypatch.setattr(email_outbox.settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 3)
+        worker = EmailOutboxWorker(redis, _unreachable_smtp())
+        raw = _raw()
+        await worker.process_batch([raw])
+        redis.pipeline.assert_called_with(transaction=True)
+        pipe = redis.pipeline.return_value
+        key, mapping = pipe.zadd.call_args.args
+        assert key == RETRY_KEY
+        (payload,) = mapping
+        assert json.loads(payload)["attempts"] == 1
+        pipe.lrem.assert_called_once_with(worker.processing_key, 1, raw)
+        pipe.lpush.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_message_goes_to_dead_letter_after_max_attempts(self, redis, monkeypatch):
+        monkeypatch.setattr(email_outbox.settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 3)
+        worker = EmailOutboxWorker(redis, _unreachable_smtp())
+        await worker.process_batch([_raw(attempts=2)])
+        pipe = redis.pipeline.return_value
+        assert pipe.lpush.call_args.args[0] == DEAD_LETTER_KEY
+        pipe.zadd.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_malformed_item_dead_lettered_without_losing_batch(self, smtp_server, redis):
+        controller, handler = smtp_server
+        worker = EmailOutboxWorker(redis, _session(controller))
+        await worker.process_batch(["not json", _raw("a@example.com")])
+        await worker.stop()
+        pipe = redis.pipeline.return_value
+        pipe.lpush.assert_called_once_with(DEAD_LETTER_KEY, "not json")
+        assert [m.rcpt_tos for m in handler.messages] == [["a@example.com"]]
+        assert pipe.lrem.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_stop_waits_for_send_before_closing_session(self, redis):
+        started, release = threading.Event(), threading.Event()
+        events = []
+        smtp = MagicMock()
+
+        def send(message):
+            started.set()
+            release.wait(5)
+            events.append("sent")
+
+        smtp.send.side_effect = send
+        smtp.close.side_effect = lambda: events.append("closed")
+        worker = EmailOutboxWorker(redis, smtp)
+        redis.blmove.side_effect = [_raw(), None]
+        redis.pipeline.return_value.execute.return_value = []
+        worker.start()
+        await asyncio.to_thread(started.wait, 5)
+        stopping = asyncio.create_task(worker.stop())
+        await asyncio.sleep(0.05)
+        assert not stopping.done()
+        release.set()
+        await stopping
+        assert events == ["sent", "closed"]
+        redis.srem.assert_awaited_with(WORKERS_KEY, worker.worker_id)
+
+
+class TestDeliveryGuarantees:
+    @pytest.mark.asyncio
+    async def test_crashed_worker_batch_is_recovered(self, real_redis):
+        for i in range(3):
+            await real_redis.lpush(OUTBOX_KEY, _raw(f"user{i}@example.com"))
+        crashed = EmailOutboxWorker(real_redis, _unreachable_smtp(), worker_id="crashed")
+        await real_redis.sadd(WORKERS_KEY, crashed.worker_id)
+        assert len(await crashed._next_batch()) == 3
+        assert await real_redis.llen(OUTBOX_KEY) == 0
+        # Воркер упал посреди пачки: аренды нет, письма лежат в его списке обработки.
+        alive = EmailOutboxWorker(real_redis, _unreachable_smtp(), worker_id="alive")
+        await real_redis.set(lease_key("busy"), "1")
+        await real_redis.sadd(WORKERS_KEY, "busy")
+        assert await alive.recover_orphans() == 3
+        assert await real_redis.llen(OUTBOX_KEY) == 3
+        assert await real_redis.llen(crashed.processing_key) == 0
+        assert await real_redis.smembers(WORKERS_KEY) == {"busy"}
+
+    @pytest.mark.asyncio
+    async def test_ack_removes_only_handled_raw(self, real_redis, monkeypatch):
+        monkeypatch.setattr(email_outbox.settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 3)
+        await real_redis.lpush(OUTBOX_KEY, "not json", _raw())
+        worker = EmailOutboxWorker(real_redis, _unreachable_smtp())
+        batch = await worker._next_batch()
+        await worker.process_batch(batch[:1])
+        assert await real_redis.lrange(worker.processing_key, 0, -1) == batch[1:]
+        await worker.process_batch(batch[1:])
+        assert await real_redis.llen(worker.processing_key) == 0
+        assert await real_redis.zcard(RETRY_KEY) == 1
+        assert await real_redis.lrange(DEAD_LETTER_KEY, 0, -1) == ["not json"]
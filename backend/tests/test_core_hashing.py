@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from app.core import hashing
+from app.core.exceptions import ServiceBusyError
+from app.core.security import verify_password
+
+
+@pytest.fixture(autouse=True)
+def thread_hasher(monkeypatch):
+    monkeypatch.setattr(hashing.settings, "PASSWORD_HASH_EXECUTOR", "thread")
+    monkeypatch.setattr(hashing.settings, "PASSWORD_HASH_WORKERS", 2)
+    hashing.shutdown_password_hasher()
+    yield
+    hashing.shutdown_password_hasher()
+
+
+class TestPasswordHasher:
+    @pytest.mark.asyncio
+    async def test_hash_and_check_roundtrip(self):
+        hashed = await hashing.hash_password("secret123")
+        assert verify_password("secret123", hashed)
+        assert await hashing.check_password("secret123", hashed) is True
+        assert await hashing.check_password("wrong", hashed) is False
+
+    @pytest.mark.asyncio
+    async def test_saturated_pool_fails_fast(self, monkeypatch):
+        monkeypatch.setattr(hashing.settings, "PASSWORD_HASH_MAX_PENDING", 1)
+        rejected_before = hashing.get_hasher_stats()["rejected"]
+        results = await asyncio.gather(
+            hashing.hash_password("a"),
+            hashing.hash_password("b"),
+            return_exceptions=True,
+        )
+        assert isinstance(results[0], str)
+        assert isinstance(results[1], ServiceBusyError)
+        assert results[1].status_code == 503
+        assert hashing.get_hasher_stats()["rejected"] == rejected_before + 1
+
+    @pytest.mark.asyncio
+    async def test_metrics_record_latency_and_queue_wait(self):
+        before = hashing.get_hasher_stats()
+        await hashing.hash_password("secret123")
+        after = hashing.get_hasher_stats()
+        assert after["pending"] == 0
+        assert after["hash_latency_seconds"]["count"] == before["hash_latency_seconds"]["count"] + 1
+        assert after["queue_wait_seconds"]["count"] == before["queue_wait_seconds"]["count"] + 1
+        assert after["hash_latency_seconds"]["sum"] > before["hash_latency_seconds"]["sum"]
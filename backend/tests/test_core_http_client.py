@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+
+from app.core import http_client
+from app.core.metrics import collect_metrics
+
+
+@pytest_asyncio.fixture
+async def client():
+    c = await http_client.init_ai_chat_client()
+    yield c
+    await http_client.close_ai_chat_client()
+
+
+class TestAiChatClient:
+    @pytest.mark.asyncio
+    async def test_get_client_before_init_raises(self):
+        await http_client.close_ai_chat_client()
+        with pytest.raises(RuntimeError):
+            http_client.get_ai_chat_client()
+
+    @pytest.mark.asyncio
+    async def test_client_is_shared_and_closed_on_shutdown(self, client):
+        assert http_client.get_ai_chat_client() is client
+        await http_client.close_ai_chat_client()
+        assert client.is_closed
+        with pytest.raises(RuntimeError):
+            http_client.get_ai_chat_client()
+
+    def test_route_timeout_keeps_shared_connect_and_pool(self):
+        timeout = http_client.ai_chat_timeout(42.0)
+        assert timeout.read == 42.0
+        assert timeout.connect == http_client.settings.AI_CHAT_CONNECT_TIMEOUT
+        assert timeout.pool == http_client.settings.AI_CHAT_POOL_TIMEOUT
+
+
+class TestPoolStats:
+    @pytest.mark.asyncio
+    async def test_stats_of_idle_pool(self, client):
+        stats = http_client.get_pool_stats()
+        assert stats["connections"] == 0
+        assert stats["http2"] is False
+        assert stats["active_requests"] == 0
+        assert stats["queued_requests"] == 0
+        assert stats["max_connections"] == http_client.settings.AI_CHAT_MAX_CONNECTIONS
+
+    @pytest.mark.asyncio
+    async def test_stats_without_client(self):
+        await http_client.close_ai_chat_client()
+        assert http_client.get_pool_stats()["connections"] == 0
+
+    @pytest.mark.asyncio
+    async def test_unknown_transport_internals_degrade_to_zeros(self, client):
+        with patch.object(client, "_transport", SimpleNamespace(_pool=SimpleNamespace(connections=[]))):
+            stats = http_client.get_pool_stats()
+        assert stats["connections"] == 0
+        assert stats["queued_requests"] == 0
+
+    def test_pool_registered_in_metrics(self):
+        assert "ai_chat_http_pool" in collect_metrics()
@@ -0,0 +1,69 @@
+import json
+import logging
+import queue
+import sys
+from unittest.mock import patch
+
+from app.core.logging import DroppingQueueHandler, JsonFormatter, SamplingFilter, parse_sampling
+
+
+def _record(name="app.test", level=logging.INFO, msg="hello %s", args=("world",), exc_info=None):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, exc_info)
+
+
+class TestDroppingQueueHandler:
+    def test_full_queue_drops_without_blocking(self):
+        handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+        for _ in range(5):
+            handler.handle(_record())
+        assert handler.queue.qsize() == 2
+        assert handler.dropped == 3
+
+    def test_prepare_merges_args_but_does_not_format(self):
+        handler = DroppingQueueHandler(queue.Queue())
+        args = ["world"]
+        record = _record(args=(args,))
+        handler.handle(record)
+        args.append("changed")
+        queued = handler.queue.get_nowait()
+        assert queued.msg == "hello ['world']"
+        assert queued.args is None
+        assert queued is not record
+
+
+class TestSamplingFilter:
+    def test_samples_only_debug_of_configured_loggers(self):
+        sampling = SamplingFilter({"app.services.EmployeeService": 0.0})
+        assert not sampling.filter(_record("app.services.EmployeeService", logging.DEBUG))
+        assert sampling.filter(_record("app.services.EmployeeService", logging.INFO))
+        assert sampling.filter(_record("app.services.CompanyService", logging.DEBUG))
+        assert sampling.sampled_out == 1
+
+    def test_child_loggers_inherit_rate(self):
+        sampling = SamplingFilter({"app.repository": 0.5})
+        with patch("app.core.logging.random.random", side_effect=[0.4, 0.6]):
+            assert sampling.filter(_record("app.repository.EmployeeRepository", logging.DEBUG))
+            assert not sampling.filter(_record("app.repository.EmployeeRepository", logging.DEBUG))
+
+    def test_parse_sampling(self):
+        assert parse_sampling("app.services.EmployeeService:0.1, app.repository:0.5,") == {
+            "app.services.EmployeeService": 0.1,
+            "app.repository": 0.5,
+        }
+        assert parse_sampling("") == {}
+
+
+class TestJsonFormatter:
+    def test_one_json_object_per_record(self):
+        data = json.loads(JsonFormatter().format(_record(msg="привет %s")))
+        assert data["message"] == "привет world"
+        assert data["level"] == "INFO"
+        assert data["logger"] == "app.test"
+
+    def test_exception_included(self):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = _record(exc_info=sys.exc_info())
+        data = json.loads(JsonFormatter().format(record))
+        assert "ValueError: boom" in data["exc_info"]
@@ -0,0 +1,118 @@
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import HTTPException
+from redis.exceptions import ConnectionError as RedisConnectionError, NoScriptError
+
+from app.core.rate_limit import RedisRateLimiter, parse_limit
+
+
+def _redis(*results):
+    redis = AsyncMock()
+    redis.evalsha = AsyncMock(side_effect=list(results))
+    return redis
+
+
+class TestParseLimit:
+    def test_parses_count_and_window(self):
+        assert parse_limit("10/minute") == (10, 60_000)
+        assert parse_limit("1000/second") == (1000, 1000)
+
+    def test_invalid_period_raises(self):
+        with pytest.raises(ValueError):
+            parse_limit("10/fortnight")
+
+
+class TestRedisRateLimiter:
+    @pytest.mark.asyncio
+    async def test_allowed_request_makes_one_redis_call(self):
+        limiter = RedisRateLimiter(local_fraction=0.1)
+        redis = _redis([1, 0])
+        await limiter.hit(redis, "auth_login", "1.2.3.4", "10/minute")
+        redis.evalsha.assert_awaited_once()
+        keys = redis.evalsha.call_args.args[2:4]
+        assert keys[0].startswith("rl:auth_login:1.2.3.4:")
+        assert limiter.stats()["allowed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_denied_raises_429_with_retry_after(self):
+        limiter = RedisRateLimiter(local_fraction=0.1)
+        redis = _redis([0, 12_500])
+        with pytest.raises(HTTPException) as exc_info:
+            await limiter.hit(redis, "auth_login", "1.2.3.4", "10/minute")
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.headers["Retry-After"] == "13"
+        assert limiter.stats()["denied"] == 1
+
+    @pytest.mark.asyncio
+    async def test_blocked_key_denied_locally_without_redis(self):
+        limiter = RedisRateLimiter(local_fraction=0.1)
+        redis = _redis([0, 30_000])
+        for _ in range(3):
+            with pytest.raises(HTTPException):
+                await limiter.hit(redis, "auth_login", "1.2.3.4", "10/minute")
+        assert redis.evalsha.await_count == 1
+        assert limiter.stats()["local_denied"] == 2
+
+    @pytest.mark.asyncio
+    async def test_lease_spends_granted_tokens_locally(self):
+        limiter = RedisRateLimiter(local_fraction=0.1)
+        redis = _redis([10, 0], [10, 0])
+        for _ in range(15):
+            await limiter.hit(redis, "api", "1.2.3.4", "100/minute")
+        assert redis.evalsha.await_count == 2
+        assert redis.evalsha.call_args.args[-1] == 10
+        assert limiter.stats()["local_allowed"] == 13
+
+    @pytest.mark.asyncio
+    async def test_keys_are_separate_per_identity(self):
+        limiter = RedisRateLimiter(local_fraction=0.1)
+        redis = _redis([0, 30_000], [1, 0])
+        with pytest.raises(HTTPException):
+            await limiter.hit(redis, "auth_login", "1.2.3.4", "10/minute")
+        await limiter.hit(redis, "auth_login", "5.6.7.8", "10/minute")
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_eval_when_script_not_loaded(self):
+        limiter = RedisRateLimiter(local_fraction=0.1)
+        redis = _redis(NoScriptError("NOSCRIPT"))
+        redis.eval = AsyncMock(return_value=[1, 0])
+        await limiter.hit(redis, "auth_login", "1.2.3.4", "10/minute")
+        redis.eval.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_redis_unavailable_fails_open(self):
+        limiter = RedisRateLimiter(local_fraction=0.1)
+        redis = _redis(RedisConnectionError("down"))
+        await limiter.hit(redis, "auth_login", "1.2.3.4", "10/minute")
+        assert limiter.stats()["errors"] == 1
+
+
+class TestSlidingWindowScript:
+    @pytest.mark.asyncio
+    async def test_limit_shared_between_limiters(self, real_redis):
+        """Два экземпляра (как два воркера) вместе не пропускают больше лимита."""
+        workers = [RedisRateLimiter(local_fraction=0.1), RedisRateLimiter(local_fraction=0.1)]
+        identity = f"ip-{time.time_ns()}"
+        allowed = 0
+        for i in range(20):
+            try:
+                await workers[i % 2].hit(real_redis, "auth_login", identity, "10/hour")
+                allowed += 1
+            except HTTPException as e:
+                assert e.status_code == 429
+        assert allowed == 10
+
+    @pytest.mark.asyncio
+    async def test_leases_do_not_exceed_limit(self, real_redis):
+        workers = [RedisRateLimiter(local_fraction=0.3) for _ in range(3)]
+        identity = f"ip-{time.time_ns()}"
+        allowed = 0
+        for i in range(200):
+            try:
+                await workers[i % 3].hit(real_redis, "api", identity, "100/hour")
+                allowed += 1
+            except HTTPException:
+                pass
+        assert allowed <= 100
@@ -0,0 +1,93 @@
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from app.core import security
+from app.core.token_cache import access_token_cache
+
+
+def _write_key_pair(tmp_path, name: str, algorithm: str):
+    if algorithm == "RS256":
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm == "ES256":
+        key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        key = ed25519.Ed25519PrivateKey.generate()
+    private_path = tmp_path / f"{name}-private.pem"
+    public_path = tmp_path / f"{name}-public.pem"
+    private_path.write_bytes(
+        key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    )
+    public_path.write_bytes(
+        key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+    )
+    return private_path, public_path
+
+
+@pytest.fixture
+def keyring(tmp_path, monkeypatch):
+    def configure(algorithm: str, kid: str, name: str | None = None, extra: str = ""):
+        private_path, public_path = _write_key_pair(tmp_path, name or kid, algorithm)
+        monkeypatch.setattr(security.settings, "ALGORITHM", algorithm)
+        monkeypatch.setattr(security.settings, "JWT_KEY_ID", kid)
+        monkeypatch.setattr(security.settings, "JWT_PRIVATE_KEY", private_path)
+        monkeypatch.setattr(security.settings, "JWT_PUBLIC_KEY", public_path)
+        monkeypatch.setattr(security.settings, "JWT_EXTRA_VERIFY_KEYS", extra)
+        security.load_jwt_keys()
+        return public_path
+
+    yield configure
+    security._signing_key = None
+    security._verify_keys = {}
+
+
+class TestAlgorithms:
+    @pytest.mark.parametrize("algorithm", ["RS256", "ES256", "EdDSA"])
+    def test_roundtrip(self, keyring, algorithm):
+        keyring(algorithm, kid="k1")
+        token = security.create_token({"sub": "1", "company_id": 2})
+        assert jwt.get_unverified_header(token) == {"alg": algorithm, "kid": "k1", "typ": "JWT"}
+        payload = security.decode_token(token)
+        assert payload["sub"] == "1"
+        assert payload["company_id"] == 2
+
+    def test_unsupported_algorithm_fails_on_load(self, keyring):
+        with pytest.raises(RuntimeError):
+            keyring("HS256", kid="k1")
+
+    def test_key_of_other_type_fails_on_load(self, keyring, tmp_path, monkeypatch):
+        keyring("RS256", kid="k1")
+        monkeypatch.setattr(security.settings, "ALGORITHM", "EdDSA")
+        with pytest.raises(RuntimeError):
+            security.load_jwt_keys()
+
+
+class TestRotation:
+    def test_old_kid_still_verified_after_rotation(self, keyring):
+        old_public = keyring("RS256", kid="old")
+        old_token = security.create_token({"sub": "1"})
+        keyring("EdDSA", kid="new", extra=f"old:RS256:{old_public}")
+        new_token = security.create_token({"sub": "2"})
+        assert jwt.get_unverified_header(new_token)["kid"] == "new"
+        assert security.decode_token(old_token)["sub"] == "1"
+        assert security.decode_token(new_token)["sub"] == "2"
+
+    def test_dropped_kid_is_rejected(self, keyring):
+        keyring("RS256", kid="old")
+        old_token = security.create_token({"sub": "1"})
+        keyring("EdDSA", kid="new")
+        with pytest.raises(jwt.InvalidTokenError):
+            security.decode_token(old_token)
+
+    def test_token_without_kid_verified_by_alg(self, keyring, tmp_path):
+        keyring("RS256", kid="old")
+        private_key = security._signing_key[2]
+        legacy_token = jwt.encode({"sub": "1"}, private_key, algorithm="RS256")
+        assert security.decode_token(legacy_token)["sub"] == "1"
+
+    def test_reload_clears_verified_token_cache(self, keyring):
+        keyring("ES256", kid="k1")
+        access_token_cache.put("token", 1, None, exp=2**31)
+        security.reload_jwt_keys()
+        assert access_token_cache.get("token") is None
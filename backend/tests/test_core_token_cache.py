@@ -0,0 +1,66 @@
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core import dependencies
+from app.core.token_cache import VerifiedTokenCache
+
+
+def _request(access_token: str):
+    return SimpleNamespace(cookies={"access_token": access_token}, state=SimpleNamespace())
+
+
+class TestVerifiedTokenCache:
+    def test_put_and_get(self):
+        cache = VerifiedTokenCache(maxsize=10)
+        cache.put("token", 1, 5, exp=time.time() + 60)
+        assert cache.get("token") == (1, 5)
+        assert cache.get("other") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_expired_entry_is_dropped(self):
+        cache = VerifiedTokenCache(maxsize=10)
+        cache.put("token", 1, None, exp=time.time() - 1)
+        assert cache.get("token") is None
+        assert cache.stats()["size"] == 0
+
+    def test_lru_eviction(self):
+        cache = VerifiedTokenCache(maxsize=2)
+        exp = time.time() + 60
+        cache.put("a", 1, None, exp)
+        cache.put("b", 2, None, exp)
+        cache.get("a")
+        cache.put("c", 3, None, exp)
+        assert cache.get("b") is None
+        assert cache.get("a") == (1, None)
+        assert cache.get("c") == (3, None)
+        assert cache.stats()["evictions"] == 1
+
+    def test_discard_and_clear(self):
+        cache = VerifiedTokenCache(maxsize=10)
+        exp = time.time() + 60
+        cache.put("a", 1, None, exp)
+        cache.put("b", 2, None, exp)
+        cache.discard("a")
+        assert cache.get("a") is None
+        cache.clear()
+        assert cache.get("b") is None
+
+
+class TestValidatedContextUsesCache:
+    @pytest.mark.asyncio
+    async def test_signature_verified_once_per_token(self):
+        cache = VerifiedTokenCache(maxsize=10)
+        payload = {"sub": "7", "company_id": 3, "exp": time.time() + 60}
+        with patch.object(dependencies, "access_token_cache", cache), patch.object(
+            dependencies, "decode_token", MagicMock(return_value=payload)
+        ) as decode:
+            for _ in range(3):
+                result = await dependencies._get_validated_context(
+                    _request("token"), MagicMock(), AsyncMock(), MagicMock(), AsyncMock()
+                )
+                assert result == (7, 3)
+        decode.assert_called_once_with("token")
@@ -3,7 +3,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from app.core.exceptions import AlreadyExistsError, InvalidCodeError, UnauthorizedError
+from app.core.exceptions import AlreadyExistsError, EmailSendError, InvalidCodeError, UnauthorizedError
 from app.schemas import UserCreate, Confirm, Login
 from app.services.AuthService import (
     register,
@@ -51,18 +51,29 @@ def redis():
 
 class TestRegister:
     @pytest.mark.asyncio
-    @patch("app.services.AuthService.send_code_email_gmail")
+    @patch("app.services.AuthService.hash_password", new_callable=AsyncMock, return_value="hash")
+    @patch("app.services.AuthService.enqueue_code_email", new_callable=AsyncMock)
     @patch("app.services.AuthService.UserRepository")
-    async def test_register_success_returns_jti(self, repo_cls, send_mail, session, redis):
+    async def test_register_success_returns_jti(self, repo_cls, enqueue_mail, hash_pwd, session, redis):
         repo_cls.return_value.get_by_email = AsyncMock(return_value=None)
         repo_cls.return_value.get_by_phone_number = AsyncMock(return_value=None)
-        send_mail_sync = MagicMock()
-        with patch("app.services.AuthService.asyncio.to_thread", new_callable=AsyncMock) as to_thread:
-            to_thread.return_value = None
-            jti = await register(session, redis, repo_cls.return_value, _user_create())
+        jti = await register(session, redis, repo_cls.return_value, _user_create())
         assert jti is not None
         assert redis.set.await_count >= 3
-        to_thread.assert_awaited_once()
+        enqueue_mail.assert_awaited_once()
+        assert enqueue_mail.await_args[0][1] == "user@example.com"
+        hash_pwd.assert_awaited_once_with("secret123")
+
+    @pytest.mark.asyncio
+    @patch("app.services.AuthService.hash_password", new_callable=AsyncMock, return_value="hash")
+    @patch("app.services.AuthService.enqueue_code_email", new_callable=AsyncMock, side_effect=ConnectionError("redis"))
+    @patch("app.services.AuthService.UserRepository")
+    async def test_register_enqueue_failure_raises_503(self, repo_cls, enqueue_mail, hash_pwd, session, redis):
+        repo_cls.return_value.get_by_email = AsyncMock(return_value=None)
+        repo_cls.return_value.get_by_phone_number = AsyncMock(return_value=None)
+        with pytest.raises(EmailSendError):
+            await register(session, redis, repo_cls.return_value, _user_create())
+        redis.set.assert_not_awaited()
 
     @pytest.mark.asyncio
     @patch("app.services.AuthService.UserRepository")
@@ -116,17 +127,15 @@ class TestConfirmRegistration:
 
 class TestLogin:
     @pytest.mark.asyncio
-    @patch("app.services.AuthService.verify_password", return_value=True)
-    @patch("app.services.AuthService.send_code_email_gmail")
+    @patch("app.services.AuthService.check_password", new_callable=AsyncMock, return_value=True)
+    @patch("app.services.AuthService.enqueue_code_email", new_callable=AsyncMock)
     @patch("app.services.AuthService.UserRepository")
-    async def test_login_success_returns_jti(self, repo_cls, send_mail, verify_pwd, session, redis):
+    async def test_login_success_returns_jti(self, repo_cls, enqueue_mail, verify_pwd, session, redis):
         repo_cls.return_value.get_by_email = AsyncMock(return_value=_mock_user_in_db())
-        with patch("app.services.AuthService.asyncio.to_thread", new_callable=AsyncMock) as to_thread:
-            to_thread.return_value = None
-            jti = await login(session, redis, repo_cls.return_value, Login(email="user@example.com", password="secret123"))
+        jti = await login(session, redis, repo_cls.return_value, Login(email="user@example.com", password="secret123"))
         assert jti is not None
         redis.set.assert_awaited_once()
-        to_thread.assert_awaited_once()
+        enqueue_mail.assert_awaited_once()
 
     @pytest.mark.asyncio
     @patch("app.services.AuthService.UserRepository")
@@ -137,7 +146,7 @@ class TestLogin:
         assert "invalid" in exc_info.value.detail.lower()
 
     @pytest.mark.asyncio
-    @patch("app.services.AuthService.verify_password", return_value=False)
+    @patch("app.services.AuthService.check_password", new_callable=AsyncMock, return_value=False)
     @patch("app.services.AuthService.UserRepository")
     async def test_login_wrong_password_raises_401(self, repo_cls, verify_pwd, session, redis):
         repo_cls.return_value.get_by_email = AsyncMock(return_value=_mock_user_in_db())
@@ -3,9 +3,10 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
+from app.core.cache import INVALIDATION_CHANNEL
 from app.core.exceptions import AlreadyExistsError, NotFoundError
 from app.schemas import CompanyCreate, CompanyUpdate, CompanyResponse
-from app.services.CompanyService import create_company, get_company, update_company
+from app.services.CompanyService import company_cache, create_company, get_company, update_company
 
 
 def _company_create():
@@ -30,7 +31,9 @@ def _mock_company(owner_id: int = 1, id: int = 1):
 
 @pytest.fixture
 def session():
-    return AsyncMock()
+    s = AsyncMock()
+    s.info = {}
+    return s
 
 
 @pytest.fixture
@@ -61,7 +64,7 @@ class TestCreateCompany:
         redis.set.assert_awaited_once()
         call_args = redis.set.await_args
         assert call_args[0][0] == "company_1"
-        assert json.loads(call_args[0][1])["name"] == _company_create().name
+        assert company_cache.loads(call_args[0][1])[0].name == _company_create().name
 
     @pytest.mark.asyncio
     @patch("app.services.CompanyService.CompanyRepository")
@@ -82,7 +85,7 @@ class TestGetCompany:
         get_by_user_mock = AsyncMock()
         repo_cls.return_value.get_by_user_id = get_by_user_mock
         cached = {"id": 1, "owner_id": 1, "name": "ООО", "inn": "7707083893", "snils": "12345678901", "address": "Москва"}
-        redis.get = AsyncMock(return_value=json.dumps(cached))
+        redis.get = AsyncMock(return_value=company_cache.dumps(CompanyResponse.model_validate(cached)))
         result = await get_company(session, redis, repo_cls.return_value, 1)
         assert result is not None
         assert result.name == "ООО"
@@ -98,8 +101,9 @@ class TestGetCompany:
         result = await get_company(session, redis, repo_cls.return_value, 1)
         assert result is not None
         assert result.name == company.name
-        redis.set.assert_awaited_once()
-        assert redis.set.await_args[0][0] == "company_1"
+        key, value = redis.set.await_args[0]
+        assert key == "company_1"
+        assert company_cache.loads(value)[0] == result
 
     @pytest.mark.asyncio
     @patch("app.services.CompanyService.CompanyRepository")
@@ -115,45 +119,43 @@ class TestUpdateCompany:
     @pytest.mark.asyncio
     @patch("app.services.CompanyService.CompanyRepository")
     async def test_update_company_success(self, repo_cls, session, redis):
-        old_company = _mock_company()
-        old_company.name = "Старое имя"
         updated_company = _mock_company()
         updated_company.name = "Новое имя"
-        repo_cls.return_value.get_by_user_id = AsyncMock(return_value=old_company)
-        repo_cls.return_value.update = AsyncMock(return_value=updated_company)
+        repo_cls.return_value.update_by_user_id = AsyncMock(return_value=updated_company)
         redis.get = AsyncMock(return_value="cached_data")
         data = CompanyUpdate(name="Новое имя")
         result = await update_company(session, redis, repo_cls.return_value, 1, data)
         assert result is not None
         assert result.name == "Новое имя"
-        redis.delete.assert_awaited_once()
+        repo_cls.return_value.update_by_user_id.assert_awaited_once_with(session, 1, {"name": "Новое имя"})
         redis.set.assert_awaited_once()
+        assert redis.set.await_args[0][0] == "company_1"
+        channel, message = redis.publish.await_args[0]
+        assert channel == INVALIDATION_CHANNEL
+        assert json.loads(message)["keys"] == ["company_1"]
 
     @pytest.mark.asyncio
     @patch("app.services.CompanyService.CompanyRepository")
     async def test_update_company_partial(self, repo_cls, session, redis):
-        old_company = _mock_company()
         updated_company = _mock_company()
         updated_company.address = "Новый адрес"
-        repo_cls.return_value.get_by_user_id = AsyncMock(return_value=old_company)
-        repo_cls.return_value.update = AsyncMock(return_value=updated_company)
+        repo_cls.return_value.update_by_user_id = AsyncMock(return_value=updated_company)
         redis.get = AsyncMock(return_value=None)
         data = CompanyUpdate(address="Новый адрес")
         result = await update_company(session, redis, repo_cls.return_value, 1, data)
         assert result.address == "Новый адрес"
-        repo_cls.return_value.update.assert_awaited_once()
+        repo_cls.return_value.update_by_user_id.assert_awaited_once_with(session, 1, {"address": "Новый адрес"})
 
     @pytest.mark.asyncio
     @patch("app.services.CompanyService.CompanyRepository")
     async def test_update_company_not_found_raises_404(self, repo_cls, session, redis):
-        repo_cls.return_value.get_by_user_id = AsyncMock(return_value=None)
-        update_mock = AsyncMock()
-        repo_cls.return_value.update = update_mock
+        repo_cls.return_value.update_by_user_id = AsyncMock(return_value=None)
         data = CompanyUpdate(name="Любое")
         with pytest.raises(NotFoundError) as exc_info:
             await update_company(session, redis, repo_cls.return_value, 999, data)
         assert "not found" in exc_info.value.detail.lower()
-        assert update_mock.await_count == 0
+        session.commit.assert_not_awaited()
+        redis.set.assert_not_awaited()
 
     @pytest.mark.asyncio
     @patch("app.services.CompanyService.CompanyRepository")
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from datetime import date
 from decimal import Decimal
@@ -5,9 +6,17 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from app.core.exceptions import NotFoundError
-from app.schemas import EmployeeCreate, EmployeeUpdate
-from app.services.EmployeeService import create_employee, dismiss_employees, get_employee, list_employees, update_employee
+from app.core.exceptions import BadRequestError, NotFoundError
+from app.schemas import EmployeeCreate, EmployeeResponse, EmployeeUpdate
+from app.services.EmployeeService import (
+    create_employee,
+    dismiss_employees,
+    employee_cache,
+    get_employee,
+    get_employees_batch,
+    list_employees,
+    update_employee,
+)
 
 
 def _valid_employee_create():
@@ -60,6 +69,7 @@ def _mock_employee(employee_id: int = 1, company_id: int = 1):
 def session():
     s = AsyncMock()
     s.commit = AsyncMock()
+    s.info = {}
     return s
 
 
@@ -74,22 +84,129 @@ def redis():
 class TestListEmployees:
     @pytest.mark.asyncio
     @patch("app.services.EmployeeService.EmployeeRepository")
-    async def test_list_employees_returns_all_for_company(self, repo_cls, session):
+    async def test_list_employees_returns_page_for_company(self, repo_cls, session):
         emp1 = _mock_employee(employee_id=1, company_id=1)
         emp2 = _mock_employee(employee_id=2, company_id=1)
-        repo_cls.return_value.get_all_by_company_id = AsyncMock(return_value=[emp1, emp2])
+        repo_cls.return_value.get_page_by_company_id = AsyncMock(return_value=[emp1, emp2])
         result = await list_employees(session, repo_cls.return_value, 1)
-        assert len(result) == 2
-        assert result[0].id == 1
-        assert result[1].id == 2
-        repo_cls.return_value.get_all_by_company_id.assert_awaited_once_with(session, 1)
+        assert [e.id for e in result.items] == [1, 2]
+        assert result.next_cursor is None
+        assert result.total is None
+        repo_cls.return_value.get_page_by_company_id.assert_awaited_once_with(
+            session, 1, 51, sort="id", descending=False, after=None
+        )
 
     @pytest.mark.asyncio
     @patch("app.services.EmployeeService.EmployeeRepository")
     async def test_list_employees_empty(self, repo_cls, session):
-        repo_cls.return_value.get_all_by_company_id = AsyncMock(return_value=[])
+        repo_cls.return_value.get_page_by_company_id = AsyncMock(return_value=[])
         result = await list_employees(session, repo_cls.return_value, 1)
-        assert result == []
+        assert result.items == []
+        assert result.next_cursor is None
+
+    @pytest.mark.asyncio
+    @patch("app.services.EmployeeService.EmployeeRepository")
+    async def test_next_cursor_resumes_after_last_item(self, repo_cls, session):
+        repo = repo_cls.return_value
+        repo.get_page_by_company_id = AsyncMock(return_value=[_mock_employee(employee_id=i) for i in (3, 7, 9)])
+        page = await list_employees(session, repo, 1, limit=2, sort="hire_date", descending=True)
+        assert [e.id for e in page.items] == [3, 7]
+        assert page.next_cursor is not None
+
+        repo.get_page_by_company_id = AsyncMock(return_value=[])
+        await list_employees(session, repo, 1, limit=2, cursor=page.next_cursor, sort="hire_date", descending=True)
+        assert repo.get_page_by_company_id.call_args.kwargs["after"] == (date(2020, 1, 15), 7)
+
+    @pytest.mark.asyncio
+    @patch("app.services.EmployeeService.EmployeeRepository")
+    async def test_filters_and_total_passed_to_repository(self, repo_cls, session):
+        repo = repo_cls.return_value
+        repo.get_page_by_company_id = AsyncMock(return_value=[_mock_employee()])
+        repo.count_by_company_id = AsyncMock(return_value=120)
+        page = await list_employees(
+            session, repo, 1, include_total=True, status="active", hire_date_from=date(2020, 1, 1)
+        )
+        assert page.total == 120
+        repo.count_by_company_id.assert_awaited_once_with(
+            session, 1, status="active", hire_date_from=date(2020, 1, 1)
+        )
+        assert repo.get_page_by_company_id.call_args.kwargs["status"] == "active"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("cursor", ["not-base64!", "e30="])
+    async def test_invalid_cursor_raises_bad_request(self, session, cursor):
+        with pytest.raises(BadRequestError):
+            await list_employees(session, AsyncMock(), 1, cursor=cursor)
+
+    @pytest.mark.asyncio
+    @patch("app.services.EmployeeService.EmployeeRepository")
+    async def test_cursor_from_other_sort_rejected(self, repo_cls, session):
+        repo = repo_cls.return_value
+        repo.get_page_by_company_id = AsyncMock(return_value=[_mock_employee(employee_id=i) for i in (1, 2)])
+        page = await list_employees(session, repo, 1, limit=1, sort="last_name")
+        with pytest.raises(BadRequestError):
+            await list_employees(session, repo, 1, cursor=page.next_cursor, sort="id")
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_query_db_once(self, session):
+        store = {}
+
+        async def redis_set(key, value, ex=None, px=None, nx=False):
+            if nx and key in store:
+                return None
+            store[key] = value
+            return True
+
+        redis = AsyncMock()
+        redis.get = AsyncMock(side_effect=lambda key: store.get(key))
+        redis.set = AsyncMock(side_effect=redis_set)
+
+        async def get_by_id(session, employee_id):
+            await asyncio.sleep(0.05)
+            return _mock_employee(employee_id=employee_id, company_id=1)
+
+        repo = MagicMock()
+        repo.get_by_id = AsyncMock(side_effect=get_by_id)
+        results = await asyncio.gather(*(get_employee(session, redis, repo, 1, 1) for _ in range(50)))
+        assert {r.id for r in results} == {1}
+        repo.get_by_id.assert_awaited_once()
+
+
+
+class TestGetEmployeesBatch:
+    @pytest.fixture
+    def batch_redis(self):
+        r = AsyncMock()
+        r.pipeline = MagicMock(return_value=MagicMock(execute=AsyncMock()))
+        return r
+
+    def _cached(self, employee_id: int, company_id: int = 1) -> str:
+        return employee_cache.dumps(EmployeeResponse.model_validate(_mock_employee(employee_id, company_id)))
+
+    @pytest.mark.asyncio
+    async def test_all_from_cache(self, session, batch_redis):
+        batch_redis.mget = AsyncMock(return_value=[self._cached(2), self._cached(1)])
+        repo = MagicMock()
+        repo.get_by_ids_for_company = AsyncMock()
+        result = await get_employees_batch(session, batch_redis, repo, [2, 1], 1)
+        assert [e.id for e in result.items] == [2, 1]
+        assert result.not_found == []
+        batch_redis.mget.assert_awaited_once_with(["employee_2", "employee_1"])
+        repo.get_by_ids_for_company.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_misses_loaded_in_one_query_and_backfilled(self, session, batch_redis):
+        # 1 — в кэше, 2 — в БД, 3 — нет нигде, 4 — в кэше, но другой компании.
+        batch_redis.mget = AsyncMock(return_value=[self._cached(1), None, None, self._cached(4, company_id=2)])
+        repo = MagicMock()
+        repo.get_by_ids_for_company = AsyncMock(return_value=[_mock_employee(2)])
+        result = await get_employees_batch(session, batch_redis, repo, [1, 2, 3, 4, 2], 1)
+        assert [e.id for e in result.items] == [1, 2]
+        assert result.not_found == [3, 4]
+        repo.get_by_ids_for_company.assert_awaited_once_with(session, 1, [2, 3])
+        pipe = batch_redis.pipeline.return_value
+        assert [c.args[0] for c in pipe.set.call_args_list] == ["employee_2"]
+        pipe.execute.assert_awaited_once()
 
 
 class TestCreateEmployee:
@@ -144,7 +261,7 @@ class TestGetEmployee:
             "snils": "12345678901",
             "address": "Москва",
         }
-        redis.get = AsyncMock(return_value=json.dumps(cached))
+        redis.get = AsyncMock(return_value=employee_cache.dumps(EmployeeResponse.model_validate(cached)))
         result = await get_employee(session, redis, repo_cls.return_value, 1, 1)
         assert result is not None
         assert result.id == 1
@@ -177,7 +294,7 @@ class TestGetEmployee:
             "snils": "12345678901",
             "address": "Москва",
         }
-        redis.get = AsyncMock(return_value=json.dumps(cached))
+        redis.get = AsyncMock(return_value=employee_cache.dumps(EmployeeResponse.model_validate(cached)))
         with pytest.raises(NotFoundError) as exc_info:
             await get_employee(session, redis, repo_cls.return_value, 1, 1)
         assert "not found" in exc_info.value.detail.lower() or "owner" in exc_info.value.detail.lower()
@@ -192,8 +309,9 @@ class TestGetEmployee:
         assert result is not None
         assert result.id == 1
         assert result.company_id == 1
-        redis.set.assert_awaited_once()
-        assert redis.set.await_args[0][0] == "employee_1"
+        key, value = redis.set.await_args[0]
+        assert key == "employee_1"
+        assert employee_cache.loads(value)[0] == result
 
     @pytest.mark.asyncio
     @patch("app.services.EmployeeService.EmployeeRepository")
@@ -219,22 +337,22 @@ class TestUpdateEmployee:
     @pytest.mark.asyncio
     @patch("app.services.EmployeeService.EmployeeRepository")
     async def test_update_employee_success(self, repo_cls, session, redis):
-        old_employee = _mock_employee(employee_id=1, company_id=1)
         updated_employee = _mock_employee(employee_id=1, company_id=1)
         updated_employee.first_name = "Пётр"
-        repo_cls.return_value.get_by_id = AsyncMock(return_value=old_employee)
-        repo_cls.return_value.update = AsyncMock(return_value=updated_employee)
+        repo_cls.return_value.update_for_company = AsyncMock(return_value=updated_employee)
         data = EmployeeUpdate(first_name="Пётр")
         result = await update_employee(session, redis, repo_cls.return_value, 1, data, 1)
         assert result is not None
         assert result.first_name == "Пётр"
+        repo_cls.return_value.update_for_company.assert_awaited_once_with(session, 1, 1, {"first_name": "Пётр"})
         redis.set.assert_awaited_once()
+        redis.publish.assert_awaited_once()
         session.commit.assert_awaited_once()
 
     @pytest.mark.asyncio
     @patch("app.services.EmployeeService.EmployeeRepository")
     async def test_update_employee_not_found_raises_404(self, repo_cls, session, redis):
-        repo_cls.return_value.get_by_id = AsyncMock(return_value=None)
+        repo_cls.return_value.update_for_company = AsyncMock(return_value=None)
         data = EmployeeUpdate(first_name="Пётр")
         with pytest.raises(NotFoundError) as exc_info:
             await update_employee(session, redis, repo_cls.return_value, 999, data, 1)
@@ -243,25 +361,27 @@ class TestUpdateEmployee:
     @pytest.mark.asyncio
     @patch("app.services.EmployeeService.EmployeeRepository")
     async def test_update_employee_wrong_company_raises_404(self, repo_cls, session, redis):
-        employee_other_company = _mock_employee(employee_id=1, company_id=2)
-        repo_cls.return_value.get_by_id = AsyncMock(return_value=employee_other_company)
+        # Сотрудник другой компании не попадает под WHERE id = :id AND company_id = :cid — UPDATE ничего не вернул.
+        repo_cls.return_value.update_for_company = AsyncMock(return_value=None)
         data = EmployeeUpdate(first_name="Пётр")
         with pytest.raises(NotFoundError) as exc_info:
             await update_employee(session, redis, repo_cls.return_value, 1, data, 1)
         assert "not found" in exc_info.value.detail.lower() or "owner" in exc_info.value.detail.lower()
+        repo_cls.return_value.update_for_company.assert_awaited_once_with(session, 1, 1, {"first_name": "Пётр"})
+        session.commit.assert_not_awaited()
 
     @pytest.mark.asyncio
     @patch("app.services.EmployeeService.EmployeeRepository")
     async def test_update_employee_partial(self, repo_cls, session, redis):
-        old_employee = _mock_employee(employee_id=1, company_id=1)
         updated_employee = _mock_employee(employee_id=1, company_id=1)
         updated_employee.salary = Decimal("60000.00")
-        repo_cls.return_value.get_by_id = AsyncMock(return_value=old_employee)
-        repo_cls.return_value.update = AsyncMock(return_value=updated_employee)
+        repo_cls.return_value.update_for_company = AsyncMock(return_value=updated_employee)
         data = EmployeeUpdate(salary=Decimal("60000.00"))
         result = await update_employee(session, redis, repo_cls.return_value, 1, data, 1)
         assert result.salary == Decimal("60000.00")
-        repo_cls.return_value.update.assert_awaited_once()
+        repo_cls.return_value.update_for_company.assert_awaited_once_with(
+            session, 1, 1, {"salary": Decimal("60000.00")}
+        )
 
 
 class TestDismissEmployees:
@@ -273,46 +393,43 @@ class TestDismissEmployees:
     @pytest.mark.asyncio
     @patch("app.services.EmployeeService.EmployeeRepository")
     async def test_dismiss_one_employee_success(self, repo_cls, session, redis_with_delete):
-        emp = _mock_employee(employee_id=1, company_id=1)
-        repo_cls.return_value.get_by_id = AsyncMock(return_value=emp)
-        repo_cls.return_value.delete = AsyncMock()
+        repo_cls.return_value.delete_by_ids = AsyncMock(return_value=[1])
         result = await dismiss_employees(session, redis_with_delete, repo_cls.return_value, [1], 1)
         assert result["message"] == "Employees dismissed successfully"
-        repo_cls.return_value.get_by_id.assert_awaited_once_with(session, 1)
-        repo_cls.return_value.delete.assert_awaited_once_with(session, emp)
+        repo_cls.return_value.delete_by_ids.assert_awaited_once_with(session, 1, [1])
         redis_with_delete.delete.assert_awaited_once_with("employee_1")
         session.commit.assert_awaited_once()
 
     @pytest.mark.asyncio
     @patch("app.services.EmployeeService.EmployeeRepository")
-    async def test_dismiss_multiple_employees_success(self, repo_cls, session, redis_with_delete):
-        emp1 = _mock_employee(employee_id=1, company_id=1)
-        emp2 = _mock_employee(employee_id=2, company_id=1)
-        repo_cls.return_value.get_by_id = AsyncMock(side_effect=[emp1, emp2])
-        repo_cls.return_value.delete = AsyncMock()
-        result = await dismiss_employees(session, redis_with_delete, repo_cls.return_value, [1, 2], 1)
+    async def test_dismiss_multiple_employees_single_statement(self, repo_cls, session, redis_with_delete):
+        repo_cls.return_value.delete_by_ids = AsyncMock(return_value=[1, 2])
+        result = await dismiss_employees(session, redis_with_delete, repo_cls.return_value, [1, 2, 2], 1)
         assert result["message"] == "Employees dismissed successfully"
-        assert repo_cls.return_value.get_by_id.await_count == 2
-        assert repo_cls.return_value.delete.await_count == 2
-        assert redis_with_delete.delete.await_count == 2
+        repo_cls.return_value.delete_by_ids.assert_awaited_once_with(session, 1, [1, 2])
+        redis_with_delete.delete.assert_awaited_once_with("employee_1", "employee_2")
+        message = json.loads(redis_with_delete.publish.await_args[0][1])
+        assert (message["ns"], message["keys"]) == ("employee", ["employee_1", "employee_2"])
         session.commit.assert_awaited_once()
 
     @pytest.mark.asyncio
     @patch("app.services.EmployeeService.EmployeeRepository")
     async def test_dismiss_employee_not_found_raises_404(self, repo_cls, session, redis_with_delete):
-        repo_cls.return_value.get_by_id = AsyncMock(return_value=None)
-        repo_cls.return_value.delete = AsyncMock()
+        repo_cls.return_value.delete_by_ids = AsyncMock(return_value=[])
         with pytest.raises(NotFoundError) as exc_info:
             await dismiss_employees(session, redis_with_delete, repo_cls.return_value, [999], 1)
         assert "not found" in exc_info.value.detail.lower() or "owner" in exc_info.value.detail.lower()
-        assert repo_cls.return_value.delete.await_count == 0
+        session.rollback.assert_awaited_once()
+        session.commit.assert_not_awaited()
+        redis_with_delete.delete.assert_not_awaited()
 
     @pytest.mark.asyncio
     @patch("app.services.EmployeeService.EmployeeRepository")
-    async def test_dismiss_employee_wrong_company_raises_404(self, repo_cls, session, redis_with_delete):
-        emp_other = _mock_employee(employee_id=1, company_id=2)
-        repo_cls.return_value.get_by_id = AsyncMock(return_value=emp_other)
-        repo_cls.return_value.delete = AsyncMock()
+    async def test_dismiss_with_foreign_employee_rolls_back_all(self, repo_cls, session, redis_with_delete):
+        # id 2 принадлежит другой компании — RETURNING вернул только id 1, удаление откатывается целиком.
+        repo_cls.return_value.delete_by_ids = AsyncMock(return_value=[1])
         with pytest.raises(NotFoundError):
-            await dismiss_employees(session, redis_with_delete, repo_cls.return_value, [1], 1)
-        assert repo_cls.return_value.delete.await_count == 0
+            await dismiss_employees(session, redis_with_delete, repo_cls.return_value, [1, 2], 1)
+        session.rollback.assert_awaited_once()
+        session.commit.assert_not_awaited()
+        redis_with_delete.delete.assert_not_awaited()
@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+from datetime import date
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.core.exceptions import BadRequestError
+from app.services.EmployeeExportService import EXPORT_COLUMNS, export_employees, parse_columns
+from app.services.EmployeeImportService import import_employees
+
+
+def _row(employee_id: int):
+    return {
+        "id": employee_id,
+        "company_id": 1,
+        "email": "employee@company.ru",
+        "phone_number": "+79991234567",
+        "first_name": "Иван",
+        "last_name": "Иванов",
+        "middle_name": "Иванович",
+        "position": "Менеджер",
+        "salary": Decimal("50000.00"),
+        "status": "active",
+        "hire_date": date(2020, 1, 15),
+        "passport_series": "1234",
+        "passport_number": "567890",
+        "passport_issued_date": date(2015, 5, 20),
+        "passport_issued_place": "ОВД Москвы",
+        "passport_issued_code": "770-001",
+        "inn": "123456789012",
+        "snils": "12345678901",
+        "address": "г. Москва, ул. Ленина, 1",
+    }
+
+
+def _repo(batches: list[list[int]]):
+    repo = MagicMock()
+
+    async def stream(session, company_id, columns, batch_size, **filters):
+        for ids in batches:
+            yield [tuple(_row(i)[c] for c in columns) for i in ids]
+
+    repo.stream_by_company_id = MagicMock(side_effect=stream)
+    return repo
+
+
+async def _read(chunks) -> bytes:
+    return b"".join([chunk async for chunk in chunks])
+
+
+class TestParseColumns:
+    def test_default_is_all_columns(self):
+        assert parse_columns(None) == EXPORT_COLUMNS
+        assert EXPORT_COLUMNS[:2] == ["id", "company_id"]
+
+    def test_selected_columns_deduplicated(self):
+        assert parse_columns("id, last_name,id") == ["id", "last_name"]
+
+    @pytest.mark.parametrize("columns", ["id,password_hash", ","])
+    def test_unknown_columns_rejected(self, columns):
+        with pytest.raises(BadRequestError):
+            parse_columns(columns)
+
+
+class TestExportEmployees:
+    @pytest.mark.asyncio
+    async def test_csv_streams_each_batch(self):
+        repo = _repo([[1, 2], [3]])
+        chunks = export_employees(AsyncMock(), repo, 1, "csv", ["id", "last_name", "salary", "hire_date"], status="active")
+        parts = [chunk async for chunk in chunks]
+        assert len(parts) == 3
+        rows = list(csv.reader(io.StringIO(b"".join(parts).decode("utf-8-sig"))))
+        assert rows[0] == ["id", "last_name", "salary", "hire_date"]
+        assert rows[1] == ["1", "Иванов", "50000.00", "2020-01-15"]
+        assert len(rows) == 4
+        assert repo.stream_by_company_id.call_args.kwargs == {"status": "active"}
+
+    @pytest.mark.asyncio
+    async def test_ndjson_one_object_per_line(self):
+        data = await _read(export_employees(AsyncMock(), _repo([[1], [2]]), 1, "ndjson", ["id", "salary"]))
+        lines = [json.loads(line) for line in data.decode().splitlines()]
+        assert lines == [{"id": 1, "salary": "50000.00"}, {"id": 2, "salary": "50000.00"}]
+
+    @pytest.mark.asyncio
+    async def test_csv_export_can_be_imported_back(self):
+        data = await _read(export_employees(AsyncMock(), _repo([[1, 2]]), 1, "csv", EXPORT_COLUMNS))
+        repo = AsyncMock()
+        repo.insert_many = AsyncMock(side_effect=lambda session, rows: list(range(len(rows))))
+        report = await import_employees(AsyncMock(), repo, io.BytesIO(data), "employees.csv", 5)
+        assert report.imported == 2, report.errors
+
+    @pytest.mark.asyncio
+    async def test_xlsx(self):
+        openpyxl = pytest.importorskip("openpyxl")
+        data = await _read(export_employees(AsyncMock(), _repo([[1], [2, 3]]), 1, "xlsx", ["id", "hire_date"]))
+        sheet = openpyxl.load_workbook(io.BytesIO(data), read_only=True).worksheets[0]
+        rows = list(sheet.iter_rows(values_only=True))
+        assert rows[0] == ("id", "hire_date")
+        assert [r[0] for r in rows[1:]] == [1, 2, 3]
@@ -0,0 +1,142 @@
+import csv
+import io
+import zipfile
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.core.exceptions import BadRequestError
+from app.services.EmployeeImportService import import_employees
+
+COLUMNS = [
+    "email", "phone_number", "first_name", "last_name", "middle_name", "position", "salary", "status",
+    "hire_date", "passport_series", "passport_number", "passport_issued_date", "passport_issued_place",
+    "passport_issued_code", "inn", "snils", "address",
+]
+VALID_ROW = [
+    "employee@company.ru", "+79991234567", "Иван", "Иванов", "Иванович", "Менеджер", "50000.00", "active",
+    "2020-01-15", "1234", "567890", "2015-05-20", "ОВД Москвы", "770-001", "123456789012", "12345678901",
+    "г. Москва, ул. Ленина, 1",
+]
+
+
+def _csv(rows, delimiter=","):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter)
+    writer.writerow(COLUMNS)
+    writer.writerows(rows)
+    return io.BytesIO(buffer.getvalue().encode("utf-8-sig"))
+
+
+def _invalid_row():
+    row = list(VALID_ROW)
+    row[1] = "not a phone"
+    return row
+
+
+@pytest.fixture
+def session():
+    return AsyncMock()
+
+
+@pytest.fixture
+def repo():
+    r = AsyncMock()
+    r.insert_many = AsyncMock(side_effect=lambda session, rows: list(range(1, len(rows) + 1)))
+    return r
+
+
+class TestImportEmployeesCsv:
+    @pytest.mark.asyncio
+    async def test_valid_rows_inserted_invalid_reported(self, session, repo):
+        report = await import_employees(session, repo, _csv([VALID_ROW, _invalid_row(), VALID_ROW]), "staff.csv", 7)
+        assert report.total_rows == 3
+        assert report.imported == 2
+        assert report.failed == 1
+        assert report.errors[0].row == 3
+        assert any(e.startswith("phone_number") for e in report.errors[0].errors)
+        rows = repo.insert_many.call_args.args[1]
+        assert len(rows) == 2
+        assert rows[0]["company_id"] == 7
+        session.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_semicolon_delimiter(self, session, repo):
+        report = await import_employees(session, repo, _csv([VALID_ROW], delimiter=";"), "staff.csv", 1)
+        assert report.imported == 1
+        assert report.failed == 0
+
+    @pytest.mark.asyncio
+    async def test_rows_processed_in_chunks(self, session, repo):
+        with patch("app.services.EmployeeImportService.IMPORT_CHUNK_SIZE", 2):
+            report = await import_employees(session, repo, _csv([VALID_ROW] * 5), "staff.csv", 1)
+        assert report.imported == 5
+        assert [len(c.args[1]) for c in repo.insert_many.call_args_list] == [2, 2, 1]
+
+    @pytest.mark.asyncio
+    async def test_error_report_is_capped(self, session, repo):
+        with patch("app.services.EmployeeImportService.IMPORT_MAX_REPORTED_ERRORS", 2):
+            report = await import_employees(session, repo, _csv([_invalid_row()] * 4), "staff.csv", 1)
+        assert report.failed == 4
+        assert len(report.errors) == 2
+        assert report.errors_truncated is True
+
+    @pytest.mark.asyncio
+    async def test_missing_columns_rejected(self, session, repo):
+        file = io.BytesIO("email,phone_number\nemployee@company.ru,+79991234567\n".encode())
+        with pytest.raises(BadRequestError) as exc_info:
+            await import_employees(session, repo, file, "staff.csv", 1)
+        assert "first_name" in exc_info.value.detail
+        repo.insert_many.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_not_utf8_rejected(self, session, repo):
+        file = io.BytesIO(",".join(COLUMNS).encode() + b"\n" + ",".join(VALID_ROW).encode("cp1251") + b"\n")
+        with pytest.raises(BadRequestError):
+            await import_employees(session, repo, file, "staff.csv", 1)
+
+    @pytest.mark.asyncio
+    async def test_unsupported_format(self, session, repo):
+        with pytest.raises(BadRequestError):
+            await import_employees(session, repo, io.BytesIO(b"{}"), "staff.json", 1)
+
+
+class TestImportEmployeesXlsx:
+    @pytest.mark.asyncio
+    async def test_xlsx_numbers_and_dates_converted(self, session, repo):
+        openpyxl = pytest.importorskip("openpyxl")
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(COLUMNS)
+        row = list(VALID_ROW)
+        row[COLUMNS.index("inn")] = 123456789012
+        row[COLUMNS.index("hire_date")] = datetime(2020, 1, 15)
+        sheet.append(row)
+        sheet.append([None] * len(COLUMNS))
+        file = io.BytesIO()
+        workbook.save(file)
+        file.seek(0)
+        report = await import_employees(session, repo, file, "staff.XLSX", 1)
+        assert report.imported == 1, report.errors
+        inserted = repo.insert_many.call_args.args[1][0]
+        assert inserted["inn"] == "123456789012"
+        assert inserted["hire_date"].isoformat() == "2020-01-15"
+
+    @pytest.mark.asyncio
+    async def test_not_a_zip_rejected(self, session, repo):
+        pytest.importorskip("openpyxl")
+        file = io.BytesIO(",".join(COLUMNS).encode() + b"\n")
+        with pytest.raises(BadRequestError):
+            await import_employees(session, repo, file, "staff.xlsx", 1)
+        repo.insert_many.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_zip_without_workbook_rejected(self, session, repo):
+        pytest.importorskip("openpyxl")
+        file = io.BytesIO()
+        with zipfile.ZipFile(file, "w") as archive:
+            archive.writestr("readme.txt", "not a workbook")
+        file.seek(0)
+        with pytest.raises(BadRequestError):
+            await import_employees(session, repo, file, "staff.xlsx", 1)